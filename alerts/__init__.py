@@ -2,15 +2,19 @@
 Alerts module for sending notifications
 """
 
+import os
+import time
 import logging
 from datetime import datetime, timedelta
 from alerts.smtp import SMTPAlerter
 from alerts.discord import DiscordAlerter
+from alerts.outbox import AlertOutbox
+from engine.metrics import ALERT_QUEUE_DEPTH, ALERT_SEND_DURATION, ALERT_SEND_FAILURES
 
 logger = logging.getLogger('monitorr.alerts')
 
 class AlertManager:
-    def __init__(self, alert_config):
+    def __init__(self, alert_config, data_dir=None):
         """Initialize alert manager with configuration"""
         self.config = alert_config
         self.alerters = {}
@@ -18,6 +22,11 @@ class AlertManager:
         
         # Initialize alerters
         self._init_alerters()
+        self.outbox = self._init_outbox(data_dir)
+        if self.outbox is None:
+            self._warn_unbatched()
+        outbox = self.outbox
+        ALERT_QUEUE_DEPTH.set_function(lambda: len(outbox) if outbox is not None else 0)
     
     def _init_alerters(self):
         """Initialize configured alerters"""
@@ -37,6 +46,102 @@ class AlertManager:
             except Exception as e:
                 logger.error(f"Failed to initialize Discord alerter: {e}")
     
+    def _init_outbox(self, data_dir):
+        """Set up the durable delivery queue, or None to send inline"""
+        outbox_config = self.config.get('outbox', {})
+        if not outbox_config.get('enabled', True):
+            return None
+        
+        path = outbox_config.get('path')
+        if not path:
+            if not data_dir:
+                return None
+            path = os.path.join(data_dir, 'alert-outbox.jsonl')
+        
+        try:
+            return AlertOutbox(
+                path,
+                self._deliver,
+                workers=outbox_config.get('workers', 4),
+                sync_interval=outbox_config.get('sync_interval', 1.0),
+                max_attempts=outbox_config.get('max_attempts', 8),
+                retry_delay=outbox_config.get('retry_delay', 5),
+                max_retry_delay=outbox_config.get('max_retry_delay', 900),
+                deliver_batch=self._deliver_batch,
+                batch_windows=self._batch_windows(),
+                on_give_up=self._gave_up
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize alert outbox, sending alerts inline: {e}")
+            return None
+    
+    def _batch_windows(self):
+        """Digest windows of alerters that can send several alerts at once"""
+        windows = {}
+        for alerter_name, alerter in self.alerters.items():
+            window = getattr(alerter, 'digest_window', 0)
+            if window and hasattr(alerter, 'send_digest'):
+                windows[alerter_name] = window
+        return windows
+    
+    def _warn_unbatched(self):
+        """Warn about configured digest windows, which only the outbox can apply"""
+        for alerter_name in self._batch_windows():
+            alerter_config = self.config.get(alerter_name, {})
+            for key in ('digest_window', 'batch_window'):
+                if alerter_config.get(key):
+                    logger.warning(f"alerts.{alerter_name}.{key} is ignored without the alert outbox; alerts are sent one at a time")
+    
+    def start(self):
+        """Start background delivery, replaying alerts left from a previous run"""
+        if self.outbox is not None:
+            self.outbox.start()
+    
+    def stop(self):
+        """Stop background delivery; undelivered alerts stay queued on disk"""
+        if self.outbox is not None:
+            self.outbox.stop()
+        for alerter in self.alerters.values():
+            if hasattr(alerter, 'close'):
+                alerter.close()
+    
+    def _deliver(self, alerter_name, alert_data):
+        """Send one alert through one alerter, raising on failure so it is retried"""
+        alerter = self.alerters.get(alerter_name)
+        if alerter is None:
+            logger.warning(f"Dropping queued {alerter_name} alert: alerter is no longer configured")
+            return
+        self._timed_send(alerter_name, alerter.send, alert_data)
+        logger.info(f"Sent {alerter_name} alert for {alert_data.get('container_name')}")
+    
+    def _gave_up(self, alerter_name, alert_data, created):
+        """Lift the cooldown an undeliverable alert set, unless a newer alert was queued since"""
+        cooldown_key = f"{alerter_name}_{alert_data.get('container_name')}"
+        last_alert = self.last_alert_time.get(cooldown_key)
+        if last_alert is not None and last_alert.timestamp() <= created:
+            self.last_alert_time.pop(cooldown_key, None)
+    
+    def _deliver_batch(self, alerter_name, alerts):
+        """Send alerts collected during an alerter's digest window as one message"""
+        alerter = self.alerters.get(alerter_name)
+        if alerter is None:
+            logger.warning(f"Dropping {len(alerts)} queued {alerter_name} alerts: alerter is no longer configured")
+            return
+        self._timed_send(alerter_name, alerter.send_digest, alerts)
+        logger.info(f"Sent {alerter_name} digest of {len(alerts)} alerts")
+    
+    @staticmethod
+    def _timed_send(alerter_name, send, payload):
+        """Call an alerter's send method, recording its latency and any failure"""
+        started = time.monotonic()
+        try:
+            send(payload)
+        except Exception:
+            ALERT_SEND_FAILURES.labels(alerter_name).inc()
+            raise
+        finally:
+            ALERT_SEND_DURATION.labels(alerter_name).observe(time.monotonic() - started)
+    
     def send_alert(self, alert_data):
         """Send alerts through all configured alerters"""
         if not self.alerters:
@@ -57,9 +162,22 @@ class AlertManager:
                     logger.info(f"Skipping {alerter_name} alert for {container_name} (cooldown period)")
                     continue
             
+            # Queue for background delivery so a slow alerter never blocks log checks;
+            # the cooldown is lifted again if delivery is given up
+            if self.outbox is not None:
+                previous = self.last_alert_time.get(cooldown_key)
+                # Set first so a delivery given up straight away still finds it to lift
+                self.last_alert_time[cooldown_key] = now
+                if self.outbox.put(alerter_name, alert_data) is None:
+                    if previous is None:
+                        self.last_alert_time.pop(cooldown_key, None)
+                    else:
+                        self.last_alert_time[cooldown_key] = previous
+                continue
+            
             # Send alert and update last alert time
             try:
-                alerter.send(alert_data)
+                self._timed_send(alerter_name, alerter.send, alert_data)
                 self.last_alert_time[cooldown_key] = now
                 logger.info(f"Sent {alerter_name} alert for {container_name}")
             except Exception as e:
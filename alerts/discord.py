@@ -3,12 +3,90 @@ Discord alerter for sending webhook notifications
 """
 
 import os
+import json
+import time
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from discord_webhook import DiscordWebhook, DiscordEmbed
+import requests
 
 logger = logging.getLogger('monitorr.alerts.discord')
 
+# Discord accepts at most 10 embeds and 6000 embed characters per message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+# Messages already accepted are remembered this long, so a retried digest skips them
+DELIVERED_TTL = 86400
+DELIVERED_MAX = 1024
+
+
+class TokenBucket:
+    """Pace requests to a webhook's rate limit
+
+    Starts from a conservative default and follows the X-RateLimit headers
+    Discord returns. The advertised limit is only adopted together with its
+    window, which Reset-After gives on the first request of a fresh bucket.
+    """
+
+    def __init__(self, capacity=5, per=2.0):
+        """Initialize a full bucket of capacity requests every per seconds"""
+        self.capacity = capacity
+        self.per = per
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._blocked_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / self.per)
+                    self._updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) * self.per / self.capacity
+                else:
+                    wait = self._blocked_until - now
+            time.sleep(wait)
+
+    def update(self, headers):
+        """Apply the rate limit headers from a response"""
+        try:
+            limit = headers.get('X-RateLimit-Limit')
+            remaining = headers.get('X-RateLimit-Remaining')
+            reset_after = headers.get('X-RateLimit-Reset-After')
+            with self._lock:
+                if limit is not None and remaining is not None and reset_after is not None \
+                        and int(remaining) == int(limit) - 1 and float(reset_after) > 0:
+                    # One request into a fresh bucket, so Reset-After is the whole window
+                    self.capacity = int(limit)
+                    self.per = float(reset_after)
+                if remaining is not None:
+                    self.tokens = min(self.tokens, int(remaining))
+                    if int(remaining) == 0 and reset_after is not None:
+                        self.block(float(reset_after), locked=True)
+        except (TypeError, ValueError):
+            pass
+
+    def block(self, seconds, locked=False):
+        """Hold all requests for the given number of seconds"""
+        if locked:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            # Exactly one request is allowed once the block lifts
+            self.tokens = 0
+            self._updated = self._blocked_until - self.per / self.capacity
+            return
+        with self._lock:
+            self.block(seconds, locked=True)
+
+
 class DiscordAlerter:
     def __init__(self, config):
         """Initialize Discord alerter with configuration"""
@@ -21,9 +99,20 @@ class DiscordAlerter:
             self.webhook_url = config.get('webhook_url', '')
             
         self.mentions = config.get('mentions', [])
+        self.timeout = config.get('timeout', 10)
+        self.max_retries = config.get('max_retries', 5)
+        
+        # Alerts within this many seconds are sent together, up to 10 embeds per message
+        self.digest_window = config.get('batch_window', 2)
         
         # Validate configuration
         self._validate_config()
+        
+        # One keep-alive session and rate limit bucket for the webhook
+        self.session = requests.Session()
+        self.bucket = TokenBucket()
+        self._delivered = OrderedDict()
+        self._delivered_lock = threading.Lock()
     
     def _validate_config(self):
         """Validate Discord configuration"""
@@ -32,56 +121,138 @@ class DiscordAlerter:
     
     def send(self, alert_data):
         """Send Discord alert"""
-        container_name = alert_data.get('container_name')
-        container_id = alert_data.get('container_id', '')[:8]  # First 8 chars of container ID
-        timestamp = alert_data.get('timestamp')
-        errors = alert_data.get('errors', [])
-        
-        if not errors:
+        if not alert_data.get('errors'):
+            logger.warning("No errors to report")
+            return
+        self.send_digest([alert_data])
+    
+    def send_digest(self, alerts):
+        """Send alerts as embeds, batching up to 10 per webhook call"""
+        embeds = [self._build_embed(alert_data) for alert_data in alerts if alert_data.get('errors')]
+        if not embeds:
             logger.warning("No errors to report")
             return
         
-        try:
-            # Create webhook
-            webhook = DiscordWebhook(url=self.webhook_url)
-            
+        for batch in self._batches(embeds):
+            payload = {'embeds': batch}
             # Add mentions if configured
             if self.mentions:
-                content = " ".join(self.mentions)
-                webhook.content = content
-            
-            # Create embed
-            embed = DiscordEmbed(
-                title=f"🚨 Alert: Errors in {container_name}",
-                color=0xFF0000  # Red
-            )
+                payload['content'] = " ".join(self.mentions)
+            # A retry of a partly sent digest only re-sends the messages that failed
+            fingerprint = hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+            if self._was_delivered(fingerprint):
+                logger.info(f"Skipping Discord message already delivered ({len(batch)} embeds)")
+                continue
+            self._execute(payload)
+            self._mark_delivered(fingerprint)
+        logger.info(f"Discord alert sent successfully ({len(embeds)} embeds)")
+    
+    def _was_delivered(self, fingerprint):
+        with self._delivered_lock:
+            delivered_at = self._delivered.get(fingerprint)
+            return delivered_at is not None and time.monotonic() - delivered_at < DELIVERED_TTL
+    
+    def _mark_delivered(self, fingerprint):
+        with self._delivered_lock:
+            self._delivered[fingerprint] = time.monotonic()
+            self._delivered.move_to_end(fingerprint)
+            while len(self._delivered) > DELIVERED_MAX:
+                self._delivered.popitem(last=False)
+    
+    def close(self):
+        """Close the HTTP session"""
+        self.session.close()
+    
+    def _execute(self, payload):
+        """POST to the webhook, waiting out rate limits"""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.error(f"Failed to send Discord alert: {e}")
+                raise
             
-            # Add fields
-            embed.add_embed_field(name="Container", value=f"{container_name} ({container_id})")
-            embed.add_embed_field(name="Time", value=timestamp)
-            embed.add_embed_field(name="Error Count", value=str(len(errors)))
+            self.bucket.update(response.headers)
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                logger.warning(f"Discord rate limited the webhook, retrying in {retry_after:.1f}s")
+                self.bucket.block(retry_after)
+                continue
             
-            # Format and add errors
+            if response.status_code >= 400:
+                logger.error(f"Discord webhook returned status code {response.status_code}: {response.text[:200]}")
+                response.raise_for_status()
+            return response
+        
+        raise RuntimeError(f"Discord webhook still rate limited after {self.max_retries} retries")
+    
+    @staticmethod
+    def _retry_after(response):
+        """Seconds to wait from a 429 response body or Retry-After header"""
+        try:
+            return float(response.json().get('retry_after'))
+        except (ValueError, TypeError, AttributeError):
+            pass
+        try:
+            return float(response.headers.get('Retry-After', 1))
+        except (TypeError, ValueError):
+            return 1.0
+    
+    @staticmethod
+    def _batches(embeds):
+        """Split embeds into messages within Discord's count and size limits"""
+        batch = []
+        size = 0
+        for embed in embeds:
+            embed_size = DiscordAlerter._embed_size(embed)
+            if batch and (len(batch) >= MAX_EMBEDS or size + embed_size > MAX_EMBED_CHARS):
+                yield batch
+                batch = []
+                size = 0
+            batch.append(embed)
+            size += embed_size
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def _embed_size(embed):
+        size = len(embed.get('title', '')) + len(embed.get('footer', {}).get('text', ''))
+        for field in embed.get('fields', []):
+            size += len(field['name']) + len(field['value'])
+        return size
+    
+    def _build_embed(self, alert_data):
+        """Build the embed for one alert"""
+        container_name = alert_data.get('container_name')
+        container_id = (alert_data.get('container_id') or '')[:8]  # First 8 chars of container ID
+        timestamp = alert_data.get('timestamp')
+        errors = alert_data.get('errors', [])
+        
+        fields = [
+            {'name': "Container", 'value': f"{container_name} ({container_id})", 'inline': True},
+            {'name': "Time", 'value': str(timestamp), 'inline': True},
+            {'name': "Error Count", 'value': str(len(errors)), 'inline': True}
+        ]
+        rate = alert_data.get('rate')
+        if rate:
+            fields.append({'name': "Rate", 'value': f"{rate['count']} in {rate['interval']}s ({rate['per_minute']}/min)", 'inline': True})
+        
+        # Format and add errors, one line per log template when grouped
+        groups = alert_data.get('groups')
+        if groups:
+            fields.append({'name': "Unique Errors", 'value': str(len(groups)), 'inline': True})
+            formatted_errors = self._format_groups(groups)
+        else:
             formatted_errors = self._format_errors(errors)
-            embed.add_embed_field(name="Errors", value=formatted_errors, inline=False)
-            
-            # Set footer
-            embed.set_footer(text="Monitorr - Docker Log Monitor")
-            
-            # Add embed to webhook
-            webhook.add_embed(embed)
-            
-            # Execute webhook
-            response = webhook.execute()
-            
-            if response.status_code == 204:
-                logger.info("Discord alert sent successfully")
-            else:
-                logger.warning(f"Discord webhook returned status code {response.status_code}")
-                
-        except Exception as e:
-            logger.error(f"Failed to send Discord alert: {e}")
-            raise
+        fields.append({'name': "Errors", 'value': formatted_errors, 'inline': False})
+        
+        return {
+            'title': f"🚨 Alert: Errors in {container_name}",
+            'color': 0xFF0000,  # Red
+            'fields': fields,
+            'footer': {'text': "Monitorr - Docker Log Monitor"}
+        }
     
     def _format_errors(self, errors):
         """Format errors for Discord message"""
@@ -99,4 +270,24 @@ class DiscordAlerter:
         if len(formatted) > MAX_LENGTH:
             formatted = formatted[:MAX_LENGTH-3] + "..."
             
-        return formatted 
\ No newline at end of file
+        return formatted
+    
+    def _format_groups(self, groups):
+        """Format grouped errors for Discord message"""
+        MAX_LENGTH = 1000
+        
+        lines = []
+        for group in groups[:5]:
+            marker = "🆕 " if group.get('new') else ""
+            template = group['template']
+            lines.append(f"• {marker}**{group['count']}×** `{group['fingerprint']}` {template[:100]}{'...' if len(template) > 100 else ''}")
+        formatted = "\n".join(lines)
+        
+        if len(groups) > 5:
+            remaining = sum(group['count'] for group in groups[5:])
+            formatted += f"\n\n... and {remaining} more errors in {len(groups) - 5} other groups"
+            
+        if len(formatted) > MAX_LENGTH:
+            formatted = formatted[:MAX_LENGTH-3] + "..."
+            
+        return formatted
@@ -0,0 +1,293 @@
+"""
+Durable outbox that delivers alerts in the background
+"""
+
+import os
+import json
+import time
+import uuid
+import heapq
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('monitorr.alerts.outbox')
+
+
+class AlertOutbox:
+    """Append-only JSONL queue of alert deliveries drained by a worker pool
+
+    Each record is one alert for one alerter, so a failing alerter is
+    retried without re-sending through the others. Appends are buffered
+    and fsynced at most every sync_interval seconds; deliveries still
+    pending when the process stops are replayed on the next start.
+
+    Alerters listed in batch_windows are held for that many seconds and
+    everything queued for them in the meantime is delivered as one batch.
+
+    Delivery only begins once start() is called; alerts queued before then
+    are journaled and sent when it is. After stop() new alerts are refused.
+    """
+
+    def __init__(self, path, deliver, workers=4, sync_interval=1.0, max_attempts=8,
+                 retry_delay=5, max_retry_delay=900, compact_after=1000,
+                 deliver_batch=None, batch_windows=None, on_give_up=None):
+        """Initialize the outbox and load undelivered alerts from disk
+
+        deliver(alerter_name, alert_data) and deliver_batch(alerter_name,
+        alerts) must raise to signal a failed attempt. on_give_up(alerter_name,
+        alert_data, created) is called for an alert dropped after max_attempts.
+        """
+        self.path = path
+        self.deliver = deliver
+        self.deliver_batch = deliver_batch
+        self.batch_windows = (batch_windows or {}) if deliver_batch else {}
+        self.workers = workers
+        self.sync_interval = sync_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.compact_after = compact_after
+        self.on_give_up = on_give_up
+
+        self._entries = {}
+        self._heap = []
+        self._seq = 0
+        self._in_flight = 0
+        self._finished = 0
+        self._file = None
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._executor = None
+        self._load()
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        """Rebuild pending deliveries from the journal"""
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a torn final line; everything before it is intact
+                        logger.warning(f"Skipping unreadable record in alert outbox {self.path}")
+                        continue
+                    op = record.get('op')
+                    if op == 'add':
+                        self._entries[record['id']] = record
+                    elif op == 'retry' and record['id'] in self._entries:
+                        self._entries[record['id']]['attempts'] = record['attempts']
+                    elif op == 'done':
+                        self._entries.pop(record['id'], None)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to load alert outbox from {self.path}: {e}")
+
+        if self._entries:
+            logger.info(f"Replaying {len(self._entries)} undelivered alerts from {self.path}")
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self.path, 'a')
+
+    def _append(self, record):
+        """Buffer a journal record; the dispatcher fsyncs in batches"""
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(record, default=str) + '\n')
+        self._dirty = True
+
+    def _push(self, entry, due):
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, entry['id']))
+
+    def put(self, alerter_name, alert_data):
+        """Queue an alert for one alerter and return its id, or None if the outbox is stopped"""
+        entry = {
+            'op': 'add',
+            'id': uuid.uuid4().hex,
+            'alerter': alerter_name,
+            'data': alert_data,
+            'attempts': 0,
+            'created': time.time()
+        }
+        with self._cond:
+            if self._closed:
+                logger.warning(f"Alert outbox is stopped, dropping {alerter_name} alert for {alert_data.get('container_name')}")
+                return None
+            self._append(entry)
+            self._entries[entry['id']] = entry
+            self._push(entry, time.monotonic() + self.batch_windows.get(alerter_name, 0))
+            if self.running:
+                self._cond.notify()
+            else:
+                # No dispatcher to fsync it; kept on disk until start() delivers it
+                self._sync()
+        return entry['id']
+
+    def start(self):
+        """Start delivering queued alerts"""
+        with self._cond:
+            if self.running:
+                return
+            self._closed = False
+            self._stop_event.clear()
+            now = time.monotonic()
+            queued = {item[2] for item in self._heap}
+            for entry in self._entries.values():
+                if entry['id'] not in queued:
+                    self._push(entry, now)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='alert')
+            self._thread = threading.Thread(target=self._run, name='alert-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop dispatching, wait for in-flight deliveries and sync the journal"""
+        self._stop_event.set()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._cond:
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _run(self):
+        """Hand due deliveries to the worker pool and fsync the journal periodically"""
+        with self._cond:
+            while not self._stop_event.is_set():
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now and self._in_flight < self.workers:
+                    _, _, entry_id = heapq.heappop(self._heap)
+                    entry = self._entries.get(entry_id)
+                    if entry is None:
+                        continue
+                    self._in_flight += 1
+                    self._executor.submit(self._attempt, self._collect_batch(entry, now))
+
+                if self._dirty and now - self._last_sync >= self.sync_interval:
+                    self._sync()
+
+                timeout = self.sync_interval
+                if self._heap and self._in_flight < self.workers:
+                    timeout = min(timeout, max(self._heap[0][0] - now, 0))
+                self._cond.wait(timeout)
+
+    def _collect_batch(self, entry, now):
+        """Take every other delivery queued for the entry's alerter within its batch window"""
+        window = self.batch_windows.get(entry['alerter'])
+        if not window:
+            return [entry]
+
+        batch = [entry]
+        remaining = []
+        for item in self._heap:
+            other = self._entries.get(item[2])
+            if other is not None and other['alerter'] == entry['alerter'] and item[0] <= now + window:
+                batch.append(other)
+            else:
+                remaining.append(item)
+        if len(batch) > 1:
+            heapq.heapify(remaining)
+            self._heap = remaining
+        return batch
+
+    def _sync(self):
+        """Flush and fsync buffered journal records"""
+        if not self._dirty or self._file is None:
+            return
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        except OSError as e:
+            logger.error(f"Failed to sync alert outbox {self.path}: {e}")
+        self._last_sync = time.monotonic()
+
+    def _attempt(self, entries):
+        """Deliver alerts for one alerter, then record success or schedule retries"""
+        alerter_name = entries[0]['alerter']
+        error = None
+        try:
+            if alerter_name in self.batch_windows:
+                self.deliver_batch(alerter_name, [entry['data'] for entry in entries])
+            else:
+                self.deliver(alerter_name, entries[0]['data'])
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            self._in_flight -= 1
+            container_names = ', '.join(sorted({str(entry['data'].get('container_name')) for entry in entries}))
+            for entry in entries:
+                if error is None:
+                    self._finish(entry)
+                    continue
+                entry['attempts'] += 1
+                if entry['attempts'] >= self.max_attempts:
+                    logger.error(f"Giving up on {alerter_name} alert for {entry['data'].get('container_name')} after {entry['attempts']} attempts: {error}")
+                    self._finish(entry)
+                    if self.on_give_up is not None:
+                        self.on_give_up(alerter_name, entry['data'], entry['created'])
+                    continue
+                self._append({'op': 'retry', 'id': entry['id'], 'attempts': entry['attempts']})
+
+            retry = [entry for entry in entries if entry['id'] in self._entries]
+            if error is not None and retry:
+                # Exponential backoff with jitter so retries from a burst do not line up;
+                # a batch keeps one due time so it is retried together
+                attempts = max(entry['attempts'] for entry in retry)
+                delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Failed to send {alerter_name} alert for {container_names}, retrying in {delay:.0f}s: {error}")
+                due = time.monotonic() + delay
+                for entry in retry:
+                    self._push(entry, due)
+            self._cond.notify()
+
+    def _finish(self, entry):
+        """Mark a delivery complete and compact the journal now and then"""
+        self._entries.pop(entry['id'], None)
+        self._append({'op': 'done', 'id': entry['id']})
+        self._finished += 1
+        if self._finished >= self.compact_after:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the journal with only pending deliveries"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            os.replace(tmp_path, self.path)
+            self._open()
+            self._dirty = False
+            self._finished = 0
+        except OSError as e:
+            logger.error(f"Failed to compact alert outbox {self.path}: {e}")
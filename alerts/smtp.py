@@ -3,14 +3,122 @@ SMTP alerter for sending email notifications
 """
 
 import os
+import time
 import logging
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 
 logger = logging.getLogger('monitorr.alerts.smtp')
 
+class SMTPSession:
+    """One reusable SMTP connection, kept alive with NOOP and reopened when it drops"""
+
+    def __init__(self, server, port, use_tls, username, password, timeout=30,
+                 keepalive_interval=60, idle_timeout=300):
+        """Initialize session settings; the connection is opened on first use"""
+        self.server = server
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self._conn = None
+        self._last_used = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        """Open, secure and authenticate a new connection"""
+        conn = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                conn.starttls()
+            
+            # Login if credentials provided
+            if self.username and self.password:
+                conn.login(self.username, self.password)
+        except Exception:
+            conn.close()
+            raise
+        logger.debug(f"Opened SMTP session to {self.server}:{self.port}")
+        return conn
+
+    def _drop(self):
+        """Close the current connection, ignoring errors from a dead socket"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.quit()
+            except Exception:
+                conn.close()
+
+    def send_message(self, msg):
+        """Send a message on the shared connection, reconnecting once if it went away"""
+        with self._lock:
+            for attempt in range(2):
+                if self._conn is None:
+                    self._conn = self._connect()
+                try:
+                    self._conn.send_message(msg)
+                    self._last_used = time.monotonic()
+                    break
+                except smtplib.SMTPServerDisconnected as e:
+                    # Servers close idle sessions; a second failure is real
+                    self._drop()
+                    if attempt:
+                        raise
+                    logger.debug(f"SMTP session lost ({e}), reconnecting")
+                except smtplib.SMTPException:
+                    # The server answered (e.g. refused recipients or data), so the
+                    # message may be partly accepted and must not be sent again here
+                    raise
+                except OSError as e:
+                    # Socket errors from a dropped connection
+                    self._drop()
+                    if attempt:
+                        raise
+                    logger.debug(f"SMTP session lost ({e}), reconnecting")
+            self._start_keepalive()
+
+    def _start_keepalive(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._keepalive, name='smtp-keepalive', daemon=True)
+        self._thread.start()
+
+    def _keepalive(self):
+        """NOOP the idle connection so the next alert skips the handshake; close it when idle too long"""
+        while not self._stop_event.wait(self.keepalive_interval):
+            with self._lock:
+                if self._conn is None:
+                    return
+                if time.monotonic() - self._last_used >= self.idle_timeout:
+                    logger.debug(f"Closing idle SMTP session to {self.server}")
+                    self._drop()
+                    return
+                try:
+                    code, _ = self._conn.noop()
+                    if code != 250:
+                        self._drop()
+                        return
+                except Exception:
+                    self._drop()
+                    return
+
+    def close(self):
+        """Close the connection and stop the keepalive"""
+        self._stop_event.set()
+        with self._lock:
+            self._drop()
+
+
 class SMTPAlerter:
     def __init__(self, config):
         """Initialize SMTP alerter with configuration"""
@@ -29,8 +137,22 @@ class SMTPAlerter:
         self.from_email = config.get('from_email')
         self.to_emails = config.get('to_emails', [])
         
+        # Alerts within this many seconds are combined into one digest email (0 disables)
+        self.digest_window = config.get('digest_window', 0)
+        
         # Validate configuration
         self._validate_config()
+        
+        self.session = SMTPSession(
+            self.server,
+            self.port,
+            self.use_tls,
+            self.username,
+            self.password,
+            timeout=config.get('timeout', 30),
+            keepalive_interval=config.get('keepalive_interval', 60),
+            idle_timeout=config.get('idle_timeout', 300)
+        )
     
     def _validate_config(self):
         """Validate SMTP configuration"""
@@ -68,40 +190,87 @@ class SMTPAlerter:
             body = self._format_email_body(alert_data)
             msg.attach(MIMEText(body, 'plain'))
             
-            # Connect to server
-            server = smtplib.SMTP(self.server, self.port)
-            if self.use_tls:
-                server.starttls()
-            
-            # Login if credentials provided
-            if self.username and self.password:
-                server.login(self.username, self.password)
-            
-            # Send email
-            server.send_message(msg)
-            server.quit()
+            # Send email on the shared session
+            self.session.send_message(msg)
             logger.info(f"Sent email alert to {len(self.to_emails)} recipients")
             
         except Exception as e:
             logger.error(f"Failed to send email alert: {e}")
             raise
     
+    def send_digest(self, alerts):
+        """Send several alerts as one email"""
+        alerts = [alert_data for alert_data in alerts if alert_data.get('errors')]
+        if not alerts:
+            logger.warning("No errors to report")
+            return
+        if len(alerts) == 1:
+            self.send(alerts[0])
+            return
+        
+        container_names = sorted({alert_data.get('container_name') for alert_data in alerts})
+        try:
+            msg = MIMEMultipart()
+            msg['From'] = self.from_email
+            msg['To'] = ', '.join(self.to_emails)
+            msg['Subject'] = f"Monitorr Alert: Errors detected in {len(container_names)} containers"
+            
+            body = f"Monitorr Alert Digest: {len(alerts)} alerts for {', '.join(container_names)}\n"
+            for alert_data in alerts:
+                body += "\n" + "=" * 60 + "\n"
+                body += self._format_alert_section(alert_data)
+            body += "\n\nThis is an automated alert from Monitorr."
+            msg.attach(MIMEText(body, 'plain'))
+            
+            self.session.send_message(msg)
+            logger.info(f"Sent digest of {len(alerts)} alerts to {len(self.to_emails)} recipients")
+            
+        except Exception as e:
+            logger.error(f"Failed to send email digest: {e}")
+            raise
+    
+    def close(self):
+        """Close the SMTP session"""
+        self.session.close()
+    
     def _format_email_body(self, alert_data):
         """Format email body with alert information"""
         container_name = alert_data.get('container_name')
+        
+        body = f"Monitorr Alert: Errors detected in {container_name}\n\n"
+        body += self._format_alert_section(alert_data)
+        body += "\n\nThis is an automated alert from Monitorr."
+        return body
+    
+    def _format_alert_section(self, alert_data):
+        """Format the details of one alert"""
+        container_name = alert_data.get('container_name')
         container_id = alert_data.get('container_id')
         timestamp = alert_data.get('timestamp')
         errors = alert_data.get('errors', [])
         
-        body = f"Monitorr Alert: Errors detected in {container_name}\n\n"
-        body += f"Container: {container_name} ({container_id})\n"
+        body = f"Container: {container_name} ({container_id})\n"
         body += f"Time: {timestamp}\n"
-        body += f"Number of errors: {len(errors)}\n\n"
-        body += "Errors:\n"
+        body += f"Number of errors: {len(errors)}\n"
+        rate = alert_data.get('rate')
+        if rate:
+            body += f"Rate: {rate['count']} matches in {rate['interval']}s ({rate['per_minute']}/min, threshold {rate['threshold']})\n"
         
-        # Add errors to body
-        for i, error in enumerate(errors, 1):
-            body += f"{i}. {error}\n"
+        groups = alert_data.get('groups')
+        if groups:
+            # One entry per log template instead of every near-identical line
+            body += f"Unique errors: {len(groups)}\n\n"
+            body += "Errors:\n"
+            for i, group in enumerate(groups, 1):
+                new = " [NEW]" if group.get('new') else ""
+                body += f"{i}. {group['template']}\n"
+                body += f"   {group['count']} occurrence(s), fingerprint {group['fingerprint']}{new}\n"
+                body += f"   Example: {group['example']}\n"
+        else:
+            body += "\nErrors:\n"
+            
+            # Add errors to body
+            for i, error in enumerate(errors, 1):
+                body += f"{i}. {error}\n"
         
-        body += "\n\nThis is an automated alert from Monitorr."
         return body 
\ No newline at end of file
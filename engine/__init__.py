@@ -0,0 +1,7 @@
+"""
+Engine module for scheduling checks and managing Docker connections
+"""
+
+from engine.scheduler import MonitorScheduler
+from engine.cache import ContainerCache, ContainerHandle
+from engine.inventory import ContainerInventory, ContainerSummary
@@ -0,0 +1,483 @@
+"""
+asyncio ingestion engine speaking the Docker Engine API directly
+
+Instead of one blocking docker-py stream (and OS thread) per container,
+AsyncEngine follows every monitored container's logs on a single event
+loop over the Docker socket or TCP. Matched lines are handed to the
+monitor's normal report_errors path on a small thread pool, so alerting
+behaves exactly as it does for polling monitors.
+"""
+
+import os
+import ssl
+import json
+import asyncio
+import time
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urlencode, urlparse, quote
+from concurrent.futures import ThreadPoolExecutor
+from monitors.framing import HEADER, HEADER_SIZE, FrameDemuxer, decode_line
+from engine.cache import ContainerHandle
+from engine.metrics import DOCKER_LATENCY
+
+logger = logging.getLogger('monitorr.aio')
+
+_INSPECT_LATENCY = DOCKER_LATENCY.labels('inspect')
+_LOGS_LATENCY = DOCKER_LATENCY.labels('logs')
+
+DEFAULT_SOCKET = '/var/run/docker.sock'
+READ_SIZE = 64 * 1024
+
+
+class DockerAPIError(Exception):
+    """Error response from the Docker Engine API"""
+
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+
+
+class _Body:
+    """HTTP response body reader supporting chunked and fixed-length encodings"""
+
+    def __init__(self, reader, writer, headers):
+        self.reader = reader
+        self.writer = writer
+        self.chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        length = headers.get('content-length')
+        self._remaining = int(length) if length is not None and not self.chunked else None
+        self._chunk_left = 0
+        self._eof = False
+
+    async def read(self, size=READ_SIZE):
+        """Read up to size bytes of the body, returning b'' at the end"""
+        if self._eof:
+            return b''
+
+        if self.chunked:
+            if self._chunk_left == 0:
+                line = await self.reader.readline()
+                chunk_size = int(line.split(b';', 1)[0].strip() or b'0', 16) if line else 0
+                if chunk_size == 0:
+                    self._eof = True
+                    return b''
+                self._chunk_left = chunk_size
+            data = await self.reader.read(min(size, self._chunk_left))
+            self._chunk_left -= len(data)
+            if data and self._chunk_left == 0:
+                # Each chunk is followed by CRLF
+                await self.reader.readexactly(2)
+        elif self._remaining is not None:
+            data = await self.reader.read(min(size, self._remaining)) if self._remaining else b''
+            self._remaining -= len(data)
+        else:
+            data = await self.reader.read(size)
+
+        if not data:
+            self._eof = True
+        return data
+
+    async def readexactly(self, size):
+        """Read exactly size bytes, raising IncompleteReadError at the end of the body"""
+        parts = []
+        left = size
+        while left:
+            data = await self.read(left)
+            if not data:
+                raise asyncio.IncompleteReadError(b''.join(parts), size)
+            parts.append(data)
+            left -= len(data)
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    async def iter_lines(self):
+        """Yield newline-delimited lines of the body as bytes"""
+        pending = b''
+        while True:
+            data = await self.read()
+            if not data:
+                break
+            pending += data
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                yield line
+        if pending:
+            yield pending
+
+    async def json(self):
+        """Read the whole body and decode it as JSON"""
+        parts = []
+        while True:
+            data = await self.read()
+            if not data:
+                break
+            parts.append(data)
+        self.close()
+        return json.loads(b''.join(parts) or b'null')
+
+    def close(self):
+        """Close the underlying connection"""
+        self.writer.close()
+
+
+class AsyncDockerClient:
+    """Minimal asyncio client for the Docker Engine HTTP API"""
+
+    def __init__(self, base_url='local', tls=None, timeout=10):
+        """Initialize client
+
+        base_url: 'local', unix:///path/to/docker.sock or tcp://host:port
+        tls: optional dict with tls_cert_path, tls_key_path and tls_ca_path
+        """
+        if base_url == 'local':
+            base_url = os.environ.get('DOCKER_HOST', f"unix://{DEFAULT_SOCKET}")
+        url = urlparse(base_url)
+        self.socket_path = url.path if url.scheme in ('unix', 'http+unix') else None
+        self.host = url.hostname
+        self.port = url.port or (2376 if tls else 2375)
+        self.timeout = timeout
+        self.ssl = self._ssl_context(tls) if tls else None
+
+    @classmethod
+    def from_config(cls, docker_config):
+        """Build a client from the docker section of config.yml
+
+        Like connect_docker, TLS is only used with a certificate, key and CA;
+        tls: true without them connects over plain TCP as docker-py does.
+        """
+        tls = None
+        if docker_config.get('tls', False):
+            paths = {key: docker_config.get(key) for key in ('tls_cert_path', 'tls_key_path', 'tls_ca_path')}
+            if all(paths.values()):
+                tls = paths
+        return cls(docker_config.get('host', 'local'), tls=tls, timeout=docker_config.get('timeout', 10))
+
+    @staticmethod
+    def _ssl_context(tls):
+        """Build an SSL context from certificate paths"""
+        context = ssl.create_default_context(cafile=tls.get('tls_ca_path') or None)
+        if tls.get('tls_cert_path') and tls.get('tls_key_path'):
+            context.load_cert_chain(tls['tls_cert_path'], tls['tls_key_path'])
+        return context
+
+    async def _connect(self):
+        """Open a new connection to the daemon"""
+        if self.socket_path:
+            return await asyncio.open_unix_connection(self.socket_path)
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    async def request(self, method, path, params=None):
+        """Send a request and return the response body once headers arrive"""
+        target = path
+        if params:
+            target = f"{path}?{urlencode(params)}"
+
+        reader, writer = await asyncio.wait_for(self._connect(), self.timeout)
+        try:
+            writer.write(
+                f"{method} {target} HTTP/1.1\r\n"
+                f"Host: docker\r\n"
+                f"User-Agent: monitorr\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1')
+            )
+            await writer.drain()
+            status, headers = await asyncio.wait_for(self._read_head(reader), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+
+        body = _Body(reader, writer, headers)
+        if status >= 400:
+            try:
+                message = (await body.json() or {}).get('message', '')
+            except ValueError:
+                message = ''
+            raise DockerAPIError(status, message)
+        return body
+
+    @staticmethod
+    async def _read_head(reader):
+        """Read the status line and headers"""
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Docker daemon closed the connection")
+        status = int(status_line.split(b' ', 2)[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def inspect_container(self, name):
+        """Return a ContainerHandle for the container, or None if it does not exist"""
+        started = time.monotonic()
+        try:
+            body = await self.request('GET', f"/containers/{quote(name, safe='')}/json")
+            data = await body.json()
+        except DockerAPIError as e:
+            if e.status == 404:
+                return None
+            raise
+        finally:
+            _INSPECT_LATENCY.observe(time.monotonic() - started)
+        return ContainerHandle.from_inspect(data)
+
+    async def logs(self, container_id, follow=True, since=None, tail='all'):
+        """Open a logs stream for a container"""
+        params = {'stdout': 1, 'stderr': 1, 'timestamps': 1, 'follow': int(follow), 'tail': tail}
+        if since:
+            params['since'] = since
+        started = time.monotonic()
+        try:
+            return await self.request('GET', f"/containers/{container_id}/logs", params)
+        finally:
+            _LOGS_LATENCY.observe(time.monotonic() - started)
+
+    async def events(self, filters):
+        """Open the events stream with the given filters"""
+        return await self.request('GET', '/events', {'filters': json.dumps(filters)})
+
+
+class _LineFeed:
+    """Iterator handing a monitor's synchronous line pipeline the line just read from a stream"""
+
+    __slots__ = ('line',)
+
+    def __init__(self):
+        self.line = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.line
+
+
+class AsyncEngine:
+    """Follow logs for many monitors on a single event loop
+
+    Paused monitors are left alone until a container event wakes them. The
+    engine's events stream stands in for DockerEventWatcher, so monitors are
+    event driven while it is connected.
+    """
+
+    def __init__(self, monitors, client, alert_workers=4, batch_delay=0.5):
+        """Initialize engine
+
+        monitors: dict of monitor name to monitor instance
+        client: AsyncDockerClient for the daemon the monitors watch
+        """
+        self.monitors = dict(monitors)
+        self.client = client
+        self.batch_delay = batch_delay
+        self._executor = ThreadPoolExecutor(max_workers=alert_workers, thread_name_prefix='aio-alert')
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+        self._wakeups = {}
+        self._batches = {}
+
+    def start(self):
+        """Run the event loop in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='aio-engine', daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5)
+        logger.info(f"asyncio engine following {len(self.monitors)} monitors")
+
+    def stop(self):
+        """Cancel all streams and stop the event loop"""
+        if self._loop and self._stopping:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._executor.shutdown(wait=False)
+
+    def _run(self, ready):
+        """Thread entry point"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main(ready))
+        finally:
+            self._loop.close()
+
+    async def _main(self, ready):
+        """Start one task per monitor plus the events watcher"""
+        self._stopping = asyncio.Event()
+        ready.set()
+
+        tasks = [asyncio.create_task(self._follow(monitor)) for monitor in self.monitors.values()]
+        tasks.append(asyncio.create_task(self._watch_events()))
+
+        await self._stopping.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _follow(self, monitor):
+        """Keep a follow stream open for one monitor, reconnecting as needed"""
+        wakeup = self._wakeups.setdefault(monitor.container_name, asyncio.Event())
+        delay = monitor.reconnect_delay
+        while True:
+            # While paused, wait for a start event instead of polling
+            if monitor.paused:
+                wakeup.clear()
+                await wakeup.wait()
+                continue
+
+            try:
+                container = await self.client.inspect_container(monitor.container_name)
+                if container is None:
+                    monitor._container_missing()
+                elif container.status != 'running':
+                    logger.info(f"Container {monitor.container_name} is {container.status}, waiting for it to start")
+                else:
+                    await self._stream(monitor, container)
+                    delay = monitor.reconnect_delay
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Log stream for {monitor.container_name} interrupted: {e}")
+
+            # Wait for a start event, or back off and try again
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), delay)
+                delay = monitor.reconnect_delay
+            except asyncio.TimeoutError:
+                delay = min(delay * 2, monitor.max_reconnect_delay)
+
+    async def _stream(self, monitor, container):
+        """Read one follow stream until it ends"""
+        since = monitor.cursor.since()
+        body = await self.client.logs(container.id, follow=True, since=since, tail='all' if since else 0)
+        if monitor.ring is not None:
+            monitor.ring.live = True
+        # The monitor's own tee (metrics, ring buffer, archive), pulled one line at a time
+        feed = _LineFeed()
+        teed = monitor._tee(feed)
+        try:
+            async for line in self._iter_lines(body, container.tty, monitor.streams):
+                if not monitor.cursor.accept(line):
+                    continue
+                feed.line = line
+                next(teed)
+                monitor.last_check_time = datetime.now()
+                pattern = monitor.match_error(line)
+                if pattern is not None:
+                    self._queue_error(monitor, container, (line, pattern))
+        finally:
+            if monitor.ring is not None:
+                monitor.ring.live = False
+            body.close()
+
+    @staticmethod
+    async def _iter_lines(body, tty, streams):
+        """Yield decoded lines from a raw or multiplexed logs body"""
+        if tty:
+            async for line in body.iter_lines():
+                yield decode_line(line)
+            return
+
+        demuxer = FrameDemuxer(None, buffer_size=0)
+        while True:
+            try:
+                header = await body.readexactly(HEADER_SIZE)
+            except asyncio.IncompleteReadError:
+                break
+            stream, size = HEADER.unpack(header)
+            if not size:
+                continue
+            payload = await body.readexactly(size)
+            if stream not in streams:
+                continue
+            for _, line in demuxer.split_frame(stream, payload):
+                yield decode_line(line)
+
+        for stream, line in demuxer.flush():
+            if stream in streams:
+                yield decode_line(line)
+
+    def _queue_error(self, monitor, container, match):
+        """Batch matched (line, pattern) pairs briefly so a burst becomes one alert"""
+        batch = self._batches.get(monitor)
+        if batch is None:
+            batch = self._batches[monitor] = []
+            self._loop.call_later(self.batch_delay, self._flush, monitor, container)
+        if len(batch) < monitor.max_errors:
+            batch.append(match)
+
+    def _flush(self, monitor, container):
+        """Hand a batch of errors to the monitor on the alert thread pool"""
+        errors = self._batches.pop(monitor, None)
+        if errors:
+            self._loop.run_in_executor(self._executor, self._handle_errors, monitor, errors, container)
+
+    @staticmethod
+    def _handle_errors(monitor, errors, container):
+        """Run the monitor's blocking alert path"""
+        try:
+            monitor.report_errors(errors, container)
+        except Exception as e:
+            logger.error(f"Error handling alerts for {monitor.container_name}: {e}")
+
+    async def _watch_events(self):
+        """Pause and resume monitors as their containers stop and start"""
+        filters = {'type': ['container'], 'event': ['create', 'start', 'restart', 'rename', 'die', 'destroy']}
+        delay = 1
+        while True:
+            try:
+                body = await self.client.events(filters)
+                delay = 1
+                self._set_event_driven(True)
+                try:
+                    async for raw in body.iter_lines():
+                        if raw.strip():
+                            self._handle_event(json.loads(raw))
+                finally:
+                    self._set_event_driven(False)
+                    body.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Docker events stream interrupted: {e}")
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def _set_event_driven(self, event_driven):
+        """Let monitors pause quietly only while the events stream can resume them"""
+        for monitor in self.monitors.values():
+            monitor.event_driven = event_driven
+            if not event_driven and monitor.paused:
+                # Nothing would resume it now, so go back to retrying with backoff
+                monitor.resume()
+                wakeup = self._wakeups.get(monitor.container_name)
+                if wakeup is not None:
+                    wakeup.set()
+
+    def _handle_event(self, event):
+        """Resume and wake a monitor whose container started; pause one whose container went away"""
+        action = event.get('Action')
+        attributes = event.get('Actor', {}).get('Attributes', {})
+        name = attributes.get('name')
+        old_name = attributes.get('oldName', '').lstrip('/')
+        for monitor in self.monitors.values():
+            if monitor.container_name == name and action in ('create', 'start', 'restart', 'rename'):
+                monitor.resume()
+                wakeup = self._wakeups.get(name)
+                if wakeup is not None:
+                    wakeup.set()
+            elif monitor.container_name == name and action in ('die', 'destroy'):
+                monitor.pause()
+            elif monitor.container_name == old_name and action == 'rename':
+                monitor.pause()
@@ -0,0 +1,116 @@
+"""
+Shared container metadata cache
+"""
+
+import time
+import logging
+import threading
+import weakref
+import docker
+from engine.metrics import DOCKER_LATENCY
+
+logger = logging.getLogger('monitorr.cache')
+
+_INSPECT_LATENCY = DOCKER_LATENCY.labels('inspect')
+
+DEFAULT_TTL = 60
+
+
+class ContainerHandle:
+    """Lightweight view of the inspect fields the hot path needs"""
+
+    __slots__ = ('id', 'name', 'status', 'image', 'tty', 'log_driver', 'created')
+
+    def __init__(self, id, name, status, image='', tty=False, log_driver=None, created=None):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.image = image
+        self.tty = tty
+        self.log_driver = log_driver
+        # RFC3339 creation time; no log line is older
+        self.created = created
+
+    @classmethod
+    def from_inspect(cls, data):
+        """Build a handle from an inspect response"""
+        config = data.get('Config') or {}
+        host_config = data.get('HostConfig') or {}
+        return cls(
+            id=data['Id'],
+            name=data.get('Name', '').lstrip('/'),
+            status=(data.get('State') or {}).get('Status', 'unknown'),
+            image=config.get('Image') or data.get('Image', ''),
+            tty=config.get('Tty', False),
+            log_driver=(host_config.get('LogConfig') or {}).get('Type'),
+            created=data.get('Created')
+        )
+
+
+class ContainerCache:
+    """Container handles keyed by name and id, with TTL and explicit invalidation"""
+
+    _instances = weakref.WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, client, ttl=DEFAULT_TTL):
+        """Initialize cache for a Docker client"""
+        self.client = client
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_client(cls, client, ttl=None):
+        """Return the cache shared by everything using this Docker client"""
+        with cls._instances_lock:
+            cache = cls._instances.get(client)
+            if cache is None:
+                cache = cls._instances[client] = cls(client, ttl if ttl is not None else DEFAULT_TTL)
+            elif ttl is not None:
+                cache.ttl = ttl
+            return cache
+
+    def get(self, name_or_id):
+        """Return a handle for the container, or None if it does not exist
+
+        Other Docker errors are raised to the caller.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name_or_id)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        try:
+            handle = ContainerHandle.from_inspect(self.client.api.inspect_container(name_or_id))
+        except docker.errors.NotFound:
+            handle = None
+        finally:
+            _INSPECT_LATENCY.observe(time.monotonic() - now)
+
+        expires = now + self.ttl
+        with self._lock:
+            self._entries[name_or_id] = (handle, expires)
+            if handle is not None:
+                self._entries[handle.id] = (handle, expires)
+                self._entries[handle.name] = (handle, expires)
+        return handle
+
+    def invalidate(self, name_or_id=None):
+        """Drop a container (by name or id) from the cache, or everything if none given"""
+        with self._lock:
+            if name_or_id is None:
+                self._entries.clear()
+                return
+
+            entry = self._entries.pop(name_or_id, None)
+            handle = entry[0] if entry else None
+            if handle is not None:
+                self._entries.pop(handle.id, None)
+                self._entries.pop(handle.name, None)
+            # Drop aliases such as a short id pointing at the same container
+            stale = [key for key, (cached, _) in self._entries.items()
+                     if cached is not None and (cached.id == name_or_id or cached.name == name_or_id)]
+            for key in stale:
+                del self._entries[key]
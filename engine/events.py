@@ -0,0 +1,90 @@
+"""
+Docker events subscription
+"""
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger('monitorr.events')
+
+CONTAINER_ACTIONS = ['create', 'start', 'die', 'destroy', 'rename']
+
+
+class DockerEventWatcher:
+    """Follow the Docker /events stream in a background thread"""
+
+    def __init__(self, client, callback, actions=None, max_reconnect_delay=60):
+        """Initialize watcher
+
+        callback is called with each decoded container event on the watcher thread.
+        """
+        self.client = client
+        self.callback = callback
+        self.actions = actions or CONTAINER_ACTIONS
+        self.max_reconnect_delay = max_reconnect_delay
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stream = None
+        # timeNano of the last event handled; since= is whole-second, so repeats are skipped by this
+        self._last_nanos = None
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self):
+        """Start watching events"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='docker-events', daemon=True)
+        self._thread.start()
+        logger.info("Subscribed to Docker container events")
+
+    def stop(self):
+        """Stop watching events"""
+        self._stop_event.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                logger.debug(f"Error closing events stream: {e}")
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        """Read events, reconnecting with backoff"""
+        delay = 1
+        while not self._stop_event.is_set():
+            try:
+                # Resume from the last event seen so nothing is missed across reconnects
+                since = self._last_nanos // 1_000_000_000 if self._last_nanos else int(time.time())
+                self._stream = self.client.api.events(
+                    since=since,
+                    decode=True,
+                    filters={'type': 'container', 'event': self.actions}
+                )
+                delay = 1
+                for event in self._stream:
+                    nanos = event.get('timeNano') or event.get('time', 0) * 1_000_000_000
+                    if self._last_nanos is not None and nanos <= self._last_nanos:
+                        # Already handled before the reconnect
+                        continue
+                    self._last_nanos = nanos
+                    try:
+                        self.callback(event)
+                    except Exception as e:
+                        logger.error(f"Error handling Docker event {event.get('Action')}: {e}")
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                logger.warning(f"Docker events stream interrupted: {e}")
+            finally:
+                self._stream = None
+
+            if self._stop_event.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
@@ -0,0 +1,312 @@
+"""
+Docker host registry for monitoring several daemons from one process
+"""
+
+import time
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import docker
+from engine.cache import ContainerCache
+from engine.inventory import ContainerInventory
+
+logger = logging.getLogger('monitorr.hosts')
+
+DEFAULT_HOST = 'default'
+DEFAULT_POOL_SIZE = 10
+
+# Options extra hosts inherit from the docker section unless they set their own
+INHERITED_KEYS = ('cache_ttl', 'inventory_ttl', 'reconnect_backoff')
+HEALTH_CHECK_INTERVAL = 30
+
+# Seconds before retrying an unreachable host, doubling per failure up to the maximum
+DEFAULT_RECONNECT_BACKOFF = 5
+MAX_RECONNECT_BACKOFF = 300
+
+
+def connect_docker(docker_config):
+    """Build and ping a new Docker client from a docker config block"""
+    docker_host = docker_config.get('host', 'local')
+    use_tls = docker_config.get('tls', False)
+    timeout = docker_config.get('timeout', 10)
+    # Keep-alive connections kept per daemon, so concurrent pages and checks reuse sockets
+    max_pool_size = docker_config.get('max_pool_size', DEFAULT_POOL_SIZE)
+
+    if docker_host == 'local':
+        # Connect to local Docker daemon
+        client = docker.from_env(timeout=timeout, max_pool_size=max_pool_size)
+    else:
+        # Connect to remote Docker host
+        tls_config = None
+        if use_tls:
+            cert_path = docker_config.get('tls_cert_path')
+            key_path = docker_config.get('tls_key_path')
+            ca_path = docker_config.get('tls_ca_path')
+
+            if cert_path and key_path and ca_path:
+                tls_config = docker.tls.TLSConfig(
+                    client_cert=(cert_path, key_path),
+                    ca_cert=ca_path,
+                    verify=True
+                )
+
+        client = docker.DockerClient(
+            base_url=docker_host,
+            tls=tls_config,
+            timeout=timeout,
+            max_pool_size=max_pool_size
+        )
+
+    # Test connection
+    client.ping()
+    return client
+
+
+class ClientPool:
+    """Process-wide Docker clients keyed by connection settings
+
+    Every caller asking for the same daemon gets the same client, and with it
+    the same pooled HTTP connections. Health is checked lazily: a client is
+    pinged at most once per health_interval, and replaced when the ping fails.
+    """
+
+    CONFIG_KEYS = ('host', 'tls', 'tls_cert_path', 'tls_key_path', 'tls_ca_path', 'timeout', 'max_pool_size')
+
+    def __init__(self, health_interval=HEALTH_CHECK_INTERVAL):
+        """Initialize an empty pool"""
+        self.health_interval = health_interval
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        # Daemon version info per client; it only changes when the daemon restarts, which reconnects
+        self._versions = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def key(cls, docker_config):
+        """Identity of a daemon connection; configs that differ only in other options share a client"""
+        return tuple(docker_config.get(name) for name in cls.CONFIG_KEYS)
+
+    def get(self, docker_config, check=False):
+        """Return a live client for the config, connecting or reconnecting as needed
+
+        Raises the connection error if the daemon cannot be reached.
+        """
+        key = self.key(docker_config)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # One connection attempt per daemon at a time; other callers wait and reuse it
+        with key_lock:
+            entry = self._clients.get(key)
+            now = time.monotonic()
+            if entry is not None:
+                client, last_ok = entry
+                if not check and now - last_ok < self.health_interval:
+                    return client
+                try:
+                    client.ping()
+                    self._clients[key] = (client, now)
+                    return client
+                except Exception as e:
+                    logger.warning(f"Docker client for {docker_config.get('host', 'local')} failed health check, reconnecting: {e}")
+                    del self._clients[key]
+
+            client = connect_docker(docker_config)
+            # Caches are per client, so a reconnected client needs the configured TTLs again
+            ContainerCache.for_client(client, ttl=docker_config.get('cache_ttl'))
+            ContainerInventory.for_client(client, ttl=docker_config.get('inventory_ttl'))
+            self._clients[key] = (client, time.monotonic())
+            return client
+
+    def version(self, docker_config, check=False):
+        """Return the daemon's version info, fetched once per pooled client
+
+        check forces a fresh ping and version call.
+        """
+        client = self.get(docker_config, check=check)
+        version = None if check else self._versions.get(client)
+        if version is None:
+            version = self._versions[client] = client.version()
+        return version
+
+    def peek(self, docker_config):
+        """Return the pooled client for the config without connecting or checking it"""
+        entry = self._clients.get(self.key(docker_config))
+        return entry[0] if entry else None
+
+    def discard(self, docker_config):
+        """Forget the client for a config so the next get() reconnects"""
+        key = self.key(docker_config)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Not closed: monitors may still hold it, and docker-py reopens connections on demand
+            self._clients.pop(key, None)
+
+
+clients = ClientPool()
+
+
+class DockerHost:
+    """A named Docker endpoint with its client and health state
+
+    After a failed connection the host is reported as down, without trying
+    the daemon again, until its reconnect backoff expires.
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.client = None
+        self.healthy = False
+        self.last_error = None
+        self.last_checked = None
+        self.failures = 0
+        self.retry_at = 0
+        # Held by the one caller retrying an unreachable host; the others report it down
+        self._reconnecting = threading.Lock()
+
+    @property
+    def url(self):
+        return self.config.get('host', 'local')
+
+    def connect(self):
+        """Connect to the daemon, returning the client or None"""
+        location = 'local Docker daemon' if self.url == 'local' else f"Docker host {self.name} at {self.url}"
+        logger.info(f"Attempting to connect to {location}...")
+        try:
+            self.client = clients.get(self.config, check=True)
+            self.healthy = True
+            self.last_error = None
+            self.failures = 0
+            logger.info(f"Successfully connected to {location}: {clients.version(self.config)['Version']}")
+        except docker.errors.DockerException as e:
+            self._mark_unhealthy(e)
+            logger.error(f"Failed to connect to {location}: {e}")
+            logger.error("Please check your Docker host configuration, that the daemon is running and that you have proper permissions.")
+        except Exception as e:
+            self._mark_unhealthy(e)
+            logger.error(f"Unexpected error during Docker client setup for {self.name}: {e}")
+        finally:
+            self.last_checked = time.time()
+        return self.client if self.healthy else None
+
+    def check_health(self):
+        """Ping the daemon and update health state"""
+        if self.client is None:
+            return self.connect() is not None
+        try:
+            self.client.ping()
+            self.healthy = True
+            self.last_error = None
+            self.failures = 0
+        except Exception as e:
+            self._mark_unhealthy(e)
+            clients.discard(self.config)
+            logger.warning(f"Docker host {self.name} is unhealthy: {e}")
+        self.last_checked = time.time()
+        return self.healthy
+
+    def get_client(self):
+        """Return a live pooled client, reconnecting lazily, or None if unreachable
+
+        An unhealthy host is only retried once its backoff has expired, and
+        by one caller at a time, so requests never wait on a dead daemon.
+        """
+        if self.healthy:
+            return self._get_client()
+        if time.monotonic() < self.retry_at or not self._reconnecting.acquire(blocking=False):
+            return None
+        try:
+            return self._get_client()
+        finally:
+            self._reconnecting.release()
+
+    def _get_client(self):
+        try:
+            client = clients.get(self.config)
+        except Exception as e:
+            self._mark_unhealthy(e)
+            logger.debug(f"Docker host {self.name} unavailable, retrying in {self.retry_at - time.monotonic():.0f}s: {e}")
+            return None
+        if client is not self.client:
+            if self.client is not None:
+                logger.info(f"Reconnected to Docker host {self.name}")
+            self.client = client
+        self.healthy = True
+        self.last_error = None
+        self.failures = 0
+        return client
+
+    def _mark_unhealthy(self, error):
+        self.healthy = False
+        self.last_error = str(error)
+        self.failures += 1
+        backoff = self.config.get('reconnect_backoff', DEFAULT_RECONNECT_BACKOFF)
+        self.retry_at = time.monotonic() + min(backoff * 2 ** (self.failures - 1), MAX_RECONNECT_BACKOFF)
+
+
+class HostRegistry:
+    """Named Docker hosts built from the docker and docker_hosts config sections
+
+    The docker section is always the 'default' host; docker_hosts adds
+    more named endpoints (local socket, TCP or TLS) that monitors can
+    target with docker_host.
+    """
+
+    def __init__(self, config):
+        """Initialize hosts from the full application config"""
+        default_config = config.get('docker', {})
+        inherited = {key: default_config[key] for key in INHERITED_KEYS if key in default_config}
+        self.hosts = {DEFAULT_HOST: DockerHost(DEFAULT_HOST, default_config)}
+        for name, host_config in (config.get('docker_hosts') or {}).items():
+            if not isinstance(host_config, dict):
+                logger.warning(f"Invalid configuration for Docker host {name}, skipping")
+                continue
+            self.hosts[name] = DockerHost(name, {**inherited, **host_config})
+
+    def __iter__(self):
+        return iter(self.hosts.values())
+
+    def get(self, name=None):
+        """Get a host by name (the default host if none given)"""
+        return self.hosts.get(name or DEFAULT_HOST)
+
+    def client(self, name=None):
+        """Get the connected client for a host, or None"""
+        host = self.get(name)
+        return host.client if host and host.healthy else None
+
+    def connected(self):
+        """Return the hosts that currently have a working client"""
+        return [host for host in self.hosts.values() if host.healthy]
+
+    def connect_all(self):
+        """Connect to every host concurrently"""
+        self.map(lambda host: host.connect(), healthy_only=False)
+        return self.connected()
+
+    def map(self, func, healthy_only=True):
+        """Run func(host) for each host concurrently
+
+        Returns a dict of host name to result; a host whose call raised maps
+        to the exception so one unreachable daemon never fails the rest.
+        """
+        hosts = self.connected() if healthy_only else list(self.hosts.values())
+        if not hosts:
+            return {}
+        if len(hosts) == 1:
+            return {hosts[0].name: self._call(func, hosts[0])}
+
+        with ThreadPoolExecutor(max_workers=len(hosts), thread_name_prefix='docker-host') as executor:
+            futures = {host.name: executor.submit(self._call, func, host) for host in hosts}
+            return {name: future.result() for name, future in futures.items()}
+
+    @staticmethod
+    def _call(func, host):
+        try:
+            return func(host)
+        except Exception as e:
+            logger.error(f"Error on Docker host {host.name}: {e}")
+            return e
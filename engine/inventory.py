@@ -0,0 +1,141 @@
+"""
+Cached container inventory built from sparse list calls
+"""
+
+import time
+import logging
+import threading
+import weakref
+from collections import namedtuple
+from engine.metrics import DOCKER_LATENCY
+
+logger = logging.getLogger('monitorr.inventory')
+
+_LIST_LATENCY = DOCKER_LATENCY.labels('list')
+
+DEFAULT_TTL = 10
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+# Statuses grouped the way the containers page filters them
+STATUS_GROUPS = {
+    'running': ('running',),
+    'stopped': ('exited', 'dead', 'created'),
+    'other': ('paused', 'restarting', 'removing'),
+}
+
+
+class ContainerSummary:
+    """The fields a container list shows, taken from one list response entry"""
+
+    __slots__ = ('id', 'name', 'image', 'status', 'detail', 'created')
+
+    def __init__(self, id, name, image, status, detail='', created=0):
+        self.id = id
+        self.name = name
+        self.image = image
+        self.status = status
+        self.detail = detail
+        # Epoch seconds, as the list endpoint reports it
+        self.created = created
+
+    @classmethod
+    def from_list(cls, data):
+        """Build a summary from a containers list entry, without inspecting the container"""
+        names = data.get('Names') or []
+        image = data.get('Image') or ''
+        if image.startswith('sha256:'):
+            # The image was removed or untagged after the container was created
+            image = image[7:19]
+        return cls(
+            id=data['Id'],
+            name=names[0].lstrip('/') if names else data['Id'][:12],
+            image=image,
+            status=data.get('State', 'unknown'),
+            detail=data.get('Status', ''),
+            created=data.get('Created', 0)
+        )
+
+    @property
+    def short_id(self):
+        return self.id[:12]
+
+
+ContainerPage = namedtuple('ContainerPage', ['items', 'total', 'page', 'pages', 'per_page'])
+
+
+class ContainerInventory:
+    """Every container on a Docker host, listed in one call and cached for a short TTL
+
+    The list endpoint already returns names, images and states, so no
+    container is inspected. Container events invalidate the cache so pages
+    rendered right after a change are not stale.
+    """
+
+    _instances = weakref.WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, client, ttl=DEFAULT_TTL):
+        """Initialize the inventory for a Docker client"""
+        self.client = client
+        self.ttl = ttl
+        self._containers = None
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_client(cls, client, ttl=None):
+        """Return the inventory shared by everything using this Docker client"""
+        with cls._instances_lock:
+            inventory = cls._instances.get(client)
+            if inventory is None:
+                inventory = cls._instances[client] = cls(client, ttl if ttl is not None else DEFAULT_TTL)
+            elif ttl is not None:
+                inventory.ttl = ttl
+            return inventory
+
+    def list(self, refresh=False):
+        """Return every container, sorted by name; Docker errors are raised to the caller"""
+        with self._lock:
+            if not refresh and self._containers is not None and time.monotonic() < self._expires:
+                return self._containers
+            started = time.monotonic()
+            try:
+                response = self.client.api.containers(all=True)
+            finally:
+                _LIST_LATENCY.observe(time.monotonic() - started)
+            containers = [ContainerSummary.from_list(data) for data in response]
+            containers.sort(key=lambda container: container.name)
+            # Published as a tuple so callers can hold on to it while it is replaced
+            self._containers = tuple(containers)
+            self._expires = time.monotonic() + self.ttl
+            return self._containers
+
+    def invalidate(self):
+        """Drop the cached list so the next call lists the host again"""
+        with self._lock:
+            self._containers = None
+
+
+def filter_containers(containers, text='', status=''):
+    """Containers whose name, image or id contains text and whose status is in the status group"""
+    text = text.strip().lower()
+    statuses = STATUS_GROUPS.get(status)
+    for container in containers:
+        if statuses and container.status not in statuses:
+            continue
+        if text and text not in container.name.lower() and text not in container.image.lower() \
+                and not container.id.startswith(text):
+            continue
+        yield container
+
+
+def paginate(items, page=1, per_page=DEFAULT_PER_PAGE):
+    """Slice a list into a ContainerPage, clamping page and per_page to valid values"""
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    total = len(items)
+    pages = max(1, -(-total // per_page))
+    page = max(1, min(page, pages))
+    start = (page - 1) * per_page
+    return ContainerPage(items[start:start + per_page], total, page, pages, per_page)
@@ -0,0 +1,283 @@
+"""
+Prometheus metrics for Monitorr's own pipeline
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('monitorr.metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans a fast inspect call up to a check that hits its deadline
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    """One labelled counter; a plain attribute increment, for a single writer thread"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _SharedCounterChild(_CounterChild):
+    """A counter child incremented from several threads"""
+
+    __slots__ = ('_lock',)
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    """One labelled histogram; counts per bucket with the cumulative sums built on scrape"""
+
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # The last slot counts observations above every bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _SharedHistogramChild(_HistogramChild):
+    """A histogram child observed from several threads"""
+
+    __slots__ = ('_lock',)
+
+    def __init__(self, bounds):
+        super().__init__(bounds)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.sum += value
+
+
+class _Metric:
+    """A metric family whose label children are bound once and kept by the caller
+
+    Children of a shared metric lock on every update; the others assume a
+    single writer per child (e.g. the thread checking one monitor), so the
+    hot path is a bare attribute update.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), shared=False):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.shared = shared
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Return the child for these label values, creating it on first use"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def remove(self, *values):
+        """Stop exporting the child for these label values"""
+        with self._lock:
+            self._children.pop(tuple(str(value) for value in values), None)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """Yield exposition lines for every child"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _SharedCounterChild() if self.shared else _CounterChild()
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Gauge(_Metric):
+    """A gauge read from a callback at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set_function(self, function, *values):
+        """Report function() for these label values on every scrape"""
+        with self._lock:
+            self._functions[tuple(str(value) for value in values)] = function
+
+    def samples(self):
+        for values, function in list(self._functions.items()):
+            try:
+                value = function()
+            except Exception as e:
+                logger.debug(f"Failed to read gauge {self.name}: {e}")
+                continue
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, shared=False):
+        super().__init__(name, documentation, labelnames, shared)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _SharedHistogramChild(self.buckets) if self.shared else _HistogramChild(self.buckets)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            counts = list(child.counts)
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                total += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {total}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {total}"
+
+
+class Registry:
+    """The metric families exported on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+registry = Registry()
+
+LOG_LINES = registry.register(Counter(
+    'monitorr_log_lines_total', 'Log lines ingested', ['monitor']))
+LOG_BYTES = registry.register(Counter(
+    'monitorr_log_bytes_total', 'Size of ingested log lines (decoded characters)', ['monitor']))
+PATTERN_MATCHES = registry.register(Counter(
+    'monitorr_pattern_matches_total', 'Log lines matched by each error pattern', ['monitor', 'pattern']))
+CHECK_DURATION = registry.register(Histogram(
+    'monitorr_check_duration_seconds', 'Time spent in check_logs', ['monitor']))
+SCHEDULER_LAG = registry.register(Histogram(
+    'monitorr_scheduler_lag_seconds', 'Delay between a check falling due and being dispatched', ['monitor']))
+DOCKER_LATENCY = registry.register(Histogram(
+    'monitorr_docker_request_seconds', 'Docker API request latency', ['call'], shared=True))
+ALERT_QUEUE_DEPTH = registry.register(Gauge(
+    'monitorr_alert_queue_depth', 'Alert deliveries waiting in the outbox'))
+ALERT_SEND_DURATION = registry.register(Histogram(
+    'monitorr_alert_send_seconds', 'Time taken to send an alert', ['alerter'], shared=True))
+ALERT_SEND_FAILURES = registry.register(Counter(
+    'monitorr_alert_send_failures_total', 'Failed alert sends', ['alerter'], shared=True))
+
+
+class MonitorMetrics:
+    """A monitor's metric children, bound once so the hot path never looks up labels"""
+
+    def __init__(self, monitor_name, patterns=()):
+        self.lines = LOG_LINES.labels(monitor_name)
+        self.bytes = LOG_BYTES.labels(monitor_name)
+        self.check_duration = CHECK_DURATION.labels(monitor_name)
+        self.matches = {pattern: PATTERN_MATCHES.labels(monitor_name, pattern) for pattern in patterns}
+
+    def count(self, lines):
+        """Count lines and their size as they pass through a pipeline"""
+        line_count = self.lines
+        byte_count = self.bytes
+        for line in lines:
+            line_count.value += 1
+            byte_count.value += len(line)
+            yield line
+
+    def record_matches(self, matches):
+        """Count matched (line, pattern) pairs per pattern"""
+        for _, pattern in matches:
+            child = self.matches.get(pattern)
+            if child is not None:
+                child.value += 1
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def serve(host='0.0.0.0', port=9108):
+    """Serve /metrics on its own port in a background thread, returning the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics', daemon=True)
+    thread.start()
+    logger.info(f"Metrics listener started on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,188 @@
+"""
+Concurrent scheduler for monitor checks
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from engine.metrics import SCHEDULER_LAG
+
+logger = logging.getLogger('monitorr.scheduler')
+
+OVERRUN_POLICIES = ('skip', 'coalesce')
+
+
+class ScheduledCheck:
+    """State for one periodically scheduled check"""
+
+    def __init__(self, name, func, interval, timeout=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout or interval
+        self.next_run = time.monotonic() + interval
+        self.running = False
+        self.pending = False
+        self.last_started = None
+        self.last_duration = None
+        self.last_lag = 0.0
+        self.lag = SCHEDULER_LAG.labels(name)
+        self.runs = 0
+        self.skipped = 0
+
+
+class MonitorScheduler:
+    """Dispatch due checks onto a bounded thread pool"""
+
+    def __init__(self, workers=4, max_queue=None, overrun='coalesce', tick=0.5):
+        """Initialize scheduler
+
+        workers: number of checks that run at the same time
+        max_queue: checks allowed to wait for a free worker before new
+            dispatches are held back (defaults to the worker count)
+        overrun: what to do when a check is due while its previous run is
+            still going; 'skip' drops the run, 'coalesce' runs once more as
+            soon as the current run finishes
+        """
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Invalid overrun policy: {overrun}")
+
+        self.workers = workers
+        self.max_in_flight = workers + (workers if max_queue is None else max_queue)
+        self.overrun = overrun
+        self.tick = tick
+        self._jobs = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def add(self, name, func, interval, timeout=None, run_now=False):
+        """Schedule func(deadline=...) to run every interval seconds"""
+        job = ScheduledCheck(name, func, interval, timeout)
+        if run_now:
+            job.next_run = time.monotonic()
+        with self._lock:
+            self._jobs[name] = job
+        return job
+
+    def remove(self, name):
+        """Stop scheduling a check; a run in progress is allowed to finish"""
+        with self._lock:
+            self._jobs.pop(name, None)
+
+    def clear(self):
+        """Remove all scheduled checks"""
+        with self._lock:
+            self._jobs.clear()
+
+    def run_now(self, name):
+        """Make a check due immediately, returning False if it does not exist"""
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is None:
+                return False
+            if job.running:
+                job.pending = True
+            else:
+                job.next_run = time.monotonic()
+            return True
+
+    def jobs(self):
+        """Return a snapshot of the scheduled checks"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def start(self):
+        """Start the dispatch thread and worker pool"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='check')
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Scheduler started with {self.workers} workers")
+
+    def stop(self, wait=True):
+        """Stop dispatching and shut down the worker pool"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def _run(self):
+        """Dispatch loop"""
+        while not self._stop_event.wait(self.tick):
+            try:
+                self._dispatch()
+            except Exception as e:
+                logger.error(f"Error dispatching scheduled checks: {e}")
+
+    def _dispatch(self):
+        """Submit every due check that has capacity, most overdue first"""
+        now = time.monotonic()
+        with self._lock:
+            due = sorted((job for job in self._jobs.values() if job.next_run <= now), key=lambda job: job.next_run)
+            for index, job in enumerate(due):
+                if job.running:
+                    self._handle_overrun(job, now)
+                    continue
+
+                # Backpressure: leave the remaining checks due until workers free up
+                if self._in_flight >= self.max_in_flight:
+                    waiting = sum(1 for job in due[index:] if not job.running)
+                    logger.warning(f"Scheduler saturated, {waiting} due checks waiting for a free worker")
+                    break
+
+                self._submit(job, now)
+
+    def _submit(self, job, now):
+        """Hand a check to the worker pool; called with the lock held"""
+        job.running = True
+        job.last_lag = now - job.next_run
+        job.lag.observe(job.last_lag)
+        job.next_run = self._next_run(job, now)
+        self._in_flight += 1
+        self._executor.submit(self._execute, job)
+
+    def _handle_overrun(self, job, now):
+        """Apply the overrun policy to a check that is still running; called with the lock held"""
+        job.skipped += 1
+        job.next_run = self._next_run(job, now)
+        if self.overrun == 'coalesce':
+            job.pending = True
+        logger.warning(f"Check {job.name} still running after {job.interval}s, {'coalescing' if job.pending else 'skipping'} next run")
+
+    @staticmethod
+    def _next_run(job, now):
+        """Next run time on the original grid, without bursting to catch up"""
+        next_run = job.next_run + job.interval
+        if next_run <= now:
+            next_run = now + job.interval
+        return next_run
+
+    def _execute(self, job):
+        """Run a check on a worker thread"""
+        started = time.monotonic()
+        job.last_started = started
+        try:
+            job.func(deadline=started + job.timeout)
+        except Exception as e:
+            logger.error(f"Scheduled check {job.name} failed: {e}")
+        finally:
+            duration = time.monotonic() - started
+            if duration > job.timeout:
+                logger.warning(f"Check {job.name} took {duration:.1f}s, exceeding its {job.timeout}s deadline")
+            with self._lock:
+                job.running = False
+                job.runs += 1
+                job.last_duration = duration
+                self._in_flight -= 1
+                if job.pending:
+                    job.pending = False
+                    job.next_run = time.monotonic()
@@ -0,0 +1,165 @@
+"""
+Background snapshot of monitored container states
+"""
+
+import time
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+from engine.metrics import DOCKER_LATENCY
+
+logger = logging.getLogger('monitorr.status')
+
+_LIST_LATENCY = DOCKER_LATENCY.labels('list')
+
+DEFAULT_INTERVAL = 10
+
+# Bursts of container events (e.g. a compose restart) are coalesced into one refresh
+EVENT_DEBOUNCE = 0.5
+
+ContainerStatus = namedtuple('ContainerStatus', ['container_name', 'host', 'id', 'status', 'detail'])
+
+
+class StatusSnapshot:
+    """Immutable container states for every monitor at one point in time"""
+
+    __slots__ = ('statuses', 'taken_at', 'payload')
+
+    def __init__(self, statuses, taken_at=None):
+        self.statuses = MappingProxyType(dict(statuses))
+        self.taken_at = time.time() if taken_at is None else taken_at
+        # Built once so readers only ever look things up
+        self.payload = MappingProxyType({
+            'taken_at': datetime.fromtimestamp(self.taken_at).isoformat(),
+            'monitors': {name: dict(status._asdict()) for name, status in self.statuses.items()}
+        })
+
+    def get(self, monitor_name):
+        """Status of a monitor's container, or None if the monitor was not in the snapshot"""
+        return self.statuses.get(monitor_name)
+
+    def status_of(self, monitor_name, default='unknown'):
+        status = self.statuses.get(monitor_name)
+        return status.status if status else default
+
+    @property
+    def age(self):
+        return time.time() - self.taken_at
+
+
+class StatusService:
+    """Refresh container states with one filtered list call per Docker host
+
+    A background thread refreshes every interval seconds, and sooner when
+    a container event arrives. Readers get the latest snapshot without
+    touching Docker; if the thread is not running (e.g. web-only mode) a
+    stale snapshot is refreshed on read instead.
+    """
+
+    def __init__(self, get_monitors, hosts, interval=DEFAULT_INTERVAL):
+        """Initialize the service
+
+        get_monitors returns the current {name: monitor} mapping and hosts is
+        the HostRegistry the monitors' docker_host names refer to.
+        """
+        self.get_monitors = get_monitors
+        self.hosts = hosts
+        self.interval = interval
+        self._snapshot = StatusSnapshot({}, taken_at=0)
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    @property
+    def snapshot(self):
+        """Latest snapshot, refreshed inline only when no background thread keeps it fresh"""
+        snapshot = self._snapshot
+        if not self.running and snapshot.age >= self.interval:
+            snapshot = self.refresh()
+        return snapshot
+
+    def start(self):
+        """Start refreshing in the background"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='container-status', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop refreshing"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def request_refresh(self):
+        """Refresh soon, e.g. because a container event arrived"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.refresh()
+            if self._wakeup.wait(self.interval):
+                self._wakeup.clear()
+                self._stop_event.wait(EVENT_DEBOUNCE)
+                self._wakeup.clear()
+
+    def refresh(self):
+        """List every host's monitored containers and publish a new snapshot"""
+        with self._refresh_lock:
+            names_by_host = {}
+            for monitor_name, monitor in list(self.get_monitors().items()):
+                names_by_host.setdefault(monitor.docker_host, {}).setdefault(monitor.container_name, []).append(monitor_name)
+
+            def list_host(host):
+                names = names_by_host.get(host.name)
+                if not names:
+                    return []
+                client = host.get_client()
+                if client is None:
+                    raise ConnectionError(host.last_error or "not connected")
+                # The name filter matches substrings, so exact names are picked out below
+                started = time.monotonic()
+                try:
+                    return client.api.containers(all=True, filters={'name': list(names)})
+                finally:
+                    _LIST_LATENCY.observe(time.monotonic() - started)
+
+            results = self.hosts.map(list_host, healthy_only=False)
+
+            statuses = {}
+            for host_name, names in names_by_host.items():
+                result = results.get(host_name)
+                if result is None and self.hosts.get(host_name) is None:
+                    result = LookupError(f"Unknown Docker host {host_name}")
+                if isinstance(result, Exception):
+                    for container_name, monitor_names in names.items():
+                        for monitor_name in monitor_names:
+                            statuses[monitor_name] = ContainerStatus(container_name, host_name, None, 'unreachable', str(result))
+                    continue
+
+                found = {}
+                for container in result or []:
+                    for name in container.get('Names') or []:
+                        found[name.lstrip('/')] = container
+                for container_name, monitor_names in names.items():
+                    container = found.get(container_name)
+                    if container is None:
+                        status = ContainerStatus(container_name, host_name, None, 'not found', None)
+                    else:
+                        status = ContainerStatus(container_name, host_name, container.get('Id'),
+                                                 container.get('State', 'unknown'), container.get('Status'))
+                    for monitor_name in monitor_names:
+                        statuses[monitor_name] = status
+
+            self._snapshot = StatusSnapshot(statuses)
+            return self._snapshot
@@ -0,0 +1,187 @@
+"""
+Shared live tails of container logs
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from monitors.checkpoint import LogCursor
+
+logger = logging.getLogger('monitorr.tail')
+
+# Lines held for a viewer that has fallen behind before the oldest are dropped
+DEFAULT_BACKLOG = 1000
+
+
+class TailSubscriber:
+    """Bounded queue of new lines for one viewer"""
+
+    def __init__(self, backlog=DEFAULT_BACKLOG):
+        self._lines = deque(maxlen=backlog)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, line):
+        with self._cond:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """Wait up to timeout seconds and return (queued lines, lines dropped since the last call)"""
+        with self._cond:
+            if not self._lines and not self.closed:
+                self._cond.wait(timeout)
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self.dropped = self.dropped, 0
+            return lines, dropped
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class LogTail:
+    """One Docker follow stream for a container, fanned out to every subscriber
+
+    opener(since) must return (stream, lines) for a follow stream starting
+    at the whole-second since. The stream is reopened from the last line
+    seen if it ends (e.g. the container restarted), so viewers get no
+    gaps or repeats.
+    """
+
+    def __init__(self, key, opener, max_reconnect_delay=30):
+        self.key = key
+        self.opener = opener
+        self.max_reconnect_delay = max_reconnect_delay
+        # Only lines logged after the tail started are pushed
+        self.cursor = LogCursor(nanos=time.time_ns())
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._stream = None
+        self._thread = None
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def add(self, subscriber):
+        with self._lock:
+            self._subscribers.append(subscriber)
+        if not (self._thread and self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name=f"tail-{self.key[1]}", daemon=True)
+            self._thread.start()
+
+    def remove(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+        subscriber.close()
+
+    def stop(self):
+        """Close the follow stream and every subscriber without waiting for the thread"""
+        self._stop_event.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                logger.debug(f"Error closing live tail for {self.key}: {e}")
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def _publish(self, line):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(line)
+
+    def _run(self):
+        """Follow the container's logs, reconnecting with backoff"""
+        delay = 1
+        while not self._stop_event.is_set():
+            try:
+                self._stream, lines = self.opener(self.cursor.since())
+                if self._stop_event.is_set():
+                    # Stopped while connecting, before the stream could be closed
+                    break
+                delay = 1
+                for line in lines:
+                    if self._stop_event.is_set():
+                        break
+                    if self.cursor.accept(line):
+                        self._publish(line)
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                logger.warning(f"Live tail for {self.key} interrupted: {e}")
+            finally:
+                stream, self._stream = self._stream, None
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+
+            if self._stop_event.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+
+class TailHub:
+    """Live tails started with the first viewer and stopped with the last
+
+    Tails are keyed by (host, container name, streams).
+    """
+
+    def __init__(self):
+        self._tails = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key, opener, backlog=DEFAULT_BACKLOG):
+        """Subscribe to new lines for a container, starting its tail if needed"""
+        subscriber = TailSubscriber(backlog)
+        with self._lock:
+            tail = self._tails.get(key)
+            if tail is None:
+                tail = self._tails[key] = LogTail(key, opener)
+                logger.info(f"Started live tail for {key[1]}")
+            tail.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, key, subscriber):
+        """Remove a subscriber, stopping the tail once nobody is watching"""
+        with self._lock:
+            tail = self._tails.get(key)
+            if tail is None:
+                subscriber.close()
+                return
+            tail.remove(subscriber)
+            if not len(tail):
+                del self._tails[key]
+                tail.stop()
+                logger.info(f"Stopped live tail for {key[1]}")
+
+    def viewers(self, key):
+        """Number of subscribers watching a container"""
+        with self._lock:
+            tail = self._tails.get(key)
+            return len(tail) if tail else 0
+
+    def stop(self):
+        """Stop every tail"""
+        with self._lock:
+            tails, self._tails = list(self._tails.values()), {}
+        for tail in tails:
+            tail.stop()
+
+
+# Shared by every request so viewers of the same container share one stream
+tails = TailHub()
@@ -7,9 +7,9 @@ import os
 import sys
 import time
 import yaml
-import docker
+import signal
 import logging
-import schedule
+import functools
 import threading
 import argparse
 from datetime import datetime
@@ -17,7 +17,17 @@ from dotenv import load_dotenv
 
 # Local imports
 from monitors import get_monitor
+from monitors.checkpoint import CheckpointStore
 from alerts import AlertManager
+from engine import MonitorScheduler
+from engine.cache import ContainerCache
+from engine.inventory import ContainerInventory
+from engine.events import DockerEventWatcher
+from engine.hosts import HostRegistry, DEFAULT_HOST
+from engine.tail import tails
+from engine.status import StatusService
+from engine import metrics
+from storage import EventStore, LogArchive
 
 # Set up logging with absolute path
 log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
@@ -63,6 +73,9 @@ except Exception as e:
     print(f"Error setting up logging: {e}")
     sys.exit(1)
 
+# Directory for persistent state such as log checkpoints
+data_dir = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
 # Log startup information
 logger.info(f"Starting Monitorr with log file at: {log_file}")
 logger.info(f"Current working directory: {os.getcwd()}")
@@ -133,75 +146,205 @@ class Monitorr:
         load_dotenv()
         self.config = load_config()
         
-        # Initialize Docker client
-        self.docker_client = self._setup_docker_client()
-        
-        self.alert_manager = AlertManager(self.config['alerts'])
+        # Connect to every configured Docker host; docker_client is the default host's client
+        self.docker_hosts = HostRegistry(self.config)
+        self.docker_hosts.connect_all()
+        self.docker_client = self.docker_hosts.client()
+
+        self.alert_manager = AlertManager(self.config['alerts'], data_dir=data_dir)
+        self.checkpoints = self._setup_checkpoints()
+        self.events = self._setup_event_store()
+        self.archive = self._setup_archive()
+        self.scheduler = self._setup_scheduler()
+        self.async_engines = []
+        self.event_watchers = {}
         self.monitors = {}
         self._setup_monitors()
-    
-    def _setup_docker_client(self):
-        """Set up Docker client based on configuration"""
-        # Get Docker connection settings
-        docker_config = self.config.get('docker', {})
-        docker_host = docker_config.get('host', 'local')
-        use_tls = docker_config.get('tls', False)
-        timeout = docker_config.get('timeout', 10)
+
+        # Container states for the web interface, refreshed in the background
+        self.status = StatusService(
+            lambda: self.monitors,
+            self.docker_hosts,
+            interval=self.config.get('status', {}).get('refresh_interval', 10)
+        )
+
+        # True once start() runs; web-only mode never starts background services
+        self._monitoring = False
+
+        # Set by SIGTERM (e.g. docker stop) to leave the main loop and shut down cleanly
+        self._stop_requested = threading.Event()
+        self._shut_down = False
         
-        # Connect to Docker
+    def _setup_checkpoints(self):
+        """Set up the durable log cursor store"""
+        checkpoint_config = self.config.get('checkpoints', {})
+        path = checkpoint_config.get('path', os.path.join(data_dir, 'checkpoints.json'))
+        flush_interval = checkpoint_config.get('flush_interval', 30)
+        return CheckpointStore(path, flush_interval=flush_interval)
+        
+    def _setup_event_store(self):
+        """Set up the error history database, or None if disabled"""
+        history_config = self.config.get('history', {})
+        if not history_config.get('enabled', True):
+            return None
         try:
-            if docker_host == 'local':
-                # Connect to local Docker daemon
-                logger.info("Attempting to connect to local Docker daemon...")
-                try:
-                    client = docker.from_env(timeout=timeout)
-                    # Test connection
-                    client.ping()
-                    logger.info(f"Successfully connected to local Docker daemon: {client.version()['Version']}")
-                    return client
-                except docker.errors.DockerException as e:
-                    logger.error(f"Failed to connect to local Docker daemon: {e}")
-                    logger.error("Please ensure Docker daemon is running and you have proper permissions.")
-                    return None
-            else:
-                # Connect to remote Docker host
-                tls_config = None
-                if use_tls:
-                    cert_path = docker_config.get('tls_cert_path')
-                    key_path = docker_config.get('tls_key_path')
-                    ca_path = docker_config.get('tls_ca_path')
-                    
-                    if cert_path and key_path and ca_path:
-                        tls_config = docker.tls.TLSConfig(
-                            client_cert=(cert_path, key_path),
-                            ca_cert=ca_path,
-                            verify=True
-                        )
-                
-                logger.info(f"Attempting to connect to remote Docker host at {docker_host}...")
-                try:
-                    client = docker.DockerClient(
-                        base_url=docker_host,
-                        tls=tls_config,
-                        timeout=timeout
-                    )
-                    # Test connection
-                    client.ping()
-                    logger.info(f"Successfully connected to remote Docker host: {client.version()['Version']}")
-                    return client
-                except docker.errors.DockerException as e:
-                    logger.error(f"Failed to connect to remote Docker host: {e}")
-                    logger.error("Please check your Docker host configuration and network connectivity.")
-                    return None
-                
+            return EventStore(
+                history_config.get('path', os.path.join(data_dir, 'history.db')),
+                flush_interval=history_config.get('flush_interval', 2),
+                retention_days=history_config.get('retention_days', 7),
+                hour_retention_days=history_config.get('rollup_retention_days', 90)
+            )
+        except Exception as e:
+            logger.error(f"Failed to open error history database: {e}")
+            return None
+
+    def _setup_archive(self):
+        """Set up the local log archive, or None unless enabled"""
+        archive_config = self.config.get('archive', {})
+        if not archive_config.get('enabled', False):
+            return None
+        max_size_mb = archive_config.get('max_size_mb')
+        try:
+            return LogArchive(
+                archive_config.get('path', os.path.join(data_dir, 'archive')),
+                compression=archive_config.get('compression', 'gzip'),
+                segment_bytes=archive_config.get('segment_size_mb', 64) * 1024 * 1024,
+                max_age_days=archive_config.get('retention_days', 14),
+                block_age=archive_config.get('block_age_seconds', 60),
+                max_bytes=max_size_mb * 1024 * 1024 if max_size_mb else None
+            )
         except Exception as e:
-            logger.error(f"Unexpected error during Docker client setup: {e}")
+            logger.error(f"Failed to open log archive: {e}")
             return None
+
+    def _setup_scheduler(self):
+        """Set up the worker pool that runs monitor checks"""
+        scheduler_config = self.config.get('scheduler', {})
+        return MonitorScheduler(
+            workers=scheduler_config.get('workers', 4),
+            max_queue=scheduler_config.get('max_queue'),
+            overrun=scheduler_config.get('overrun', 'coalesce')
+        )
+
+    def _monitors_by_host(self):
+        """Group monitors by the Docker host they target"""
+        groups = {}
+        for monitor_name, monitor in self.monitors.items():
+            groups.setdefault(monitor.docker_host, {})[monitor_name] = monitor
+        return groups
+
+    def _start_ingestion(self, run_now=False):
+        """Start reading logs with the configured engine"""
+        if self.config.get('docker', {}).get('engine', 'threads') == 'asyncio':
+            from engine.aio import AsyncEngine, AsyncDockerClient
+            # One event loop per Docker host
+            for host_name, monitors in self._monitors_by_host().items():
+                client = AsyncDockerClient.from_config(self.docker_hosts.get(host_name).config)
+                engine = AsyncEngine(monitors, client)
+                engine.start()
+                self.async_engines.append(engine)
+        else:
+            self._schedule_monitors(run_now=run_now)
+        self._start_services()
+
+    def _start_services(self):
+        """Start the background services monitors rely on; safe to call again
+
+        Runs whenever monitoring is active, so monitors added later through
+        the web interface still get a running scheduler.
+        """
+        if not self._monitoring or not self.docker_hosts.connected():
+            return
+        self.checkpoints.start()
+        self.alert_manager.start()
+        if self.events:
+            self.events.start()
+        if self.archive:
+            self.archive.start()
+        self.status.start()
+        self._start_event_watchers()
+        self.scheduler.start()
+
+    def _start_event_watchers(self):
+        """Subscribe to container events so monitors follow recreated containers"""
+        if not self.config.get('docker', {}).get('events', True) or self.async_engines:
+            return
+        for host in self.docker_hosts.connected():
+            watcher = self.event_watchers.get(host.name)
+            if not watcher:
+                callback = functools.partial(self._handle_container_event, host.name)
+                watcher = self.event_watchers[host.name] = DockerEventWatcher(host.client, callback)
+            watcher.start()
+        self._mark_event_driven()
+
+    def _mark_event_driven(self):
+        """Let monitors on hosts with a running event watcher pause quietly"""
+        for monitor in self.monitors.values():
+            watcher = self.event_watchers.get(monitor.docker_host)
+            monitor.event_driven = bool(watcher and watcher.running)
+
+    def _handle_container_event(self, host_name, event):
+        """Re-bind, pause or resume monitors when their container changes"""
+        action = event.get('Action')
+        actor = event.get('Actor', {})
+        attributes = actor.get('Attributes', {})
+        name = attributes.get('name')
+        old_name = attributes.get('oldName', '').lstrip('/')
+
+        # Ids change when a container is recreated, so drop cached handles first
+        client = self.docker_hosts.get(host_name).client
+        cache = ContainerCache.for_client(client)
+        for key in (actor.get('ID'), name, old_name):
+            if key:
+                cache.invalidate(key)
+        ContainerInventory.for_client(client).invalidate()
+
+        if any(monitor.docker_host == host_name and monitor.container_name in (name, old_name)
+               for monitor in self.monitors.values()):
+            self.status.request_refresh()
+
+        for monitor_name, monitor in list(self.monitors.items()):
+            if monitor.docker_host != host_name:
+                continue
+            if monitor.container_name == name and action in ('create', 'start', 'rename'):
+                monitor.resume()
+                if action == 'start' and not monitor.follow:
+                    self.scheduler.run_now(monitor_name)
+            elif monitor.container_name == name and action == 'die':
+                # Read the final lines before pausing a polling monitor
+                monitor.pause(drain=not monitor.follow)
+                if not monitor.follow:
+                    self.scheduler.run_now(monitor_name)
+            elif monitor.container_name == name and action == 'destroy':
+                monitor.pause()
+            elif monitor.container_name == old_name and action == 'rename':
+                monitor.pause()
+
+    def _stop_ingestion(self):
+        """Stop the asyncio engine and any follow streams"""
+        for engine in self.async_engines:
+            engine.stop()
+        self.async_engines = []
+        self._stop_follow_streams()
+
+    def _schedule_monitors(self, run_now=False):
+        """Start follow streams and schedule polling checks for all monitors"""
+        for monitor_name, monitor in self.monitors.items():
+            if not monitor.config.get('enabled', True):  # Only schedule enabled monitors
+                continue
+            if monitor.follow:
+                monitor.start_follow()
+                logger.info(f"Following {monitor_name} monitor logs")
+                continue
+            interval = monitor.config.get('check_interval', 60)
+            timeout = monitor.config.get('check_timeout', interval)
+            self.scheduler.add(monitor_name, monitor.check_logs, interval, timeout=timeout, run_now=run_now)
+            logger.info(f"Scheduled {monitor_name} monitor to run every {interval} seconds")
         
     def _setup_monitors(self):
         """Set up container monitors based on configuration"""
-        # If no Docker client, don't set up monitors
-        if not self.docker_client:
+        # If no Docker host is reachable, don't set up monitors
+        if not self.docker_hosts.connected():
             logger.warning("No Docker client available, skipping monitor setup")
             return
         
@@ -219,6 +362,13 @@ class Monitorr:
             if not monitor_config.get('enabled', False):
                 continue
                 
+            # Each monitor names the Docker host it targets
+            host_name = monitor_config.get('docker_host', DEFAULT_HOST)
+            docker_client = self.docker_hosts.client(host_name)
+            if not docker_client:
+                logger.warning(f"Docker host {host_name} not available, skipping monitor {monitor_name}")
+                continue
+                
             try:
                 # Get monitor type from config
                 monitor_type = monitor_config.get('monitor_type', 'generic')
@@ -226,46 +376,56 @@ class Monitorr:
                 
                 if monitor_class:
                     self.monitors[monitor_name] = monitor_class(
-                        self.docker_client,
+                        docker_client,
                         monitor_config,
                         self.alert_manager
                     )
+                    self.monitors[monitor_name].cursor = self.checkpoints.cursor(self._checkpoint_key(monitor_config))
+                    self.monitors[monitor_name].name = monitor_name
+                    if self.config.get('metrics', {}).get('enabled', True):
+                        self.monitors[monitor_name].metrics = metrics.MonitorMetrics(
+                            monitor_name, self.monitors[monitor_name].matcher.errors.patterns)
+                    if self.archive:
+                        self.monitors[monitor_name].archive = self.archive.container(self._checkpoint_key(monitor_config))
+                    if self.events:
+                        self.monitors[monitor_name].sinks.append(self.events)
                     logger.info(f"Initialized {monitor_type} monitor for {monitor_name}")
                 else:
                     logger.warning(f"No monitor class found for type {monitor_type}")
             except Exception as e:
                 logger.error(f"Failed to initialize monitor {monitor_name}: {e}")
     
+    @staticmethod
+    def _checkpoint_key(monitor_config):
+        """Checkpoint key for a monitor; container names are only unique per host"""
+        container_name = monitor_config.get('container_name')
+        host_name = monitor_config.get('docker_host', DEFAULT_HOST)
+        return container_name if host_name == DEFAULT_HOST else f"{host_name}/{container_name}"
+    
     def reload_monitors(self):
         """Reload monitors from configuration"""
         try:
-            # Clear existing monitors and schedules
+            # Stop streams, then clear existing monitors and schedules
+            self._stop_ingestion()
             self.monitors.clear()
-            schedule.clear()
+            self.scheduler.clear()
             
             # Reload configuration
             self.config = load_config()
             
-            # Ensure Docker client is available
-            if not self.docker_client:
+            # Ensure a Docker client is available
+            if not self.docker_hosts.connected():
                 logger.error("Cannot reload monitors: Docker client not available")
                 return False
                 
             # Set up monitors again
             self._setup_monitors()
+            self.status.request_refresh()
             
-            # Reschedule monitors
+            # Reschedule monitors, running an initial check right away
             if self.monitors:
-                for monitor_name, monitor in self.monitors.items():
-                    if monitor.config.get('enabled', True):  # Only schedule enabled monitors
-                        interval = monitor.config.get('check_interval', 60)
-                        schedule.every(interval).seconds.do(monitor.check_logs)
-                        logger.info(f"Rescheduled {monitor_name} monitor to run every {interval} seconds")
-                
-                # Run initial check for all monitors
-                for monitor in self.monitors.values():
-                    if monitor.config.get('enabled', True):
-                        monitor.check_logs()
+                self._mark_event_driven()
+                self._start_ingestion(run_now=True)
                 
                 logger.info("Successfully reloaded and started all monitors")
                 return True
@@ -281,15 +441,24 @@ class Monitorr:
         """Start the monitoring process"""
         logger.info("Starting Monitorr...")
         
-        # Only start monitoring if Docker client is available and monitors are configured
-        if self.docker_client and self.monitors:
-            # Set up schedules
-            for monitor_name, monitor in self.monitors.items():
-                interval = monitor.config.get('check_interval', 60)
-                schedule.every(interval).seconds.do(monitor.check_logs)
-                logger.info(f"Scheduled {monitor_name} monitor to run every {interval} seconds")
+        self._monitoring = True
+        if not self.docker_hosts.connected():
+            logger.warning("Docker client not available. Monitoring will not be active.")
+        elif self.monitors:
+            # Set up follow streams and schedules, then the services behind them
+            self._start_ingestion()
         else:
-            logger.warning("Docker client not available or no monitors configured. Monitoring will not be active.")
+            # Monitors added later through the web interface start on reload
+            logger.warning("No monitors configured yet.")
+            self._start_services()
+        
+        # Without the web interface, metrics can still be scraped from their own listener
+        metrics_config = self.config.get('metrics', {})
+        if not with_web and metrics_config.get('enabled', True) and metrics_config.get('listen', False):
+            try:
+                metrics.serve(metrics_config.get('host', '0.0.0.0'), metrics_config.get('port', 9108))
+            except OSError as e:
+                logger.error(f"Failed to start metrics listener: {e}")
         
         # Start web interface if requested
         if with_web:
@@ -313,14 +482,53 @@ class Monitorr:
             web_thread.start()
             logger.info(f"Web interface started on http://{web_host}:{web_port}")
         
-        # Main loop
+        # Main loop; checks run on the scheduler's worker pool
+        self._install_signal_handlers()
         try:
-            while True:
-                if self.docker_client and self.monitors:
-                    schedule.run_pending()
+            while not self._stop_requested.is_set():
                 time.sleep(1)
         except KeyboardInterrupt:
-            logger.info("Shutting down Monitorr...")
+            pass
+        logger.info("Shutting down Monitorr...")
+        self.shutdown()
+
+    def _install_signal_handlers(self):
+        """Shut down cleanly on SIGTERM, which docker stop sends before SIGKILL"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGTERM, self._handle_signal)
+
+    def _handle_signal(self, signum, frame):
+        logger.info(f"Received signal {signum}")
+        self._stop_requested.set()
+
+    def stop(self):
+        """Ask the main loop to exit and shut down"""
+        self._stop_requested.set()
+
+    def shutdown(self):
+        """Stop background streams and workers, flushing checkpoints, alerts and the archive"""
+        if self._shut_down:
+            return
+        self._shut_down = True
+        for watcher in self.event_watchers.values():
+            watcher.stop()
+        self.scheduler.stop()
+        self._stop_ingestion()
+        self.checkpoints.stop()
+        self.alert_manager.stop()
+        if self.events:
+            self.events.stop()
+        if self.archive:
+            self.archive.stop()
+        self.status.stop()
+        tails.stop()
+
+    def _stop_follow_streams(self):
+        """Stop follow streams for all monitors"""
+        for monitor in self.monitors.values():
+            if monitor.follow:
+                monitor.stop_follow()
 
 def start_web_only(host='0.0.0.0', port=5000):
     """Start only the web interface without monitoring"""
@@ -2,83 +2,360 @@
 Base monitor class for container logs
 """
 
-import re
+import time
 import logging
+import threading
 from datetime import datetime, timedelta
+from monitors.checkpoint import LogCursor
+from monitors.matcher import PatternMatcher
+from monitors.templates import TemplateMiner
+from monitors.rate import RateEvaluator
+from monitors.ring import LineRing
+from monitors.pipeline import iter_lines, iter_until, iter_new_lines, iter_errors
+from monitors.framing import STREAM_IDS, iter_frame_lines, open_log_stream
+from engine.cache import ContainerCache
+from engine.metrics import DOCKER_LATENCY
+from engine.hosts import DEFAULT_HOST
 
 logger = logging.getLogger('monitorr.monitor')
 
+_LOGS_LATENCY = DOCKER_LATENCY.labels('logs')
+
 class BaseMonitor:
     def __init__(self, docker_client, config, alert_manager):
         """Initialize base monitor with configuration"""
         self.docker_client = docker_client
+        self.containers = ContainerCache.for_client(docker_client) if docker_client else None
         self.config = config
         self.alert_manager = alert_manager
         self.container_name = config.get('container_name')
+        # Replaced with the monitor's config key by Monitorr
+        self.name = self.container_name
+        self.docker_host = config.get('docker_host', DEFAULT_HOST)
         self.error_patterns = config.get('error_patterns', [])
         self.ignore_patterns = config.get('ignore_patterns', [])
         self.last_check_time = None
-        self.compiled_error_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.error_patterns]
-        self.compiled_ignore_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.ignore_patterns]
+        self._last_check_epoch = None
+        # Replaced with a durable cursor from the checkpoint store when one is configured
+        self.cursor = LogCursor()
+        self._compile_patterns()
+
+        # Upper bound on error lines held for a single alert
+        self.max_errors = config.get('max_errors_per_check', 500)
+
+        # Groups near-identical error lines under one fingerprint
+        self.templates = TemplateMiner.from_config(config.get('templates'))
+
+        # Only alert once alert_threshold matches occur within alert_interval seconds
+        self.rate = RateEvaluator.from_config(config, max_pending=self.max_errors)
+        self.alert_rate = None
+        self._report_lock = threading.Lock()
+
+        # Objects with record_errors(monitor, matches) that see every match, e.g. the event store
+        self.sinks = []
+
+        # Container log archive every new line is written to, when archiving is enabled
+        self.archive = None
+
+        # MonitorMetrics bound to the monitor's name by Monitorr; None leaves it uninstrumented
+        self.metrics = None
+
+        # Recent lines kept in memory so the log viewer can skip a Docker round trip
+        self.ring = LineRing.from_config(config)
+
+        # Which output streams to scan (stdout, stderr)
+        self.streams = tuple(STREAM_IDS[name] for name in config.get('streams', ['stdout', 'stderr']))
+
+        # Follow mode keeps one streaming connection open instead of polling
+        self.follow = config.get('follow', False)
+        self.reconnect_delay = config.get('reconnect_delay', 5)
+        self.max_reconnect_delay = config.get('max_reconnect_delay', 60)
+        self._check_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        # Set when Docker events drive this monitor, so missing containers pause it quietly
+        self.event_driven = False
+        self._active = threading.Event()
+        self._active.set()
+        self._drain = False
+        self._wakeup = threading.Event()
+        self._follow_thread = None
+        self._follow_stream = None
+        
+    def _compile_patterns(self):
+        """Compile error and ignore patterns into the matcher"""
+        self.matcher = PatternMatcher(self.error_patterns, self.ignore_patterns)
         
     def get_container(self):
-        """Get the container object by name"""
+        """Get a cached handle (id, status, log config) for the container by name"""
         try:
-            return self.docker_client.containers.get(self.container_name)
+            return self.containers.get(self.container_name)
         except Exception as e:
             logger.error(f"Failed to get container {self.container_name}: {e}")
             return None
     
-    def check_logs(self):
-        """Check container logs for errors"""
+    @property
+    def paused(self):
+        return not self._active.is_set()
+
+    def pause(self, drain=False):
+        """Stop checking until the container is started again
+
+        With drain=True one more check is allowed so the container's final
+        lines (often the crash itself) are still read.
+        """
+        self._drain = drain
+        if self._active.is_set():
+            self._active.clear()
+            logger.info(f"Paused monitoring for {self.container_name}")
+
+    def resume(self):
+        """Resume checking and reconnect a follow stream right away"""
+        if not self._active.is_set():
+            logger.info(f"Resumed monitoring for {self.container_name}")
+        self._active.set()
+        self._wakeup.set()
+
+    def _container_missing(self):
+        """Handle a container that could not be found"""
+        if self.event_driven:
+            # A create or start event will resume the monitor
+            logger.info(f"Container {self.container_name} not found, waiting for it to be created")
+            self.pause()
+        else:
+            logger.warning(f"Container {self.container_name} not found")
+
+    def check_logs(self, deadline=None):
+        """Check container logs for errors
+
+        deadline is a time.monotonic() value after which the check stops
+        reading; the cursor keeps its place so the next check resumes there.
+        """
+        if self.paused and not self._drain:
+            return
+
+        # Never run two checks of the same container at once
+        if not self._check_lock.acquire(blocking=False):
+            logger.info(f"Check for {self.container_name} already running, skipping")
+            return
+        started = time.monotonic()
+        try:
+            self._drain = False
+            self._check_logs(deadline)
+        finally:
+            if self.metrics is not None:
+                self.metrics.check_duration.observe(time.monotonic() - started)
+            self._check_lock.release()
+
+    def _check_logs(self, deadline):
+        """Fetch and process logs since the cursor"""
         container = self.get_container()
         if not container:
-            logger.warning(f"Container {self.container_name} not found")
+            self._container_missing()
             return
         
-        # Only get logs since last check
-        since = None
-        if self.last_check_time:
-            since = self.last_check_time
+        # Only get logs since the last processed line (or the last check if none arrived)
+        since = self.cursor.since() or self._last_check_epoch
         
-        # Get logs for the container
+        # Stream logs for the container instead of buffering the whole response
+        stream = None
         try:
-            logs = container.logs(
-                since=since,
-                timestamps=True,
-                tail='all',
-                stream=False
-            ).decode('utf-8')
+            check_started = int(time.time())
+            stream, lines = self._open_logs(container, since=since, tail='all')
             
+            self.process_logs(iter_until(lines, deadline), container)
             self.last_check_time = datetime.now()
-            self.process_logs(logs, container)
+            if deadline is not None and time.monotonic() > deadline:
+                logger.warning(f"Check for {self.container_name} hit its deadline, resuming from the cursor next time")
+            else:
+                self._last_check_epoch = check_started
+                if self.ring is not None:
+                    # Everything logged before the check started has now been read
+                    self.ring.mark_synced(check_started * 1_000_000_000)
         except Exception as e:
+            # The container may have been recreated under a new id
+            self.containers.invalidate(self.container_name)
             logger.error(f"Error fetching logs for {self.container_name}: {e}")
+        finally:
+            if stream is not None:
+                try:
+                    stream.close()
+                except Exception:
+                    pass
     
+    def _open_logs(self, container, follow=False, since=None, tail='all'):
+        """Open a log stream for the container and return (stream, lines)"""
+        started = time.monotonic()
+        # TTY containers send a raw stream without frame headers
+        if container.tty:
+            stream = self.docker_client.api.logs(container.id, stream=True, follow=follow, timestamps=True, since=since, tail=tail)
+            _LOGS_LATENCY.observe(time.monotonic() - started)
+            return stream, iter_lines(stream)
+
+        response = open_log_stream(self.docker_client.api, container.id, follow=follow, since=since, tail=tail)
+        _LOGS_LATENCY.observe(time.monotonic() - started)
+        return response, iter_frame_lines(response.raw, self.streams)
+
+    def _tee(self, lines):
+        """Count new lines and copy them into the ring buffer and archive as they pass"""
+        if self.metrics is not None:
+            lines = self.metrics.count(lines)
+        if self.ring is not None:
+            lines = self.ring.tee(lines)
+        if self.archive is not None:
+            lines = self.archive.tee(lines)
+        return lines
+
     def process_logs(self, logs, container):
-        """Process container logs and detect errors"""
+        """Process container logs and detect errors
+
+        logs may be a decoded string or an iterable of lines; lines are
+        classified lazily so memory stays bounded.
+        """
         if not logs:
             return
         
-        # Process each log line
+        lines = logs.splitlines() if isinstance(logs, str) else logs
+
+        # Docker's since filter is whole-second, so drop lines already processed
+        new_lines = self._tee(iter_new_lines(lines, self.cursor))
+
         errors_found = []
-        for line in logs.splitlines():
-            # Skip empty lines
-            if not line.strip():
-                continue
-                
-            # Check if line matches any error pattern
-            for pattern in self.compiled_error_patterns:
-                if pattern.search(line):
-                    # Check if line matches any ignore pattern
-                    if any(ignore.search(line) for ignore in self.compiled_ignore_patterns):
-                        continue
-                        
-                    errors_found.append(line)
-                    break
+        dropped = 0
+        for match in iter_errors(new_lines, self):
+            if len(errors_found) < self.max_errors:
+                errors_found.append(match)
+            else:
+                dropped += 1
+
+        if dropped:
+            logger.warning(f"Dropped {dropped} additional errors from {self.container_name} (limit {self.max_errors} per check)")
         
         if errors_found:
-            self.handle_errors(errors_found, container)
+            self.report_errors(errors_found, container)
+
+    def report_errors(self, matches, container):
+        """Count matched (line, pattern) pairs and alert once the rate threshold is reached"""
+        # Mined as they arrive, so lines held back by the rate threshold or cooldown still count
+        for line, _ in matches:
+            self.templates.add(line)
+
+        for sink in self.sinks:
+            try:
+                sink.record_errors(self, matches)
+            except Exception as e:
+                logger.error(f"Failed to record errors for {self.container_name}: {e}")
+
+        with self._report_lock:
+            if self.metrics is not None:
+                self.metrics.record_matches(matches)
+            for pattern, errors, count in self.rate.evaluate(matches):
+                self.alert_rate = self.rate.describe(count, pattern)
+                try:
+                    self.handle_errors(errors, container)
+                finally:
+                    self.alert_rate = None
+
+    def match_error(self, line):
+        """Return the error pattern that fired for the line, or None if it is not an error"""
+        # Skip empty lines
+        if not line.strip():
+            return None
+
+        return self.matcher.match(line)
+
+    def is_error(self, line):
+        """Return True if the line matches an error pattern and no ignore pattern"""
+        return self.match_error(line) is not None
+
+    def start_follow(self):
+        """Start streaming container logs in a background thread"""
+        if self._follow_thread and self._follow_thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._follow_thread = threading.Thread(
+            target=self._follow_loop,
+            name=f"follow-{self.container_name}",
+            daemon=True
+        )
+        self._follow_thread.start()
+        logger.info(f"Started log follow stream for {self.container_name}")
+
+    def stop_follow(self):
+        """Stop the follow stream and its background thread"""
+        self._stop_event.set()
+        self._wakeup.set()
+
+        # Closing the response unblocks the reader thread
+        stream = self._follow_stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                logger.debug(f"Error closing log stream for {self.container_name}: {e}")
+
+        if self._follow_thread and self._follow_thread is not threading.current_thread():
+            self._follow_thread.join(timeout=5)
+        self._follow_thread = None
+
+    def _follow_loop(self):
+        """Keep a follow stream open, reconnecting after restarts or daemon errors"""
+        delay = self.reconnect_delay
+        while not self._stop_event.is_set():
+            # While paused, wait for a start event instead of polling
+            if self.paused:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            container = self.get_container()
+            if container:
+                try:
+                    self._follow(container)
+                    # Stream ended cleanly, usually because the container stopped
+                    delay = self.reconnect_delay
+                except Exception as e:
+                    if self._stop_event.is_set():
+                        break
+                    self.containers.invalidate(self.container_name)
+                    logger.warning(f"Log stream for {self.container_name} interrupted: {e}")
+            else:
+                self._container_missing()
+
+            # Back off before reconnecting, unless an event wakes us first
+            if self._wakeup.wait(delay):
+                self._wakeup.clear()
+                delay = self.reconnect_delay
+                continue
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _follow(self, container):
+        """Read a single follow stream until it ends"""
+        # Resume from the cursor, otherwise only new lines
+        since = self.cursor.since()
+        if since is not None:
+            stream, lines = self._open_logs(container, follow=True, since=since)
+        else:
+            stream, lines = self._open_logs(container, follow=True, tail=0)
+
+        self._follow_stream = stream
+        try:
+            if self.ring is not None:
+                self.ring.live = True
+            for line in self._tee(iter_new_lines(lines, self.cursor)):
+                self.last_check_time = datetime.now()
+                pattern = self.match_error(line)
+                if pattern is not None:
+                    self.report_errors([(line, pattern)], container)
+        finally:
+            self._follow_stream = None
+            if self.ring is not None:
+                self.ring.live = False
+            try:
+                stream.close()
+            except Exception:
+                pass
     
     def handle_errors(self, errors, container):
         """Handle detected errors"""
@@ -87,17 +364,25 @@ class BaseMonitor:
             
         logger.info(f"Found {len(errors)} errors in {self.container_name}")
         
-        # Prepare alert data
+        # Send alert through alert manager
+        self.alert_manager.send_alert(self.build_alert(errors, container))
+
+    def build_alert(self, errors, container, **fields):
+        """Prepare alert data, grouping errors by log template"""
+        groups = self.templates.summarize(errors)
         alert_data = {
             'container_name': self.container_name,
             'container_id': container.id,
             'timestamp': datetime.now().isoformat(),
             'errors': errors,
+            'groups': groups,
+            'new_fingerprints': [group['fingerprint'] for group in groups if group['new']],
             'monitor_type': self.__class__.__name__
         }
-        
-        # Send alert through alert manager
-        self.alert_manager.send_alert(alert_data)
+        if self.alert_rate:
+            alert_data['rate'] = self.alert_rate
+        alert_data.update(fields)
+        return alert_data
         
     def format_errors(self, errors):
         """Format errors for display in alerts"""
@@ -0,0 +1,179 @@
+"""
+Durable per-container log cursors
+"""
+
+import os
+import re
+import json
+import logging
+import hashlib
+import calendar
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+logger = logging.getLogger('monitorr.checkpoint')
+
+# Docker prefixes each line with an RFC3339Nano timestamp when timestamps=True
+TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d{1,9}))?(Z|[+-]\d{2}:\d{2})')
+
+# Upper bound on remembered lines sharing the cursor timestamp
+MAX_BOUNDARY_LINES = 64
+
+
+@lru_cache(maxsize=4096)
+def _epoch_seconds(base, zone):
+    """Convert the whole-second part of a timestamp to UTC epoch seconds"""
+    seconds = calendar.timegm(datetime.strptime(base, '%Y-%m-%dT%H:%M:%S').timetuple())
+    if zone != 'Z':
+        sign = 1 if zone[0] == '+' else -1
+        seconds -= sign * (int(zone[1:3]) * 3600 + int(zone[4:6]) * 60)
+    return seconds
+
+
+def parse_timestamp(line):
+    """Return the Docker timestamp at the start of a line as epoch nanoseconds, or None"""
+    match = TIMESTAMP_RE.match(line)
+    if not match:
+        return None
+    base, fraction, zone = match.groups()
+    nanos = int(fraction.ljust(9, '0')) if fraction else 0
+    return _epoch_seconds(base, zone) * 1_000_000_000 + nanos
+
+
+def line_hash(line):
+    """Short hash of a log line used to dedupe lines at the cursor boundary"""
+    return hashlib.blake2b(line.encode('utf-8', errors='replace'), digest_size=8).hexdigest()
+
+
+class LogCursor:
+    """Position of the last processed line in a container's log stream"""
+
+    def __init__(self, nanos=None, timestamp=None, boundary=()):
+        # Kept as one tuple so readers on other threads see a consistent state
+        self._state = (nanos, timestamp, tuple(boundary))
+
+    @property
+    def nanos(self):
+        return self._state[0]
+
+    @property
+    def timestamp(self):
+        return self._state[1]
+
+    def since(self):
+        """Whole-second UTC epoch to pass to Docker's since filter, or None"""
+        nanos = self._state[0]
+        if nanos is None:
+            return None
+        return nanos // 1_000_000_000
+
+    def accept(self, line):
+        """Return True if the line is past the cursor, advancing the cursor"""
+        nanos = parse_timestamp(line)
+        if nanos is None:
+            # Lines without a timestamp cannot be placed, so never drop them
+            return True
+
+        current, _, boundary = self._state
+        if current is not None:
+            if nanos < current:
+                return False
+            if nanos == current:
+                digest = line_hash(line)
+                if digest in boundary:
+                    return False
+                boundary = (boundary + (digest,))[-MAX_BOUNDARY_LINES:]
+                self._state = (current, self._state[1], boundary)
+                return True
+
+        self._state = (nanos, line.split(' ', 1)[0], (line_hash(line),))
+        return True
+
+    def to_dict(self):
+        """Serialize the cursor for the checkpoint file"""
+        nanos, timestamp, boundary = self._state
+        return {'nanos': nanos, 'timestamp': timestamp, 'boundary': list(boundary)}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a cursor from the checkpoint file"""
+        return cls(data.get('nanos'), data.get('timestamp'), data.get('boundary', []))
+
+
+class CheckpointStore:
+    """JSON file of log cursors keyed by container name, flushed periodically"""
+
+    def __init__(self, path, flush_interval=30):
+        """Initialize the store and load any existing checkpoints"""
+        self.path = path
+        self.flush_interval = flush_interval
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_written = None
+        self._load()
+
+    def _load(self):
+        """Load cursors from disk"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            for key, value in data.get('cursors', {}).items():
+                self._cursors[key] = LogCursor.from_dict(value)
+            logger.info(f"Loaded {len(self._cursors)} log checkpoints from {self.path}")
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError) as e:
+            logger.error(f"Failed to load log checkpoints from {self.path}: {e}")
+
+    def cursor(self, key):
+        """Get the cursor for a container, creating an empty one if needed"""
+        with self._lock:
+            cursor = self._cursors.get(key)
+            if cursor is None:
+                cursor = self._cursors[key] = LogCursor()
+            return cursor
+
+    def flush(self):
+        """Write all cursors to disk if anything changed"""
+        with self._lock:
+            data = {'cursors': {key: cursor.to_dict() for key, cursor in self._cursors.items()}}
+
+        if data == self._last_written:
+            return
+
+        # Write to a temporary file and rename so a crash never leaves a partial file
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_written = data
+        except OSError as e:
+            logger.error(f"Failed to write log checkpoints to {self.path}: {e}")
+
+    def start(self):
+        """Start flushing checkpoints in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='checkpoint-flush', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background flush and write a final checkpoint"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        """Periodic flush loop"""
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
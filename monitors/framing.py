@@ -0,0 +1,177 @@
+"""
+Parser for Docker's multiplexed log stream
+
+Containers without a TTY send logs as frames with an 8-byte header:
+one byte stream id, three bytes padding and a big-endian uint32 payload
+size. FrameDemuxer reads frames with readinto() into a single reusable
+bytearray and yields memoryview slices of it, so the demuxer allocates no
+bytes object per frame or line. The read itself is not zero-copy: the
+HTTP client below fills the buffer from its own internal buffers.
+"""
+
+import struct
+import logging
+from urllib.parse import quote
+import requests
+import docker.errors
+from monitors.pipeline import MAX_LINE_LENGTH
+
+logger = logging.getLogger('monitorr.framing')
+
+HEADER = struct.Struct('>BxxxL')
+HEADER_SIZE = HEADER.size
+
+STDOUT = 1
+STDERR = 2
+STREAM_IDS = {'stdout': STDOUT, 'stderr': STDERR}
+STREAM_NAMES = {0: 'stdin', STDOUT: 'stdout', STDERR: 'stderr'}
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+def _read_into(raw, view):
+    """Fill the view from the raw stream, returning the number of bytes read"""
+    filled = 0
+    size = len(view)
+    while filled < size:
+        count = raw.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+class FrameDemuxer:
+    """Split a multiplexed log stream into (stream id, line) pairs
+
+    Yielded memoryviews point into an internal buffer and are only valid
+    until the next item is requested; decode or copy them before moving on.
+    """
+
+    def __init__(self, raw, buffer_size=DEFAULT_BUFFER_SIZE, max_line_length=MAX_LINE_LENGTH):
+        """Initialize the demuxer over a file-like object supporting readinto()"""
+        self.raw = raw
+        self.max_line_length = max_line_length
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        # Partial lines carried across frame boundaries, per stream
+        self._pending = {}
+
+    def _ensure_capacity(self, size):
+        """Grow the frame buffer if a payload does not fit"""
+        if size <= len(self._buffer):
+            return
+        # Replace rather than resize so views handed out earlier stay valid
+        self._buffer = bytearray(max(size, len(self._buffer) * 2))
+        self._view = memoryview(self._buffer)
+
+    def __iter__(self):
+        while True:
+            if _read_into(self.raw, self._view[:HEADER_SIZE]) < HEADER_SIZE:
+                break
+            stream, size = HEADER.unpack_from(self._buffer, 0)
+            if size == 0:
+                continue
+
+            self._ensure_capacity(size)
+            buffer = self._buffer
+            view = self._view
+            if _read_into(self.raw, view[:size]) < size:
+                logger.debug("Log stream ended inside a frame")
+                break
+
+            yield from self._split(stream, buffer, view, size)
+
+        yield from self.flush()
+
+    def split_frame(self, stream, payload):
+        """Yield lines from a frame payload read elsewhere (e.g. by an asyncio reader)"""
+        yield from self._split(stream, payload, memoryview(payload), len(payload))
+
+    def flush(self):
+        """Yield lines that were not newline-terminated when the stream ended"""
+        for stream, pending in self._pending.items():
+            if pending:
+                yield stream, memoryview(pending)
+        self._pending = {}
+
+    def _split(self, stream, buffer, view, size):
+        """Yield complete lines in a frame payload, carrying the remainder"""
+        pos = 0
+        while pos < size:
+            newline = buffer.find(b'\n', pos, size)
+            if newline == -1:
+                self._carry(stream, view[pos:size])
+                return
+
+            pending = self._pending.get(stream)
+            if pending:
+                self._carry(stream, view[pos:newline])
+                # Hand the carried line off and start a fresh one rather than
+                # clearing it, which would fail if the caller kept a view
+                self._pending[stream] = bytearray()
+                yield stream, memoryview(pending)
+            else:
+                yield stream, view[pos:min(newline, pos + self.max_line_length)]
+            pos = newline + 1
+
+    def _carry(self, stream, data):
+        """Append part of a line to the stream's pending buffer, capped at the line limit"""
+        pending = self._pending.get(stream)
+        if pending is None:
+            pending = self._pending[stream] = bytearray()
+        room = self.max_line_length - len(pending)
+        if room > 0:
+            pending += data[:room]
+
+
+def decode_line(line):
+    """Decode a line view to text, dropping a trailing carriage return"""
+    text = str(line, 'utf-8', 'replace')
+    return text[:-1] if text.endswith('\r') else text
+
+
+def iter_frame_lines(raw, streams=(STDOUT, STDERR), buffer_size=DEFAULT_BUFFER_SIZE):
+    """Yield decoded lines from a multiplexed stream, keeping only the given stream ids"""
+    for stream, line in FrameDemuxer(raw, buffer_size):
+        if stream in streams:
+            yield decode_line(line)
+
+
+def open_log_stream(api, container_id, follow=False, since=None, tail='all', timestamps=True, until=None):
+    """Open a raw logs response for a container using the low-level Docker API
+
+    docker-py's logs() strips the frame headers (losing which stream a line
+    came from), so the endpoint is requested directly. This relies on
+    docker.APIClient being a requests.Session with public base_url,
+    api_version and timeout attributes, as docker-py's clients have long
+    been; requirements.txt pins the docker-py version this is tested with.
+    """
+    if not isinstance(api, requests.Session):
+        raise TypeError(f"Expected a docker-py APIClient (a requests.Session), got {type(api).__name__}")
+
+    params = {
+        'stdout': 1,
+        'stderr': 1,
+        'timestamps': int(timestamps),
+        'follow': int(follow),
+        'tail': tail,
+    }
+    if since:
+        params['since'] = since
+    if until:
+        params['until'] = until
+
+    url = f"{api.base_url}/v{api.api_version}/containers/{quote(container_id, safe='')}/logs"
+    # Follow streams can stay idle for long periods, so never time out the read
+    response = api.get(url, params=params, stream=True, timeout=None if follow else api.timeout)
+    try:
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        try:
+            # The matching docker.errors type (NotFound, APIError, ...)
+            raise docker.errors.create_api_error_from_http_exception(e) from e
+        finally:
+            response.close()
+
+    return response
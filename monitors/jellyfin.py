@@ -57,14 +57,5 @@ class JellyfinMonitor(BaseMonitor):
             error = re.sub(r'^\[\w+\]', '', error).strip()
             formatted_errors.append(error)
         
-        # Prepare alert data
-        alert_data = {
-            'container_name': self.container_name,
-            'container_id': container.id,
-            'service_name': 'Jellyfin',
-            'errors': formatted_errors,
-            'monitor_type': 'JellyfinMonitor'
-        }
-        
         # Send alert through alert manager
-        self.alert_manager.send_alert(alert_data) 
\ No newline at end of file
+        self.alert_manager.send_alert(self.build_alert(formatted_errors, container, service_name='Jellyfin')) 
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Single-pass matcher for error and ignore patterns
+"""
+
+import re
+import logging
+
+logger = logging.getLogger('monitorr.matcher')
+
+# Characters that make a pattern a regular expression rather than plain text
+REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+# Constructs that break when patterns are merged into one alternation: backreferences and
+# conditionals depend on group numbering, named groups can collide with another pattern's,
+# and global inline flags such as (?x) would apply to every merged pattern
+UNMERGEABLE_RE = re.compile(r'\\[1-9]|\(\?P[=<]|\(\?<[^=!]|\(\?\(|\(\?[aiLmsux]+\)')
+
+# Prefix for the generated group names; user named groups never reach the merged regex
+GROUP_PREFIX = '_monitorr_'
+
+
+def is_literal(pattern):
+    """Return True if the pattern contains no regex metacharacters"""
+    return not any(char in REGEX_METACHARACTERS for char in pattern)
+
+
+class _PatternSet:
+    """A list of patterns compiled into one combined regex, with a fallback for unmergeable ones
+
+    Plain-text patterns are merged as escaped alternatives, so a line that
+    matches nothing costs one scan however many patterns are configured.
+    When a line does match, the first pattern in config order that matches
+    is reported, as when each pattern was tried in turn.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.compiled = []
+        self.regex = None
+        self.groups = {}
+        self.fallback = []
+
+        merged = []
+        for index, pattern in enumerate(self.patterns):
+            # Validate every pattern up front so bad config fails like it used to
+            compiled = re.compile(pattern, re.IGNORECASE)
+            self.compiled.append((compiled, pattern))
+
+            if is_literal(pattern):
+                source = re.escape(pattern)
+            elif UNMERGEABLE_RE.search(pattern) or not self._mergeable(pattern):
+                self.fallback.append((index, compiled, pattern))
+                continue
+            else:
+                source = pattern
+            name = f"{GROUP_PREFIX}{index}"
+            self.groups[name] = (index, compiled, pattern)
+            merged.append(f"(?P<{name}>{source})")
+
+        if merged:
+            try:
+                self.regex = re.compile('|'.join(merged), re.IGNORECASE)
+            except re.error as e:
+                # Patterns that compile alone can still conflict once combined
+                logger.warning(f"Could not combine error patterns, matching them one by one: {e}")
+                self.fallback = sorted(list(self.groups.values()) + self.fallback, key=lambda entry: entry[0])
+                self.groups = {}
+
+    @staticmethod
+    def _mergeable(pattern):
+        """Check that a pattern still compiles when wrapped in a named group"""
+        try:
+            re.compile(f"(?P<{GROUP_PREFIX}>{pattern})", re.IGNORECASE)
+            return True
+        except re.error:
+            return False
+
+    def search(self, line):
+        """Return the first pattern, in config order, that matches the line, or None"""
+        if self.regex is not None:
+            match = self.regex.search(line)
+            if match:
+                index, _, pattern = self.groups[match.lastgroup]
+                # The alternation reports the leftmost match; an earlier pattern may match further on
+                for compiled, earlier in self.compiled[:index]:
+                    if compiled.search(line):
+                        return earlier
+                return pattern
+
+        for _, compiled, pattern in self.fallback:
+            if compiled.search(line):
+                return pattern
+
+        return None
+
+
+class PatternMatcher:
+    """Classify log lines against error and ignore patterns in a single pass each"""
+
+    def __init__(self, error_patterns, ignore_patterns=None):
+        """Build the matcher from pattern lists"""
+        self.errors = _PatternSet(error_patterns)
+        self.ignores = _PatternSet(ignore_patterns or [])
+
+    def match(self, line):
+        """Return the error pattern that fired for the line, or None if none fired or it is ignored"""
+        pattern = self.errors.search(line)
+        if pattern is None:
+            return None
+
+        if self.ignores.search(line) is not None:
+            return None
+
+        return pattern
+
+    def is_error(self, line):
+        """Return True if the line matches an error pattern (ignoring ignore patterns)"""
+        return self.errors.search(line) is not None
+
+    def is_ignored(self, line):
+        """Return True if the line matches an ignore pattern"""
+        return self.ignores.search(line) is not None
@@ -0,0 +1,76 @@
+"""
+Streaming line pipeline for container logs
+
+Each stage is a generator, so only one chunk and one partial line are held
+in memory at a time regardless of how much a container logged:
+
+    byte chunks -> iter_lines -> iter_until -> iter_new_lines -> iter_errors -> report_errors
+"""
+
+import time
+import codecs
+
+# Lines longer than this are truncated; the rest of the line is discarded
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def iter_lines(chunks, max_line_length=MAX_LINE_LENGTH):
+    """Decode byte chunks incrementally and yield complete lines"""
+    # Invalid UTF-8 is replaced instead of aborting the whole check
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    truncated = False
+
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        start = 0
+        while True:
+            end = text.find('\n', start)
+            if end == -1:
+                if not truncated:
+                    pending += text[start:]
+                    if len(pending) > max_line_length:
+                        yield pending[:max_line_length]
+                        pending = ''
+                        truncated = True
+                break
+
+            if truncated:
+                # End of an oversized line that was already emitted
+                truncated = False
+            else:
+                yield (pending + text[start:end])[:max_line_length].rstrip('\r')
+            pending = ''
+            start = end + 1
+
+    pending += decoder.decode(b'', final=True)
+    if pending and not truncated:
+        yield pending[:max_line_length].rstrip('\r')
+
+
+def iter_until(lines, deadline, check_every=256):
+    """Stop yielding lines once the monotonic deadline has passed"""
+    if deadline is None:
+        yield from lines
+        return
+
+    for count, line in enumerate(lines):
+        if count % check_every == 0 and time.monotonic() > deadline:
+            return
+        yield line
+
+
+def iter_new_lines(lines, cursor):
+    """Drop lines at or before the cursor, advancing it as lines pass"""
+    for line in lines:
+        if cursor.accept(line):
+            yield line
+
+
+def iter_errors(lines, monitor):
+    """Yield (line, pattern) for each line the monitor classifies as an error"""
+    match_error = monitor.match_error
+    for line in lines:
+        pattern = match_error(line)
+        if pattern is not None:
+            yield line, pattern
@@ -4,7 +4,6 @@ Plex-specific monitor for detecting errors in Plex Media Server logs
 
 import logging
 from monitors.base import BaseMonitor
-import re
 
 logger = logging.getLogger('monitorr.monitor.plex')
 
@@ -25,7 +24,7 @@ class PlexMonitor(BaseMonitor):
                 "failure"
             ]
             # Recompile patterns
-            self.compiled_error_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.error_patterns]
+            self._compile_patterns()
     
     def process_logs(self, logs, container):
         """Process Plex-specific logs"""
@@ -40,14 +40,5 @@ class RadarrMonitor(BaseMonitor):
             
         logger.info(f"Found {len(errors)} errors in Radarr container {self.container_name}")
         
-        # Prepare alert data with Radarr specific formatting
-        alert_data = {
-            'container_name': self.container_name,
-            'container_id': container.id,
-            'service_name': 'Radarr',
-            'errors': errors,
-            'monitor_type': 'RadarrMonitor'
-        }
-        
         # Send alert through alert manager
-        self.alert_manager.send_alert(alert_data) 
\ No newline at end of file
+        self.alert_manager.send_alert(self.build_alert(errors, container, service_name='Radarr')) 
\ No newline at end of file
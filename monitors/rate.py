@@ -0,0 +1,136 @@
+"""
+Sliding-window error rates for threshold alerting
+"""
+
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger('monitorr.rate')
+
+DEFAULT_BUCKETS = 60
+
+
+class SlidingWindowCounter:
+    """Count of events in the last window seconds, kept in a ring of fixed buckets
+
+    Adding is O(1) amortised: buckets that fall out of the window are
+    cleared as the clock moves past them, never rescanned.
+    """
+
+    __slots__ = ('window', 'buckets', 'width', 'total', '_counts', '_head')
+
+    def __init__(self, window, buckets=DEFAULT_BUCKETS):
+        """Initialize an empty counter"""
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.total = 0
+        self._counts = [0] * buckets
+        self._head = None
+
+    def _advance(self, now):
+        """Move the ring forward to the bucket containing now, clearing expired buckets"""
+        index = int(now // self.width)
+        if self._head is None or index - self._head >= self.buckets:
+            self.reset()
+        else:
+            for expired in range(self._head + 1, index + 1):
+                slot = expired % self.buckets
+                self.total -= self._counts[slot]
+                self._counts[slot] = 0
+        if self._head is None or index > self._head:
+            self._head = index
+        return self._head % self.buckets
+
+    def add(self, count=1, now=None):
+        """Record events and return the count in the window"""
+        slot = self._advance(time.monotonic() if now is None else now)
+        self._counts[slot] += count
+        self.total += count
+        return self.total
+
+    def count(self, now=None):
+        """Return the number of events in the window"""
+        self._advance(time.monotonic() if now is None else now)
+        return self.total
+
+    def reset(self):
+        """Forget all events"""
+        self._counts = [0] * self.buckets
+        self.total = 0
+
+
+class RateEvaluator:
+    """Fire once threshold matches occur within interval seconds
+
+    Matches are counted for the whole monitor, or per error pattern when
+    per_pattern is set. Lines below the threshold are held (up to
+    max_pending per key) so the alert that finally fires includes them.
+    """
+
+    def __init__(self, threshold=1, interval=300, per_pattern=False,
+                 buckets=DEFAULT_BUCKETS, max_pending=500):
+        """Initialize evaluator"""
+        self.threshold = max(int(threshold), 1)
+        self.interval = interval
+        self.per_pattern = per_pattern
+        self.buckets = buckets
+        self.max_pending = max_pending
+        self._counters = {}
+        self._pending = {}
+
+    @classmethod
+    def from_config(cls, config, max_pending=500):
+        """Build an evaluator from a monitor config"""
+        return cls(
+            threshold=config.get('alert_threshold', 1),
+            interval=config.get('alert_interval', 300),
+            per_pattern=config.get('alert_per_pattern', False),
+            max_pending=max_pending
+        )
+
+    def evaluate(self, matches, now=None):
+        """Count (line, pattern) matches and return the groups that crossed the threshold
+
+        Returns a list of (pattern or None, lines, count) tuples; counters for
+        a group that fired start again from zero.
+        """
+        now = time.monotonic() if now is None else now
+        touched = set()
+        for line, pattern in matches:
+            key = pattern if self.per_pattern else None
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = SlidingWindowCounter(self.interval, self.buckets)
+                self._pending[key] = deque(maxlen=self.max_pending)
+            counter.add(now=now)
+            self._pending[key].append((now, line))
+            touched.add(key)
+
+        fired = []
+        for key in touched:
+            count = self._counters[key].count(now)
+            pending = self._pending[key]
+            # Lines older than the window no longer count towards this alert
+            cutoff = now - self.interval
+            while pending and pending[0][0] <= cutoff:
+                pending.popleft()
+
+            if count >= self.threshold:
+                fired.append((key, [line for _, line in pending], count))
+                self._counters[key].reset()
+                pending.clear()
+            else:
+                logger.debug(f"{count} of {self.threshold} matches in {self.interval}s for {key or 'monitor'}")
+        return fired
+
+    def describe(self, count, pattern=None):
+        """Summary of an observed rate for alert data"""
+        return {
+            'count': count,
+            'interval': self.interval,
+            'threshold': self.threshold,
+            'per_minute': round(count * 60 / self.interval, 2) if self.interval else float(count),
+            'pattern': pattern
+        }
@@ -0,0 +1,155 @@
+"""
+In-memory ring buffer of a container's most recent log lines
+"""
+
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from monitors.checkpoint import parse_timestamp
+
+logger = logging.getLogger('monitorr.ring')
+
+DEFAULT_CAPACITY = 2 * 1024 * 1024
+
+# Lines copied out per lock acquisition while iterating
+READ_BATCH = 1024
+
+
+class LineRing:
+    """Recent lines held in one fixed-size bytearray with offset and timestamp arrays
+
+    Lines are written contiguously and wrap to the start of the arena when
+    they do not fit at the end; the oldest lines are evicted as their bytes
+    are overwritten. Memory is capacity bytes plus 24 bytes per held line.
+
+    The ring knows which span of the log it holds completely: from the
+    first line it was fed (or just after the newest evicted line) up to the
+    last sync, which is now while a live stream is feeding it.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """Initialize an empty ring"""
+        self.capacity = capacity
+        self._arena = bytearray(capacity)
+        self._starts = array('q')
+        self._lengths = array('l')
+        self._times = array('q')
+        self._head = 0
+        # Entries dropped by compaction, so index + base is a stable sequence number
+        self._base = 0
+        self._end = 0
+        self._last_ts = None
+        self._complete_from = None
+        self._synced = None
+        self._lock = threading.Lock()
+        self.live = False
+
+    def __len__(self):
+        return len(self._starts) - self._head
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a ring from a monitor config, or None when disabled"""
+        size_mb = config.get('buffer_mb', DEFAULT_CAPACITY / (1024 * 1024))
+        if not size_mb:
+            return None
+        return cls(int(size_mb * 1024 * 1024))
+
+    def append(self, line):
+        """Add a line, evicting the oldest lines its bytes overwrite"""
+        data = line.encode('utf-8', 'replace')[:self.capacity]
+        size = len(data)
+        ts = parse_timestamp(line)
+        with self._lock:
+            # Keep timestamps ordered for bisecting; untimestamped lines inherit the previous one
+            if ts is None or (self._last_ts is not None and ts < self._last_ts):
+                ts = self._last_ts if self._last_ts is not None else time.time_ns()
+            if self._complete_from is None:
+                self._complete_from = ts
+
+            start = self._end
+            offset = start % self.capacity
+            if offset + size > self.capacity:
+                # Wrap rather than split the line
+                start += self.capacity - offset
+                offset = 0
+            end = start + size
+
+            starts = self._starts
+            head = self._head
+            while head < len(starts) and starts[head] < end - self.capacity:
+                # Lines at the evicted timestamp may remain, so completeness starts after it
+                self._complete_from = self._times[head] + 1
+                head += 1
+            self._head = head
+
+            self._arena[offset:offset + size] = data
+            starts.append(start)
+            self._lengths.append(size)
+            self._times.append(ts)
+            self._end = end
+            self._last_ts = ts
+
+            if head > READ_BATCH and head * 2 > len(starts):
+                self._compact()
+
+    def _compact(self):
+        """Drop evicted entries from the front of the index arrays"""
+        del self._starts[:self._head]
+        del self._lengths[:self._head]
+        del self._times[:self._head]
+        self._base += self._head
+        self._head = 0
+
+    def tee(self, lines):
+        """Add lines as they pass through a pipeline"""
+        for line in lines:
+            self.append(line)
+            yield line
+
+    def mark_synced(self, nanos):
+        """Record that every line logged before nanos has been added"""
+        with self._lock:
+            if self._synced is None or nanos > self._synced:
+                self._synced = nanos
+
+    def synced_through(self):
+        """Time before which the ring has every line, or None if never synced"""
+        if self.live:
+            return time.time_ns()
+        return self._synced
+
+    def covers(self, since):
+        """True if the ring holds every line from since up to its last sync"""
+        with self._lock:
+            complete_from = self._complete_from
+        return since is not None and complete_from is not None and since >= complete_from
+
+    def iter_range(self, since=None, until=None):
+        """Yield held lines with since <= timestamp < until, oldest first
+
+        Lines are copied out of the arena in small batches, so a writer is
+        never blocked for long and nothing yielded can be overwritten.
+        """
+        sequence = None
+        while True:
+            with self._lock:
+                head = self._head
+                if sequence is None:
+                    index = bisect_left(self._times, since, head) if since else head
+                else:
+                    # Sequence numbers survive compaction; lines evicted meanwhile are skipped
+                    index = max(sequence - self._base, head)
+                stop = bisect_left(self._times, until, index) if until else len(self._times)
+                batch_end = min(index + READ_BATCH, stop)
+                batch = []
+                for i in range(index, batch_end):
+                    offset = self._starts[i] % self.capacity
+                    batch.append(bytes(self._arena[offset:offset + self._lengths[i]]))
+                sequence = self._base + batch_end
+            for data in batch:
+                yield data.decode('utf-8', 'replace')
+            if batch_end >= stop:
+                return
@@ -3,7 +3,6 @@ Sonarr-specific monitor for detecting errors in Sonarr logs
 """
 
 import logging
-import re
 from monitors.base import BaseMonitor
 
 logger = logging.getLogger('monitorr.monitor.sonarr')
@@ -23,7 +22,7 @@ class SonarrMonitor(BaseMonitor):
                 "failure detected"
             ]
             # Recompile patterns
-            self.compiled_error_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.error_patterns]
+            self._compile_patterns()
     
     def process_logs(self, logs, container):
         """Process Sonarr-specific logs"""
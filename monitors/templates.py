@@ -0,0 +1,208 @@
+"""
+Online log template mining for grouping similar error lines
+
+A Drain-style fixed-depth parse tree: lines are routed by token count and
+their first few tokens to a small leaf of templates, and joined to the
+most similar one. Positions where lines disagree become wildcards, so
+"Failed to fetch /tv/123" and "Failed to fetch /tv/456" share a template
+whose fingerprint stays the same as the wildcards grow.
+"""
+
+import re
+import time
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+from monitors.checkpoint import TIMESTAMP_RE
+
+logger = logging.getLogger('monitorr.templates')
+
+WILDCARD = '<*>'
+
+# Tokens that are almost always variable: anything with a digit, paths and URLs
+VARIABLE_TOKEN_RE = re.compile(r'\d|^[/~\\]|://')
+
+DEFAULT_DEPTH = 4
+DEFAULT_SIMILARITY = 0.5
+DEFAULT_MAX_CHILDREN = 100
+DEFAULT_MAX_TEMPLATES = 1000
+
+
+def tokenize(line):
+    """Split a line into tokens, dropping Docker's timestamp prefix"""
+    match = TIMESTAMP_RE.match(line)
+    if match:
+        line = line[match.end():]
+    return line.split()
+
+
+def _mask(token):
+    return WILDCARD if VARIABLE_TOKEN_RE.search(token) else token
+
+
+class LogTemplate:
+    """A group of lines sharing constant tokens"""
+
+    __slots__ = ('fingerprint', 'tokens', 'count', 'first_seen', 'last_seen', 'leaf', 'alerted')
+
+    def __init__(self, tokens, leaf):
+        self.tokens = tokens
+        self.count = 0
+        # Set once the template has appeared in an alert
+        self.alerted = False
+        self.first_seen = self.last_seen = time.time()
+        self.leaf = leaf
+        # Fixed at creation so the fingerprint survives the template generalising
+        self.fingerprint = hashlib.blake2b(' '.join(tokens).encode('utf-8', 'replace'), digest_size=6).hexdigest()
+
+    @property
+    def text(self):
+        return ' '.join(self.tokens)
+
+    def similarity(self, tokens):
+        """Share of the template's constant tokens that the line agrees with"""
+        same = wildcards = 0
+        for template_token, token in zip(self.tokens, tokens):
+            if template_token == WILDCARD:
+                wildcards += 1
+            elif template_token == token:
+                same += 1
+        constants = len(self.tokens) - wildcards
+        return (same / constants if constants else 1.0), wildcards
+
+    def merge(self, tokens):
+        """Turn positions that differ from the line into wildcards"""
+        if any(t != WILDCARD and t != token for t, token in zip(self.tokens, tokens)):
+            self.tokens = [t if t == token else WILDCARD for t, token in zip(self.tokens, tokens)]
+
+    def params(self, tokens):
+        """Values of the line at the template's wildcard positions"""
+        return [token for t, token in zip(self.tokens, tokens) if t == WILDCARD]
+
+
+class TemplateMiner:
+    """Assign each line a template fingerprint in O(tokens) time
+
+    Memory is bounded by max_templates; the least recently seen template is
+    evicted when a new one would exceed it.
+    """
+
+    def __init__(self, depth=DEFAULT_DEPTH, similarity=DEFAULT_SIMILARITY,
+                 max_children=DEFAULT_MAX_CHILDREN, max_templates=DEFAULT_MAX_TEMPLATES):
+        """Initialize an empty parse tree"""
+        # Depth counts the root and length levels, as in Drain
+        self.prefix_tokens = max(depth - 2, 1)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self._root = {}
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._templates)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a miner from a monitor's templates config section"""
+        config = config or {}
+        return cls(
+            depth=config.get('depth', DEFAULT_DEPTH),
+            similarity=config.get('similarity', DEFAULT_SIMILARITY),
+            max_children=config.get('max_children', DEFAULT_MAX_CHILDREN),
+            max_templates=config.get('max_templates', DEFAULT_MAX_TEMPLATES)
+        )
+
+    def add(self, line, count=True):
+        """Add a line, returning (template, params, is_new)
+
+        count=False assigns the line a template without counting it, for
+        lines that were already counted when they arrived.
+        """
+        tokens = tokenize(line)
+        with self._lock:
+            leaf = self._leaf(tokens)
+            template = self._best_match(leaf, tokens)
+            is_new = template is None
+            if is_new:
+                template = LogTemplate([_mask(token) for token in tokens], leaf)
+                leaf.append(template)
+                self._templates[template.fingerprint] = template
+                self._evict()
+            else:
+                template.merge(tokens)
+                self._templates.move_to_end(template.fingerprint)
+            if count:
+                template.count += 1
+                template.last_seen = time.time()
+            return template, template.params(tokens), is_new
+
+    def get(self, fingerprint):
+        """Return the template with the given fingerprint, or None"""
+        return self._templates.get(fingerprint)
+
+    def summarize(self, lines):
+        """Group lines already counted with add() by template, most frequent first
+
+        Each group is a dict with the fingerprint, template text, count in
+        these lines, the first example line with its parameters and whether
+        this is the first alert the template appears in.
+        """
+        groups = {}
+        for line in lines:
+            template, _, _ = self.add(line, count=False)
+            group = groups.get(template.fingerprint)
+            if group is None:
+                group = groups[template.fingerprint] = {
+                    'fingerprint': template.fingerprint,
+                    'example': line,
+                    'count': 0,
+                    'new': not template.alerted
+                }
+                template.alerted = True
+            group['count'] += 1
+
+        # Templates may have generalised while the batch was added
+        for fingerprint, group in groups.items():
+            template = self._templates.get(fingerprint)
+            if template is not None:
+                group['template'] = template.text
+                group['params'] = template.params(tokenize(group['example']))
+            else:
+                group['template'] = group['example']
+                group['params'] = []
+        return sorted(groups.values(), key=lambda group: group['count'], reverse=True)
+
+    def _leaf(self, tokens):
+        """Walk the tree by length then leading tokens, creating nodes as needed"""
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.prefix_tokens]:
+            key = _mask(token)
+            if key not in node and len(node) >= self.max_children:
+                key = WILDCARD
+            node = node.setdefault(key, {})
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf, tokens):
+        """Most similar template in the leaf above the threshold, or None"""
+        if not tokens:
+            return leaf[0] if leaf else None
+        best = None
+        best_score = (self.similarity, -1)
+        for template in leaf:
+            score = template.similarity(tokens)
+            # Prefer more constant tokens, then more wildcards for equal scores
+            if score[0] > best_score[0] or (score[0] == best_score[0] and score[1] > best_score[1]):
+                best, best_score = template, score
+        return best
+
+    def _evict(self):
+        """Drop least recently seen templates beyond the limit"""
+        while len(self._templates) > self.max_templates:
+            _, template = self._templates.popitem(last=False)
+            try:
+                template.leaf.remove(template)
+            except ValueError:
+                pass
+            logger.debug(f"Evicted log template {template.fingerprint}")
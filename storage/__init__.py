@@ -0,0 +1,6 @@
+"""
+Storage module for error history
+"""
+
+from storage.events import EventStore
+from storage.archive import LogArchive
@@ -0,0 +1,560 @@
+"""
+Append-only compressed archive of container log lines
+
+Each container gets a directory of segments. A segment is a series of
+independently compressed blocks (gzip members or zstd frames) plus:
+
+    <segment>.idx    one JSON line per block: offset, length, first/last timestamp
+    <segment>.bloom  bloom filter over the character trigrams of the words in
+                     the segment, with the number of blocks it covers
+
+Searches use the index to decompress only blocks in the time range, and
+the bloom filter to skip segments that cannot contain the search text.
+The filter holds character trigrams, not whole words, so it also rules out
+segments for substring searches; it cannot rule anything out for search
+text with no word of three or more characters.
+The filter is saved before the index grows and periodically while a segment
+is open, so after a crash it only lags the index by a few blocks, which are
+read back to complete it.
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import struct
+import hashlib
+import logging
+import threading
+from monitors.checkpoint import parse_timestamp
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger('monitorr.storage.archive')
+
+WORD_RE = re.compile(r'\w+')
+SAFE_KEY_RE = re.compile(r'[^A-Za-z0-9_.-]')
+
+DEFAULT_BLOCK_BYTES = 256 * 1024
+# Seconds lines may wait in the buffer before a quiet container writes a smaller block
+DEFAULT_BLOCK_AGE = 60
+# Seconds between bloom filter saves for an open segment
+BLOOM_SAVE_INTERVAL = 60
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_BLOOM_BITS = 1 << 20
+BLOOM_HASHES = 3
+BLOOM_HEADER = struct.Struct('>II')
+BLOOM_COVERED = struct.Struct('>I')
+
+
+def trigrams(text):
+    """Lowercase character trigrams of each word (run of \\w characters)
+
+    Words shorter than three characters add nothing; they could not be used
+    to rule a segment out anyway.
+    """
+    grams = set()
+    for word in WORD_RE.findall(text.lower()):
+        for i in range(len(word) - 2):
+            grams.add(word[i:i + 3])
+    return grams
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over short strings"""
+
+    def __init__(self, bits=DEFAULT_BLOOM_BITS, hashes=BLOOM_HASHES, data=None, covered=0):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray(bits // 8)
+        # Index blocks whose lines have been added; None for filters saved only at seal
+        self.covered = covered
+        self.saved_at = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=4 * self.hashes).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 4:i * 4 + 4], 'big') % self.bits
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.data[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def save(self, path, covered):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(BLOOM_HEADER.pack(self.bits, self.hashes))
+            f.write(self.data)
+            f.write(BLOOM_COVERED.pack(covered))
+        os.replace(tmp_path, path)
+        self.saved_at = time.monotonic()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            bits, hashes = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+            data = f.read()
+        size = bits // 8
+        if len(data) == size + BLOOM_COVERED.size:
+            return cls(bits, hashes, data[:size], BLOOM_COVERED.unpack(data[size:])[0])
+        return cls(bits, hashes, data, covered=None)
+
+
+def _compressor(kind):
+    if kind == 'zstd':
+        return zstandard.ZstdCompressor().compress
+    return _gzip
+
+
+def _gzip(data):
+    # wbits=31 writes a gzip member, so a segment is a valid multi-member .gz file
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(path, data):
+    if path.endswith('.zst'):
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, 31)
+
+
+class Segment:
+    """One segment file with its block index and bloom filter"""
+
+    def __init__(self, path, bloom=None):
+        self.path = path
+        self.blocks = []
+        self.bloom = bloom
+        self._load_index()
+
+    @property
+    def index_path(self):
+        return f"{self.path}.idx"
+
+    @property
+    def bloom_path(self):
+        return f"{self.path}.bloom"
+
+    @property
+    def first(self):
+        return self.blocks[0]['first'] if self.blocks else None
+
+    @property
+    def last(self):
+        return self.blocks[-1]['last'] if self.blocks else None
+
+    @property
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                for line in f:
+                    try:
+                        self.blocks.append(json.loads(line))
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+
+    def might_contain(self, grams):
+        """False only if the segment certainly has no line containing all the trigrams"""
+        if not grams:
+            return True
+        if self.bloom is None:
+            try:
+                bloom = BloomFilter.load(self.bloom_path)
+                self._complete(bloom)
+            except (OSError, struct.error, zlib.error) as e:
+                # No usable filter, so the segment cannot be pruned
+                logger.debug(f"No bloom filter for {self.path}: {e}")
+                return True
+            self.bloom = bloom
+        return all(gram in self.bloom for gram in grams)
+
+    def _complete(self, bloom):
+        """Add the lines of blocks indexed after the filter was last saved"""
+        if bloom.covered is None:
+            return
+        for block in self.blocks[bloom.covered:]:
+            for line in self.read_block(block):
+                for gram in trigrams(line):
+                    bloom.add(gram)
+        bloom.covered = len(self.blocks)
+
+    def read_block(self, block):
+        """Decompressed lines of one block"""
+        with open(self.path, 'rb') as f:
+            f.seek(block['offset'])
+            data = f.read(block['length'])
+        return _decompress(self.path, data).decode('utf-8', 'replace').split('\n')
+
+    def remove(self):
+        for path in (self.path, self.index_path, self.bloom_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class ContainerArchive:
+    """Writer and reader for one container's segments"""
+
+    def __init__(self, directory, compression='gzip', block_bytes=DEFAULT_BLOCK_BYTES,
+                 segment_bytes=DEFAULT_SEGMENT_BYTES, bloom_bits=DEFAULT_BLOOM_BITS,
+                 block_age=DEFAULT_BLOCK_AGE):
+        """Initialize the archive, loading existing segments"""
+        self.directory = directory
+        self.compression = compression
+        self.block_bytes = block_bytes
+        self.block_age = block_age
+        self.segment_bytes = segment_bytes
+        self.bloom_bits = bloom_bits
+        self._compress = _compressor(compression)
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._buffer_first = None
+        self._buffer_started = None
+        self._last_ts = None
+        self._current = None
+        self._current_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        suffixes = ('.gz', '.zst')
+        self.segments = [Segment(os.path.join(directory, name))
+                         for name in sorted(os.listdir(directory)) if name.endswith(suffixes)]
+
+    def append(self, line):
+        """Buffer a line, writing a block once enough has accumulated"""
+        ts = parse_timestamp(line)
+        with self._lock:
+            # Lines without a timestamp inherit the previous one so blocks stay ordered
+            ts = ts if ts is not None else self._last_ts or time.time_ns()
+            self._last_ts = ts
+            if self._buffer_first is None:
+                self._buffer_first = ts
+                self._buffer_started = time.monotonic()
+            self._buffer.append(line)
+            self._buffered_bytes += len(line) + 1
+            if self._buffered_bytes >= self.block_bytes:
+                self._write_block()
+
+    def tee(self, lines):
+        """Archive lines as they pass through a pipeline"""
+        for line in lines:
+            self.append(line)
+            yield line
+
+    def flush(self, force=True):
+        """Write buffered lines as a block
+
+        Without force, lines are only written once they have waited
+        block_age seconds, so a quiet container still fills reasonably
+        sized blocks.
+        """
+        with self._lock:
+            if not force and (self._buffer_started is None
+                              or time.monotonic() - self._buffer_started < self.block_age):
+                return
+            self._write_block()
+
+    def close(self):
+        """Flush and seal the current segment"""
+        with self._lock:
+            self._write_block()
+            self._seal()
+
+    def _open_segment(self):
+        extension = '.zst' if self.compression == 'zstd' else '.gz'
+        path = os.path.join(self.directory, f"{time.time_ns():020d}{extension}")
+        self._current = Segment(path, bloom=BloomFilter(self.bloom_bits))
+        self._current_bytes = 0
+        self.segments.append(self._current)
+
+    def _seal(self):
+        """Persist the current segment's bloom filter and start a new segment next time"""
+        if self._current is None:
+            return
+        self._save_bloom(self._current)
+        self._current = None
+
+    @staticmethod
+    def _save_bloom(segment):
+        try:
+            segment.bloom.save(segment.bloom_path, segment.bloom.covered)
+        except OSError as e:
+            logger.error(f"Failed to write bloom filter for {segment.path}: {e}")
+
+    def _write_block(self):
+        if not self._buffer:
+            return
+        if self._current is None:
+            self._open_segment()
+
+        segment = self._current
+        data = self._compress('\n'.join(self._buffer).encode('utf-8', 'replace'))
+        for line in self._buffer:
+            for gram in trigrams(line):
+                segment.bloom.add(gram)
+        # Saved before the index grows, so every block a saved filter counts is in it
+        if time.monotonic() - segment.bloom.saved_at >= BLOOM_SAVE_INTERVAL:
+            self._save_bloom(segment)
+        try:
+            with open(segment.path, 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+            block = {'offset': offset, 'length': len(data), 'first': self._buffer_first,
+                     'last': self._last_ts, 'lines': len(self._buffer)}
+            with open(segment.index_path, 'a') as f:
+                f.write(json.dumps(block) + '\n')
+            segment.blocks.append(block)
+            segment.bloom.covered = len(segment.blocks)
+        except OSError as e:
+            logger.error(f"Failed to write log archive block to {segment.path}: {e}")
+        finally:
+            self._buffer = []
+            self._buffered_bytes = 0
+            self._buffer_first = None
+            self._buffer_started = None
+
+        self._current_bytes += len(data)
+        if self._current_bytes >= self.segment_bytes:
+            self._seal()
+
+    @property
+    def first(self):
+        """Timestamp of the oldest archived line, or None when empty"""
+        with self._lock:
+            for segment in self.segments:
+                if segment.first is not None:
+                    return segment.first
+            return self._buffer_first
+
+    def _matcher(self, since, until, text):
+        needle = text.lower() if text else None
+
+        def matches(line):
+            if not line:
+                return False
+            if needle and needle not in line.lower():
+                return False
+            ts = parse_timestamp(line)
+            if ts is not None and ((since and ts < since) or (until and ts > until)):
+                return False
+            return True
+
+        return matches
+
+    def iter_range(self, since=None, until=None, text=None):
+        """Yield lines in the time range containing text, oldest first
+
+        Blocks are decompressed one at a time as lines are consumed, so a
+        caller that stops early never reads the rest of the range.
+        """
+        matches = self._matcher(since, until, text)
+        grams = trigrams(text) if text else set()
+
+        with self._lock:
+            segments = list(self.segments)
+
+        for segment in segments:
+            if segment.first is not None and until and segment.first > until:
+                break
+            if segment.last is not None and since and segment.last < since:
+                continue
+            if not segment.might_contain(grams):
+                continue
+            for block in list(segment.blocks):
+                if (since and block['last'] < since) or (until and block['first'] > until):
+                    continue
+                try:
+                    lines = segment.read_block(block)
+                except (OSError, zlib.error) as e:
+                    logger.warning(f"Skipping unreadable archive block in {segment.path}: {e}")
+                    continue
+                for line in lines:
+                    if matches(line):
+                        yield line
+
+        # Lines not yet written to a block
+        with self._lock:
+            pending = list(self._buffer)
+        for line in pending:
+            if matches(line):
+                yield line
+
+    def search(self, since=None, until=None, text=None, limit=1000):
+        """Return up to limit of the newest lines in the time range containing text
+
+        since and until are epoch nanoseconds; text is a case-insensitive
+        substring. Lines come back oldest first.
+        """
+        matches = self._matcher(since, until, text)
+        grams = trigrams(text) if text else set()
+
+        with self._lock:
+            pending = list(self._buffer)
+            segments = list(self.segments)
+
+        found = [line for line in reversed(pending) if matches(line)][:limit]
+
+        # Walk newest to oldest so the search stops as soon as the limit is reached
+        for segment in reversed(segments):
+            if len(found) >= limit:
+                break
+            if segment.last is not None and since and segment.last < since:
+                break
+            if segment.first is not None and until and segment.first > until:
+                continue
+            if not segment.might_contain(grams):
+                continue
+            for block in reversed(segment.blocks):
+                if (since and block['last'] < since) or (until and block['first'] > until):
+                    continue
+                try:
+                    lines = segment.read_block(block)
+                except (OSError, zlib.error) as e:
+                    logger.warning(f"Skipping unreadable archive block in {segment.path}: {e}")
+                    continue
+                for line in reversed(lines):
+                    if matches(line):
+                        found.append(line)
+                        if len(found) >= limit:
+                            break
+                if len(found) >= limit:
+                    break
+
+        found.reverse()
+        return found
+
+    def prune(self, max_age=None, now=None):
+        """Remove sealed segments whose newest line is older than max_age seconds"""
+        if not max_age:
+            return
+        cutoff = ((now or time.time()) - max_age) * 1_000_000_000
+        with self._lock:
+            for segment in list(self.segments):
+                if segment is self._current:
+                    continue
+                if not segment.blocks or (segment.last is not None and segment.last < cutoff):
+                    segment.remove()
+                    self.segments.remove(segment)
+
+
+class LogArchive:
+    """Per-container archives under one directory, with size and age retention"""
+
+    def __init__(self, root, compression='gzip', block_bytes=DEFAULT_BLOCK_BYTES,
+                 segment_bytes=DEFAULT_SEGMENT_BYTES, max_age_days=14, max_bytes=None,
+                 flush_interval=5, block_age=DEFAULT_BLOCK_AGE):
+        """Initialize the archive root
+
+        Every flush_interval seconds, buffers older than block_age seconds
+        are written out as blocks.
+        """
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed, archiving logs with gzip instead")
+            compression = 'gzip'
+        self.root = root
+        self.compression = compression
+        self.block_bytes = block_bytes
+        self.segment_bytes = segment_bytes
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.block_age = block_age
+        self._containers = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        os.makedirs(root, exist_ok=True)
+
+    def container(self, key):
+        """Get the archive for a container key (container name, or host/container)"""
+        with self._lock:
+            archive = self._containers.get(key)
+            if archive is None:
+                directory = os.path.join(self.root, SAFE_KEY_RE.sub('_', key))
+                archive = self._containers[key] = ContainerArchive(
+                    directory,
+                    compression=self.compression,
+                    block_bytes=self.block_bytes,
+                    segment_bytes=self.segment_bytes,
+                    block_age=self.block_age
+                )
+            return archive
+
+    def search(self, key, since=None, until=None, text=None, limit=1000):
+        """Search one container's archived lines"""
+        return self.container(key).search(since=since, until=until, text=text, limit=limit)
+
+    def start(self):
+        """Start periodic flushing and retention"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='log-archive', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and seal every open segment"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        with self._lock:
+            archives = list(self._containers.values())
+        for archive in archives:
+            archive.close()
+
+    def _run(self):
+        last_prune = 0
+        while not self._stop_event.wait(self.flush_interval):
+            with self._lock:
+                archives = list(self._containers.values())
+            for archive in archives:
+                archive.flush(force=False)
+            if time.time() - last_prune >= 600:
+                self.prune()
+                last_prune = time.time()
+
+    def prune(self):
+        """Apply age retention per container, then drop the oldest segments over max_bytes"""
+        with self._lock:
+            archives = list(self._containers.values())
+        for archive in archives:
+            archive.prune(self.max_age)
+
+        if not self.max_bytes:
+            return
+        sealed = []
+        total = 0
+        for archive in archives:
+            with archive._lock:
+                for segment in archive.segments:
+                    size = segment.size
+                    total += size
+                    if segment is not archive._current:
+                        sealed.append((segment.last or 0, size, archive, segment))
+        sealed.sort(key=lambda item: item[0])
+        for _, size, archive, segment in sealed:
+            if total <= self.max_bytes:
+                break
+            with archive._lock:
+                segment.remove()
+                if segment in archive.segments:
+                    archive.segments.remove(segment)
+            total -= size
+            logger.info(f"Removed archived log segment {segment.path} to stay under the size limit")
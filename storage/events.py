@@ -0,0 +1,215 @@
+"""
+SQLite store of matched error lines with per-minute and per-hour rollups
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger('monitorr.storage.events')
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    monitor TEXT NOT NULL,
+    container TEXT,
+    ts REAL NOT NULL,
+    pattern TEXT,
+    line TEXT
+);
+CREATE INDEX IF NOT EXISTS errors_monitor_ts ON errors (monitor, ts);
+CREATE INDEX IF NOT EXISTS errors_ts ON errors (ts);
+CREATE TABLE IF NOT EXISTS error_minutes (
+    monitor TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (monitor, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS error_hours (
+    monitor TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (monitor, bucket)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_SQL = """
+INSERT INTO {table} (monitor, bucket, count) VALUES (?, ?, ?)
+ON CONFLICT (monitor, bucket) DO UPDATE SET count = count + excluded.count
+"""
+
+
+class EventStore:
+    """Error history written in batches by a background thread
+
+    Matched lines are buffered in memory and committed every
+    flush_interval seconds (or once batch_size lines are waiting), with
+    the minute and hour rollups updated in the same transaction. Reads
+    use per-thread connections, which WAL mode lets run alongside writes.
+    """
+
+    def __init__(self, path, flush_interval=2, batch_size=500, retention_days=7,
+                 minute_retention_days=2, hour_retention_days=90):
+        """Initialize the store, creating the database if needed"""
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retention = retention_days * DAY
+        self.minute_retention = minute_retention_days * DAY
+        self.hour_retention = hour_retention_days * DAY
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._local = threading.local()
+        self._last_prune = 0
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        """Connection for queries on the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def record_errors(self, monitor, matches):
+        """Monitor sink hook: buffer (line, pattern) matches for a monitor"""
+        now = time.time()
+        with self._lock:
+            self._pending.extend((monitor.name, monitor.container_name, now, pattern, line) for line, pattern in matches)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    def start(self):
+        """Start the background writer"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='event-store', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer and commit anything still buffered"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        """Commit batches until stopped"""
+        conn = self._connect()
+        try:
+            while not self._stop_event.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self.flush(conn)
+                if time.time() - self._last_prune >= HOUR:
+                    self.prune(conn)
+            self.flush(conn)
+        finally:
+            conn.close()
+
+    def flush(self, conn=None):
+        """Write buffered lines and update the rollups in one transaction"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        minutes = {}
+        hours = {}
+        for monitor, _, ts, _, _ in batch:
+            minute = (monitor, int(ts // MINUTE) * MINUTE)
+            hour = (monitor, int(ts // HOUR) * HOUR)
+            minutes[minute] = minutes.get(minute, 0) + 1
+            hours[hour] = hours.get(hour, 0) + 1
+
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            with conn:
+                conn.executemany('INSERT INTO errors (monitor, container, ts, pattern, line) VALUES (?, ?, ?, ?, ?)', batch)
+                conn.executemany(ROLLUP_SQL.format(table='error_minutes'), [(m, b, c) for (m, b), c in minutes.items()])
+                conn.executemany(ROLLUP_SQL.format(table='error_hours'), [(m, b, c) for (m, b), c in hours.items()])
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write {len(batch)} error events: {e}")
+        finally:
+            if own:
+                conn.close()
+
+    def prune(self, conn=None):
+        """Delete raw lines and rollups past their retention"""
+        now = time.time()
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            with conn:
+                conn.execute('DELETE FROM errors WHERE ts < ?', (now - self.retention,))
+                conn.execute('DELETE FROM error_minutes WHERE bucket < ?', (now - self.minute_retention,))
+                conn.execute('DELETE FROM error_hours WHERE bucket < ?', (now - self.hour_retention,))
+            self._last_prune = now
+        except sqlite3.Error as e:
+            logger.error(f"Failed to prune error events: {e}")
+        finally:
+            if own:
+                conn.close()
+
+    def _rollup_table(self, window):
+        """Finest rollup that still covers the window"""
+        if window <= self.minute_retention:
+            return 'error_minutes', MINUTE
+        return 'error_hours', HOUR
+
+    def counts(self, window=DAY, monitor=None):
+        """Errors per monitor over the last window seconds"""
+        table, width = self._rollup_table(window)
+        since = int((time.time() - window) // width) * width
+        sql = f'SELECT monitor, SUM(count) FROM {table} WHERE bucket >= ?'
+        params = [since]
+        if monitor is not None:
+            sql += ' AND monitor = ?'
+            params.append(monitor)
+        sql += ' GROUP BY monitor'
+        return dict(self._reader().execute(sql, params).fetchall())
+
+    def series(self, monitor, window=DAY, points=24):
+        """Error counts for a monitor in equal slices of the window, oldest first"""
+        table, width = self._rollup_table(window)
+        now = time.time()
+        step = max(window / points, width)
+        start = now - step * points
+        counts = [0] * points
+        rows = self._reader().execute(
+            f'SELECT bucket, count FROM {table} WHERE monitor = ? AND bucket >= ?',
+            (monitor, int(start // width) * width)
+        )
+        for bucket, count in rows:
+            index = min(max(int((bucket - start) // step), 0), points - 1)
+            counts[index] += count
+        return counts
+
+    def recent(self, monitor, limit=50):
+        """Most recent raw error lines for a monitor"""
+        rows = self._reader().execute(
+            'SELECT ts, container, pattern, line FROM errors WHERE monitor = ? ORDER BY ts DESC LIMIT ?',
+            (monitor, limit)
+        )
+        return [{'ts': ts, 'container': container, 'pattern': pattern, 'line': line} for ts, container, pattern, line in rows]
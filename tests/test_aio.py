@@ -0,0 +1,115 @@
+"""
+Tests for the asyncio ingestion engine's stream and event handling
+"""
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from engine.aio import AsyncEngine
+from engine.metrics import MonitorMetrics
+from monitors.base import BaseMonitor
+
+LINES = [
+    b'2024-01-01T00:00:01.000000001Z starting',
+    b'2024-01-01T00:00:02.000000002Z ready',
+]
+
+
+class Recorder:
+    """Stands in for the ring buffer and archive, keeping every line teed through it"""
+
+    def __init__(self):
+        self.lines = []
+        self.live = False
+
+    def tee(self, lines):
+        for line in lines:
+            self.lines.append(line)
+            yield line
+
+
+class FakeBody:
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    async def iter_lines(self):
+        for line in self.lines:
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self):
+        self.inspects = 0
+
+    async def inspect_container(self, name):
+        self.inspects += 1
+        return None
+
+    async def logs(self, container_id, follow=True, since=None, tail='all'):
+        return FakeBody(LINES)
+
+
+def make_engine(**config):
+    monitor = BaseMonitor(None, {'container_name': 'app', 'reconnect_delay': 60, **config}, None)
+    engine = AsyncEngine({'app': monitor}, FakeClient())
+    return engine, monitor
+
+
+class AsyncEngineTest(unittest.TestCase):
+    def test_stream_uses_the_monitor_tee(self):
+        engine, monitor = make_engine()
+        self.addCleanup(engine._executor.shutdown)
+        monitor.ring = Recorder()
+        monitor.archive = Recorder()
+        monitor.metrics = MonitorMetrics('aio-test')
+        container = SimpleNamespace(id='abc', tty=True, status='running')
+
+        asyncio.run(engine._stream(monitor, container))
+
+        expected = [line.decode() for line in LINES]
+        self.assertEqual(monitor.ring.lines, expected)
+        self.assertEqual(monitor.archive.lines, expected)
+        self.assertEqual(monitor.metrics.lines.value, 2)
+        self.assertEqual(monitor.metrics.bytes.value, sum(len(line) for line in expected))
+
+    def test_paused_monitor_waits_for_a_start_event(self):
+        engine, monitor = make_engine()
+        self.addCleanup(engine._executor.shutdown)
+
+        async def run():
+            monitor.pause()
+            task = asyncio.create_task(engine._follow(monitor))
+            await asyncio.sleep(0.05)
+            self.assertEqual(engine.client.inspects, 0)
+
+            engine._handle_event({'Action': 'start', 'Actor': {'Attributes': {'name': 'app'}}})
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertFalse(monitor.paused)
+        self.assertEqual(engine.client.inspects, 1)
+
+    def test_events_pause_monitors_while_the_stream_is_connected(self):
+        engine, monitor = make_engine()
+        self.addCleanup(engine._executor.shutdown)
+
+        engine._set_event_driven(True)
+        self.assertTrue(monitor.event_driven)
+        engine._handle_event({'Action': 'die', 'Actor': {'Attributes': {'name': 'app'}}})
+        self.assertTrue(monitor.paused)
+
+        # Once the events stream drops nothing would resume it
+        engine._set_event_driven(False)
+        self.assertFalse(monitor.event_driven)
+        self.assertFalse(monitor.paused)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests for the compressed log archive and its bloom filters
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from storage import archive as archive_module
+from storage.archive import BloomFilter, ContainerArchive, trigrams
+
+NANOS = 1_000_000_000
+
+
+def line(second, text):
+    return f"2024-01-01T00:00:{second:02d}.000000000Z {text}"
+
+
+def ts(second):
+    return archive_module.parse_timestamp(line(second, ''))
+
+
+class TrigramTest(unittest.TestCase):
+    def test_trigrams_are_per_word_and_lowercase(self):
+        self.assertEqual(trigrams('Disk  OK'), {'dis', 'isk'})
+        self.assertEqual(trigrams('a b'), set())
+
+    def test_substring_trigrams_are_a_subset_of_the_line(self):
+        self.assertTrue(trigrams('rror: dis') <= trigrams('error: disk full'))
+
+
+class ContainerArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def make_archive(self, **kwargs):
+        return ContainerArchive(self.dir, block_bytes=64, **kwargs)
+
+    def test_search_by_time_and_text(self):
+        archive = self.make_archive()
+        for second in range(10):
+            archive.append(line(second, 'error: disk full' if second % 3 == 0 else 'all good'))
+        archive.close()
+
+        reopened = self.make_archive()
+        self.assertEqual(len(reopened.search(text='DISK')), 4)
+        self.assertEqual(reopened.search(since=ts(4), until=ts(7), text='disk'), [line(6, 'error: disk full')])
+        self.assertEqual(reopened.search(limit=2), [line(8, 'all good'), line(9, 'error: disk full')])
+        self.assertEqual(list(reopened.iter_range(since=ts(8))), [line(8, 'all good'), line(9, 'error: disk full')])
+
+    def test_bloom_filter_prunes_segments(self):
+        archive = self.make_archive()
+        archive.append(line(1, 'connection refused'))
+        archive.close()
+        segment = archive.segments[0]
+        self.assertFalse(segment.might_contain(trigrams('timeout')))
+        self.assertTrue(segment.might_contain(trigrams('refused')))
+        with mock.patch.object(segment, 'read_block') as read_block:
+            self.assertEqual(archive.search(text='timeout'), [])
+            read_block.assert_not_called()
+
+    def test_quiet_buffers_are_written_once_old_enough(self):
+        archive = self.make_archive(block_age=60)
+        archive.append(line(1, 'x'))
+        archive.flush(force=False)
+        self.assertEqual(archive.segments, [])
+        archive._buffer_started -= 61
+        archive.flush(force=False)
+        self.assertEqual(len(archive.segments[0].blocks), 1)
+
+    def test_bloom_filter_is_completed_after_a_crash(self):
+        archive = self.make_archive()
+        archive.append(line(1, 'early ' + 'x' * 64))
+        # The filter is saved before the first block; later blocks are only in the index
+        archive.append(line(2, 'later timeout ' + 'y' * 64))
+        segment = archive.segments[0]
+        self.assertEqual(BloomFilter.load(segment.bloom_path).covered, 0)
+
+        # Reopen without sealing, as after a crash
+        reopened = self.make_archive()
+        recovered = reopened.segments[0]
+        self.assertEqual(len(recovered.blocks), 2)
+        self.assertTrue(recovered.might_contain(trigrams('timeout')))
+        self.assertEqual(recovered.bloom.covered, 2)
+        self.assertEqual(reopened.search(text='timeout'), [line(2, 'later timeout ' + 'y' * 64)])
+
+    def test_old_format_filters_are_trusted(self):
+        archive = self.make_archive()
+        archive.append(line(1, 'connection refused'))
+        archive.close()
+        segment = archive.segments[0]
+        with open(segment.bloom_path, 'rb+') as f:
+            f.truncate(os.path.getsize(segment.bloom_path) - archive_module.BLOOM_COVERED.size)
+
+        bloom = BloomFilter.load(segment.bloom_path)
+        self.assertIsNone(bloom.covered)
+        self.assertTrue(self.make_archive().segments[0].might_contain(trigrams('refused')))
+
+    def test_prune_removes_old_sealed_segments(self):
+        archive = self.make_archive()
+        archive.append(line(1, 'old'))
+        archive.close()
+        archive.append(line(2, 'current'))
+        archive.flush()
+        self.assertEqual(len(archive.segments), 2)
+
+        archive.prune(max_age=60, now=ts(1) / NANOS + 3600)
+        self.assertEqual(len(archive.segments), 1)
+        self.assertEqual(archive.search(), [line(2, 'current')])
+
+
+if __name__ == '__main__':
+    unittest.main()
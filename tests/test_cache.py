@@ -0,0 +1,88 @@
+"""
+Tests for the shared container metadata cache
+"""
+
+import unittest
+from unittest import mock
+
+import docker.errors
+
+from engine.cache import ContainerCache
+
+
+def inspect_data(id, name):
+    return {
+        'Id': id,
+        'Name': f'/{name}',
+        'State': {'Status': 'running'},
+        'Config': {'Image': 'nginx:latest', 'Tty': True},
+        'HostConfig': {'LogConfig': {'Type': 'json-file'}},
+        'Created': '2024-01-01T00:00:00Z',
+    }
+
+
+class FakeClient:
+    def __init__(self, api):
+        self.api = api
+
+
+class FakeAPI:
+    def __init__(self, containers):
+        self.containers = containers
+        self.inspects = 0
+
+    def inspect_container(self, name_or_id):
+        self.inspects += 1
+        for data in self.containers:
+            if name_or_id in (data['Id'], data['Id'][:12], data['Name'].lstrip('/')):
+                return data
+        raise docker.errors.NotFound('no such container')
+
+
+def make_cache(ttl=60):
+    api = FakeAPI([inspect_data('a' * 64, 'web')])
+    return ContainerCache(FakeClient(api), ttl=ttl), api
+
+
+class ContainerCacheTest(unittest.TestCase):
+    def test_handles_are_cached_under_name_and_id(self):
+        cache, api = make_cache()
+        handle = cache.get('web')
+        self.assertEqual((handle.name, handle.status, handle.tty, handle.log_driver),
+                         ('web', 'running', True, 'json-file'))
+        self.assertIs(cache.get('a' * 64), handle)
+        self.assertEqual(api.inspects, 1)
+
+    def test_missing_containers_are_cached_too(self):
+        cache, api = make_cache()
+        self.assertIsNone(cache.get('db'))
+        self.assertIsNone(cache.get('db'))
+        self.assertEqual(api.inspects, 1)
+
+    def test_entries_expire(self):
+        cache, api = make_cache(ttl=10)
+        with mock.patch('engine.cache.time.monotonic', return_value=100):
+            cache.get('web')
+        with mock.patch('engine.cache.time.monotonic', return_value=111):
+            cache.get('web')
+        self.assertEqual(api.inspects, 2)
+
+    def test_invalidate_drops_every_alias(self):
+        cache, api = make_cache()
+        cache.get('web')
+        cache.get('a' * 12)
+        cache.invalidate('web')
+        self.assertEqual(cache._entries, {})
+        cache.get('web')
+        cache.invalidate()
+        self.assertEqual(cache._entries, {})
+
+    def test_one_cache_per_client(self):
+        client = FakeClient(FakeAPI([]))
+        cache = ContainerCache.for_client(client)
+        self.assertIs(ContainerCache.for_client(client, ttl=5), cache)
+        self.assertEqual(cache.ttl, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for nanosecond log cursors and the checkpoint store
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from monitors.checkpoint import LogCursor, CheckpointStore, parse_timestamp
+
+
+class ParseTimestampTest(unittest.TestCase):
+    def test_nanosecond_precision(self):
+        self.assertEqual(parse_timestamp('1970-01-01T00:00:01.000000002Z x'), 1_000_000_002)
+        self.assertEqual(parse_timestamp('1970-01-01T00:00:01.5Z x'), 1_500_000_000)
+
+    def test_offsets_are_converted_to_utc(self):
+        self.assertEqual(parse_timestamp('1970-01-01T01:00:00+01:00 x'), 0)
+
+    def test_lines_without_timestamps(self):
+        self.assertIsNone(parse_timestamp('no timestamp here'))
+
+
+class LogCursorTest(unittest.TestCase):
+    def test_lines_at_or_before_the_cursor_are_dropped(self):
+        cursor = LogCursor()
+        self.assertTrue(cursor.accept('2024-01-01T00:00:02.000000001Z b'))
+        self.assertFalse(cursor.accept('2024-01-01T00:00:01.999999999Z a'))
+        self.assertFalse(cursor.accept('2024-01-01T00:00:02.000000001Z b'))
+        self.assertTrue(cursor.accept('2024-01-01T00:00:02.000000002Z c'))
+
+    def test_distinct_lines_sharing_a_timestamp_are_kept(self):
+        cursor = LogCursor()
+        self.assertTrue(cursor.accept('2024-01-01T00:00:02Z first'))
+        self.assertTrue(cursor.accept('2024-01-01T00:00:02Z second'))
+        self.assertFalse(cursor.accept('2024-01-01T00:00:02Z first'))
+
+    def test_since_is_whole_seconds(self):
+        cursor = LogCursor()
+        self.assertIsNone(cursor.since())
+        cursor.accept('1970-01-01T00:00:05.900000000Z x')
+        self.assertEqual(cursor.since(), 5)
+
+    def test_lines_without_timestamps_are_never_dropped(self):
+        cursor = LogCursor()
+        cursor.accept('2024-01-01T00:00:02Z b')
+        self.assertTrue(cursor.accept('continuation line'))
+        self.assertTrue(cursor.accept('continuation line'))
+
+    def test_round_trips_through_a_dict(self):
+        cursor = LogCursor()
+        cursor.accept('2024-01-01T00:00:02Z first')
+        restored = LogCursor.from_dict(json.loads(json.dumps(cursor.to_dict())))
+        self.assertFalse(restored.accept('2024-01-01T00:00:02Z first'))
+        self.assertTrue(restored.accept('2024-01-01T00:00:02Z second'))
+
+
+class CheckpointStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'checkpoints.json')
+
+    def test_cursors_survive_a_restart(self):
+        store = CheckpointStore(self.path)
+        store.cursor('app').accept('2024-01-01T00:00:02Z done')
+        store.stop()
+
+        restored = CheckpointStore(self.path).cursor('app')
+        self.assertFalse(restored.accept('2024-01-01T00:00:02Z done'))
+        self.assertTrue(restored.accept('2024-01-01T00:00:03Z next'))
+
+    def test_unreadable_file_starts_empty(self):
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertIsNone(CheckpointStore(self.path).cursor('app').nanos)
+
+    def test_unchanged_cursors_are_not_rewritten(self):
+        store = CheckpointStore(self.path)
+        store.cursor('app').accept('2024-01-01T00:00:02Z done')
+        store.flush()
+        mtime = os.stat(self.path).st_mtime_ns
+        os.utime(self.path, ns=(0, 0))
+        store.flush()
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertNotEqual(mtime, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
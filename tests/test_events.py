@@ -0,0 +1,80 @@
+"""
+Tests for the SQLite error event store and its rollups
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from storage.events import HOUR, MINUTE, EventStore
+
+
+def monitor(name):
+    return SimpleNamespace(name=name, container_name=name)
+
+
+class EventStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.store = EventStore(os.path.join(self.dir, 'events.db'))
+
+    def record(self, name, lines, at):
+        with mock.patch('storage.events.time.time', return_value=at):
+            self.store.record_errors(monitor(name), [(line, 'error') for line in lines])
+
+    def test_flush_writes_lines_and_rollups(self):
+        now = time.time()
+        self.record('web', ['a', 'b'], now - 10)
+        self.record('db', ['c'], now - 10)
+        self.store.flush()
+
+        self.assertEqual(self.store.counts(), {'web': 2, 'db': 1})
+        self.assertEqual(self.store.counts(monitor='db'), {'db': 1})
+        self.assertEqual(sorted(event['line'] for event in self.store.recent('web')), ['a', 'b'])
+
+    def test_long_windows_use_hourly_rollups(self):
+        now = time.time()
+        self.record('web', ['old'], now - 5 * 86400)
+        self.record('web', ['new'], now - 10)
+        self.store.flush()
+        self.assertEqual(self.store._rollup_table(30 * 86400), ('error_hours', HOUR))
+        self.assertEqual(self.store._rollup_table(3600), ('error_minutes', MINUTE))
+        self.assertEqual(self.store.counts(window=30 * 86400), {'web': 2})
+        self.assertEqual(self.store.counts(window=3600), {'web': 1})
+
+    def test_series_places_counts_in_slices(self):
+        now = time.time()
+        self.record('web', ['a'], now - 10)
+        self.record('web', ['b', 'c'], now - 3 * 3600)
+        self.store.flush()
+        series = self.store.series('web', window=86400, points=24)
+        self.assertEqual(sum(series), 3)
+        self.assertEqual(series[-1], 1)
+
+    def test_prune_applies_retention(self):
+        now = time.time()
+        self.record('web', ['old'], now - 10 * 86400)
+        self.record('web', ['new'], now - 10)
+        self.store.flush()
+        self.store.prune()
+        self.assertEqual([event['line'] for event in self.store.recent('web')], ['new'])
+        # Hourly rollups outlive the raw lines and minute buckets
+        self.assertEqual(self.store.counts(window=30 * 86400), {'web': 2})
+        minutes = self.store._reader().execute('SELECT COUNT(*) FROM error_minutes').fetchone()[0]
+        self.assertEqual(minutes, 1)
+
+    def test_stop_commits_buffered_lines(self):
+        self.store.flush_interval = 60
+        self.store.start()
+        self.record('web', ['a'], time.time())
+        self.store.stop()
+        self.assertEqual(self.store.counts(), {'web': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
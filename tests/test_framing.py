@@ -0,0 +1,92 @@
+"""
+Tests for the multiplexed log frame parser
+"""
+
+import io
+import unittest
+from unittest import mock
+
+import docker.errors
+import requests
+
+from monitors.framing import HEADER, STDERR, STDOUT, FrameDemuxer, iter_frame_lines, open_log_stream
+
+
+def frame(stream, payload):
+    return HEADER.pack(stream, len(payload)) + payload
+
+
+def demux(data, **kwargs):
+    return [(stream, bytes(line)) for stream, line in FrameDemuxer(io.BytesIO(data), **kwargs)]
+
+
+class FrameDemuxerTest(unittest.TestCase):
+    def test_splits_frames_into_lines_per_stream(self):
+        data = frame(STDOUT, b'one\ntwo\n') + frame(STDERR, b'oops\n')
+        self.assertEqual(demux(data), [(STDOUT, b'one'), (STDOUT, b'two'), (STDERR, b'oops')])
+
+    def test_lines_split_across_frames_are_joined_per_stream(self):
+        data = frame(STDOUT, b'hel') + frame(STDERR, b'err\n') + frame(STDOUT, b'lo\nnext')
+        self.assertEqual(demux(data), [(STDERR, b'err'), (STDOUT, b'hello'), (STDOUT, b'next')])
+
+    def test_buffer_grows_for_large_frames(self):
+        payload = b'x' * 100 + b'\n'
+        self.assertEqual(demux(frame(STDOUT, payload), buffer_size=16), [(STDOUT, b'x' * 100)])
+
+    def test_long_lines_are_truncated(self):
+        data = frame(STDOUT, b'abcdef') + frame(STDOUT, b'ghij\nshort\n')
+        self.assertEqual(demux(data, max_line_length=4), [(STDOUT, b'abcd'), (STDOUT, b'shor')])
+
+    def test_stream_ending_inside_a_frame_stops(self):
+        data = frame(STDOUT, b'done\n') + HEADER.pack(STDOUT, 50) + b'partial'
+        self.assertEqual(demux(data), [(STDOUT, b'done')])
+
+    def test_iter_frame_lines_filters_and_decodes(self):
+        data = frame(STDOUT, b'out\r\n') + frame(STDERR, b'caf\xc3\xa9\n')
+        self.assertEqual(list(iter_frame_lines(io.BytesIO(data), streams=(STDERR,))), ['café'])
+        self.assertEqual(list(iter_frame_lines(io.BytesIO(data))), ['out', 'café'])
+
+
+class FakeAPI(requests.Session):
+    base_url = 'http+docker://localhost'
+    api_version = '1.41'
+    timeout = 10
+
+    def __init__(self, status=200):
+        super().__init__()
+        self.status = status
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        response = requests.Response()
+        response.status_code = self.status
+        response.url = url
+        response.raw = io.BytesIO(b'')
+        return response
+
+
+class OpenLogStreamTest(unittest.TestCase):
+    def test_follow_streams_have_no_read_timeout(self):
+        api = FakeAPI()
+        open_log_stream(api, 'abc', follow=True, since=5)
+        url, kwargs = api.requests[0]
+        self.assertEqual(url, 'http+docker://localhost/v1.41/containers/abc/logs')
+        self.assertIsNone(kwargs['timeout'])
+        self.assertEqual(kwargs['params']['since'], 5)
+        self.assertEqual(kwargs['params']['follow'], 1)
+
+        open_log_stream(api, 'abc')
+        self.assertEqual(api.requests[1][1]['timeout'], 10)
+
+    def test_errors_raise_docker_exceptions(self):
+        with self.assertRaises(docker.errors.NotFound):
+            open_log_stream(FakeAPI(status=404), 'missing')
+
+    def test_rejects_clients_that_are_not_sessions(self):
+        with self.assertRaises(TypeError):
+            open_log_stream(mock.Mock(), 'abc')
+
+
+if __name__ == '__main__':
+    unittest.main()
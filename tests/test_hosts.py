@@ -0,0 +1,125 @@
+"""
+Tests for the pooled Docker clients and host registry
+"""
+
+import unittest
+from unittest import mock
+
+from engine import hosts
+from engine.cache import ContainerCache
+
+
+class FakeClient:
+    """Counts the daemon calls a pooled client makes"""
+
+    def __init__(self):
+        self.pings = 0
+        self.versions = 0
+
+    def ping(self):
+        self.pings += 1
+
+    def version(self):
+        self.versions += 1
+        return {'Version': '25.0.0'}
+
+
+class ClientPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = hosts.ClientPool()
+        self.connected = []
+        patcher = mock.patch.object(hosts, 'connect_docker', side_effect=self._connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _connect(self, docker_config):
+        client = FakeClient()
+        self.connected.append(client)
+        return client
+
+    def test_clients_are_shared_per_daemon(self):
+        first = self.pool.get({'host': 'tcp://a:2375', 'cache_ttl': 5})
+        second = self.pool.get({'host': 'tcp://a:2375'})
+        self.assertIs(first, second)
+        self.assertEqual(len(self.connected), 1)
+
+    def test_reconnect_applies_cache_ttl(self):
+        config = {'host': 'tcp://a:2375', 'cache_ttl': 42}
+        client = self.pool.get(config)
+        self.assertEqual(ContainerCache.for_client(client).ttl, 42)
+
+    def test_version_is_cached_per_client(self):
+        config = {'host': 'tcp://a:2375'}
+        self.assertEqual(self.pool.version(config)['Version'], '25.0.0')
+        self.pool.version(config)
+        client = self.connected[0]
+        self.assertEqual(client.versions, 1)
+        self.assertEqual(client.pings, 0)
+
+        self.pool.version(config, check=True)
+        self.assertEqual(client.versions, 2)
+        self.assertEqual(client.pings, 1)
+
+
+class ReconnectBackoffTest(unittest.TestCase):
+    def setUp(self):
+        self.attempts = 0
+        self.reachable = False
+        patcher = mock.patch.object(hosts, 'clients', hosts.ClientPool())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(hosts, 'connect_docker', side_effect=self._connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _connect(self, docker_config):
+        self.attempts += 1
+        if not self.reachable:
+            raise ConnectionError('connection refused')
+        return FakeClient()
+
+    def test_unreachable_host_is_not_retried_until_backoff_expires(self):
+        host = hosts.DockerHost('nas', {'host': 'tcp://nas:2375', 'reconnect_backoff': 60})
+        self.assertIsNone(host.get_client())
+        self.assertIsNone(host.get_client())
+        self.assertEqual(self.attempts, 1)
+        self.assertFalse(host.healthy)
+        self.assertIn('connection refused', host.last_error)
+
+        self.reachable = True
+        host.retry_at = 0
+        self.assertIsNotNone(host.get_client())
+        self.assertTrue(host.healthy)
+        self.assertEqual(host.failures, 0)
+
+    def test_backoff_doubles_up_to_the_maximum(self):
+        host = hosts.DockerHost('nas', {'host': 'tcp://nas:2375', 'reconnect_backoff': 100})
+        with mock.patch.object(hosts.time, 'monotonic', return_value=1000):
+            for expected in (100, 200, 300, 300):
+                host.retry_at = 0
+                host.get_client()
+                self.assertEqual(host.retry_at - 1000, expected)
+
+    def test_only_one_caller_retries_at_a_time(self):
+        host = hosts.DockerHost('nas', {'host': 'tcp://nas:2375'})
+        host._reconnecting.acquire()
+        try:
+            self.assertIsNone(host.get_client())
+        finally:
+            host._reconnecting.release()
+        self.assertEqual(self.attempts, 0)
+
+
+class HostRegistryTest(unittest.TestCase):
+    def test_extra_hosts_inherit_ttls(self):
+        registry = hosts.HostRegistry({
+            'docker': {'host': 'local', 'cache_ttl': 7, 'inventory_ttl': 3},
+            'docker_hosts': {'nas': {'host': 'tcp://nas:2375', 'inventory_ttl': 9}},
+        })
+        nas = registry.get('nas')
+        self.assertEqual(nas.config['cache_ttl'], 7)
+        self.assertEqual(nas.config['inventory_ttl'], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Tests for the single-pass error and ignore pattern matcher
+"""
+
+import unittest
+
+from monitors.matcher import PatternMatcher
+
+
+class PatternMatcherTest(unittest.TestCase):
+    def test_literals_are_merged_into_the_combined_regex(self):
+        matcher = PatternMatcher(['timeout', 'out-of-memory #2', r'failed \d+ times'])
+        self.assertEqual(matcher.errors.fallback, [])
+        self.assertEqual(len(matcher.errors.groups), 3)
+        self.assertEqual(matcher.match('Connection TIMEOUT'), 'timeout')
+        self.assertEqual(matcher.match('Out-Of-Memory #2 killed it'), 'out-of-memory #2')
+        self.assertEqual(matcher.match('failed 3 times'), r'failed \d+ times')
+        self.assertIsNone(matcher.match('all good'))
+
+    def test_first_pattern_in_config_order_is_reported(self):
+        # The regex matches earlier in the line, but the literal is listed first
+        matcher = PatternMatcher(['disk full', r'err(or)?'])
+        self.assertEqual(matcher.match('error: disk full'), 'disk full')
+
+        matcher = PatternMatcher([r'err(or)?', 'disk full'])
+        self.assertEqual(matcher.match('disk full: error'), r'err(or)?')
+
+    def test_unmergeable_patterns_fall_back(self):
+        matcher = PatternMatcher([r'(\w+) \1', r'(?P<code>5\d\d)', 'fatal'])
+        self.assertEqual([pattern for _, _, pattern in matcher.errors.fallback],
+                         [r'(\w+) \1', r'(?P<code>5\d\d)'])
+        self.assertEqual(matcher.match('again again'), r'(\w+) \1')
+        self.assertEqual(matcher.match('status 503 fatal'), r'(?P<code>5\d\d)')
+        self.assertEqual(matcher.match('fatal'), 'fatal')
+
+    def test_ignore_patterns_suppress_errors(self):
+        matcher = PatternMatcher(['error'], ['expected error'])
+        self.assertEqual(matcher.match('unexpected failure error'), 'error')
+        self.assertIsNone(matcher.match('an Expected Error occurred'))
+        self.assertTrue(matcher.is_error('an expected error occurred'))
+        self.assertTrue(matcher.is_ignored('an expected error occurred'))
+
+    def test_invalid_pattern_raises(self):
+        with self.assertRaises(Exception):
+            PatternMatcher(['unclosed ('])
+
+
+if __name__ == '__main__':
+    unittest.main()
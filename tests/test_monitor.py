@@ -0,0 +1,55 @@
+"""
+Tests for BaseMonitor's log processing
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from monitors.base import BaseMonitor
+
+
+class AlertRecorder:
+    def __init__(self):
+        self.alerts = []
+
+    def send_alert(self, alert_data):
+        self.alerts.append(alert_data)
+
+
+def make_monitor(**config):
+    alerts = AlertRecorder()
+    monitor = BaseMonitor(None, {'container_name': 'app', **config}, alerts)
+    return monitor, alerts
+
+
+class BaseMonitorTest(unittest.TestCase):
+    def test_patterns_are_compiled_once_into_the_matcher(self):
+        monitor, _ = make_monitor(error_patterns=['fatal'], ignore_patterns=['harmless'])
+        self.assertFalse(hasattr(monitor, 'compiled_error_patterns'))
+        self.assertFalse(hasattr(monitor, 'compiled_ignore_patterns'))
+        self.assertEqual(monitor.match_error('FATAL: disk gone'), 'fatal')
+        self.assertIsNone(monitor.match_error('fatal but harmless'))
+        self.assertIsNone(monitor.match_error('   '))
+
+    def test_pattern_changes_take_effect_after_recompiling(self):
+        monitor, _ = make_monitor(error_patterns=['fatal'])
+        monitor.error_patterns = ['panic']
+        monitor._compile_patterns()
+        self.assertEqual(monitor.match_error('kernel panic'), 'panic')
+        self.assertIsNone(monitor.match_error('fatal'))
+
+    def test_new_error_lines_are_alerted_once(self):
+        monitor, alerts = make_monitor(error_patterns=['error'])
+        logs = '\n'.join([
+            '2024-01-01T00:00:01.000000001Z starting',
+            '2024-01-01T00:00:02.000000002Z error: disk full',
+        ])
+        container = SimpleNamespace(id='abc123')
+        monitor.process_logs(logs, container)
+        monitor.process_logs(logs, container)
+        self.assertEqual(len(alerts.alerts), 1)
+        self.assertEqual(alerts.alerts[0]['container_name'], 'app')
+
+
+if __name__ == '__main__':
+    unittest.main()
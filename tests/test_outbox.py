@@ -0,0 +1,145 @@
+"""
+Tests for the durable alert outbox and the alert cooldown around it
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from alerts import AlertManager
+from alerts.outbox import AlertOutbox
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class Recorder:
+    """A deliver callback that records alerts and can be told to fail"""
+
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, alerter_name, alert_data):
+        if self.fail:
+            raise ConnectionError('webhook down')
+        with self.lock:
+            self.sent.append((alerter_name, alert_data))
+
+
+class AlertOutboxTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'outbox.jsonl')
+
+    def make_outbox(self, deliver, **kwargs):
+        outbox = AlertOutbox(self.path, deliver, sync_interval=0.01, retry_delay=0.01, **kwargs)
+        self.addCleanup(outbox.stop)
+        return outbox
+
+    def records(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_alerts_queued_before_start_are_journaled_not_sent(self):
+        deliver = Recorder()
+        outbox = self.make_outbox(deliver)
+        outbox.put('discord', {'container_name': 'app'})
+        time.sleep(0.05)
+
+        self.assertFalse(outbox.running)
+        self.assertEqual(deliver.sent, [])
+        self.assertEqual([record['op'] for record in self.records()], ['add'])
+
+        outbox.start()
+        wait_for(lambda: deliver.sent)
+        self.assertEqual(deliver.sent, [('discord', {'container_name': 'app'})])
+
+    def test_put_after_stop_is_refused(self):
+        outbox = self.make_outbox(Recorder())
+        outbox.start()
+        outbox.stop()
+        self.assertIsNone(outbox.put('discord', {'container_name': 'app'}))
+        self.assertEqual(len(outbox), 0)
+
+    def test_undelivered_alerts_are_replayed(self):
+        outbox = self.make_outbox(Recorder())
+        outbox.put('smtp', {'container_name': 'a'})
+        delivered = outbox.put('smtp', {'container_name': 'b'})
+        with outbox._cond:
+            outbox._finish(outbox._entries[delivered])
+            outbox._sync()
+
+        deliver = Recorder()
+        replayed = self.make_outbox(deliver)
+        self.assertEqual(len(replayed), 1)
+        replayed.start()
+        wait_for(lambda: deliver.sent)
+        self.assertEqual(deliver.sent, [('smtp', {'container_name': 'a'})])
+
+    def test_torn_final_line_is_skipped(self):
+        outbox = self.make_outbox(Recorder())
+        outbox.put('smtp', {'container_name': 'a'})
+        with open(self.path, 'a') as f:
+            f.write('{"op": "add", "id": "tor')
+        self.assertEqual(len(self.make_outbox(Recorder())), 1)
+
+    def test_journal_is_compacted(self):
+        deliver = Recorder()
+        outbox = self.make_outbox(deliver, compact_after=3)
+        outbox.start()
+        for index in range(3):
+            outbox.put('smtp', {'container_name': f'c{index}'})
+        wait_for(lambda: len(deliver.sent) == 3)
+        wait_for(lambda: outbox._finished == 0)
+        outbox.stop()
+        self.assertEqual(self.records(), [])
+
+    def test_give_up_reports_the_alert(self):
+        given_up = []
+        outbox = self.make_outbox(Recorder(fail=True), max_attempts=2,
+                                  on_give_up=lambda *args: given_up.append(args))
+        outbox.start()
+        outbox.put('discord', {'container_name': 'app'})
+        wait_for(lambda: given_up)
+        self.assertEqual(given_up[0][:2], ('discord', {'container_name': 'app'}))
+        self.assertEqual(len(outbox), 0)
+
+
+class FailingAlerter:
+    def send(self, alert_data):
+        raise ConnectionError('webhook down')
+
+
+class AlertCooldownTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_cooldown_is_lifted_when_delivery_is_given_up(self):
+        manager = AlertManager({
+            'discord': {'cooldown': 3600},
+            'outbox': {'max_attempts': 1, 'sync_interval': 0.01},
+        }, data_dir=self.dir)
+        manager.alerters['discord'] = FailingAlerter()
+        manager.start()
+        self.addCleanup(manager.stop)
+
+        manager.send_alert({'container_name': 'app'})
+        self.assertIn('discord_app', manager.last_alert_time)
+        wait_for(lambda: 'discord_app' not in manager.last_alert_time)
+
+
+if __name__ == '__main__':
+    unittest.main()
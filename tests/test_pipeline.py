@@ -0,0 +1,52 @@
+"""
+Tests for the streaming line pipeline
+"""
+
+import unittest
+from unittest import mock
+
+from monitors import pipeline
+from monitors.checkpoint import LogCursor
+from monitors.pipeline import iter_errors, iter_lines, iter_new_lines, iter_until
+
+
+class IterLinesTest(unittest.TestCase):
+    def test_lines_split_across_chunks(self):
+        self.assertEqual(list(iter_lines([b'one\ntw', b'o\r\nthr', b'ee'])), ['one', 'two', 'three'])
+
+    def test_multibyte_characters_split_across_chunks(self):
+        encoded = 'café\n'.encode('utf-8')
+        self.assertEqual(list(iter_lines([encoded[:4], encoded[4:]])), ['café'])
+
+    def test_invalid_utf8_is_replaced(self):
+        self.assertEqual(list(iter_lines([b'bad \xff byte\n'])), ['bad � byte'])
+
+    def test_long_lines_are_truncated_and_the_rest_discarded(self):
+        chunks = [b'abcdef', b'ghij\nnext\n']
+        self.assertEqual(list(iter_lines(chunks, max_line_length=4)), ['abcd', 'next'])
+
+
+class IterUntilTest(unittest.TestCase):
+    def test_no_deadline_passes_everything(self):
+        self.assertEqual(list(iter_until(iter(range(5)), None)), [0, 1, 2, 3, 4])
+
+    def test_stops_once_the_deadline_has_passed(self):
+        with mock.patch.object(pipeline.time, 'monotonic', side_effect=[0, 0, 10]):
+            self.assertEqual(list(iter_until(iter(range(10)), deadline=5, check_every=2)), [0, 1, 2, 3])
+
+
+class MatchingStagesTest(unittest.TestCase):
+    def test_new_lines_advance_the_cursor(self):
+        cursor = LogCursor()
+        lines = ['2024-01-01T00:00:01Z a', '2024-01-01T00:00:02Z b']
+        self.assertEqual(list(iter_new_lines(lines, cursor)), lines)
+        self.assertEqual(list(iter_new_lines(lines, cursor)), [])
+
+    def test_errors_are_paired_with_their_pattern(self):
+        monitor = mock.Mock()
+        monitor.match_error.side_effect = lambda line: 'fail' if 'fail' in line else None
+        self.assertEqual(list(iter_errors(['ok', 'it failed'], monitor)), [('it failed', 'fail')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Tests for the log query language and the log viewer's custom filter
+"""
+
+import unittest
+
+from web.query import NANOS, QueryError, build_query, compile_query
+
+
+def no_errors(line):
+    return None
+
+
+def errors_on(word):
+    return lambda line: 'error' if word in line else None
+
+
+def matches(text, line, classify=no_errors):
+    return compile_query(text).matches(line, classify)
+
+
+class QueryParserTest(unittest.TestCase):
+    def test_words_are_anded_case_insensitively(self):
+        self.assertTrue(matches('disk FULL', 'Disk is full'))
+        self.assertFalse(matches('disk full', 'disk is fine'))
+        self.assertTrue(matches('disk OR memory', 'out of memory'))
+
+    def test_negation_and_grouping(self):
+        self.assertTrue(matches('error -retry', 'error: giving up'))
+        self.assertFalse(matches('error NOT retry', 'error: will retry'))
+        self.assertTrue(matches('(disk OR memory) full', 'memory full'))
+        self.assertFalse(matches('(disk OR memory) full', 'memory low'))
+
+    def test_phrases_and_regexes(self):
+        self.assertTrue(matches('"connection refused"', 'Connection refused by host'))
+        self.assertFalse(matches('"connection refused"', 'refused connection'))
+        self.assertTrue(matches('/fail(ed|ure)/', 'a FAILURE happened'))
+
+    def test_level_uses_the_classifier(self):
+        self.assertTrue(matches('level:error', 'boom', errors_on('boom')))
+        self.assertFalse(matches('level:error', 'fine', errors_on('boom')))
+        self.assertTrue(matches('level:warn', 'WARNING: low disk'))
+
+    def test_time_fields_bound_the_read(self):
+        now = 1_000_000 * NANOS
+        since, until = compile_query('since:2h until:30m error').bounds(now)
+        self.assertEqual(since, now - 7200 * NANOS)
+        self.assertEqual(until, now - 1800 * NANOS)
+
+    def test_time_fields_cannot_be_ored(self):
+        with self.assertRaises(QueryError):
+            compile_query('since:2h OR error')
+
+    def test_unbalanced_parentheses_are_rejected(self):
+        with self.assertRaises(QueryError):
+            compile_query('(error')
+
+    def test_entries_report_is_error(self):
+        keep = compile_query('').filter(errors_on('boom'))
+        entry = keep('2024-01-01T00:00:00Z boom')
+        self.assertTrue(entry['is_error'])
+        self.assertNotIn('class', entry)
+        self.assertIsNone(keep('   '))
+
+
+class CustomFilterTest(unittest.TestCase):
+    def test_plain_text_is_one_substring(self):
+        query = build_query('custom', 'connection reset')
+        self.assertTrue(matches(query, 'x connection reset y'))
+        self.assertFalse(matches(query, 'reset connection'))
+
+    def test_plain_regex_is_kept_as_a_regex(self):
+        query = build_query('custom', 'err.*x')
+        self.assertTrue(matches(query, 'error x'))
+        self.assertTrue(matches(build_query('custom', 'a/b.*c'), 'xa/bzzc'))
+
+    def test_lone_dash_term_is_search_text(self):
+        for text in ('-v', '--verbose'):
+            query = build_query('custom', text)
+            self.assertTrue(matches(query, f'started with {text}'), text)
+            self.assertFalse(matches(query, 'started normally'), text)
+
+    def test_dash_term_negates_next_to_other_terms(self):
+        query = build_query('custom', 'error -retry')
+        self.assertTrue(matches(query, 'error: giving up'))
+        self.assertFalse(matches(query, 'error: will retry'))
+
+    def test_errors_filter_ignores_the_text(self):
+        query = build_query('errors', 'disk')
+        self.assertEqual(query, 'level:error')
+        self.assertTrue(matches(query, 'boom', errors_on('boom')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests for sliding-window error rates
+"""
+
+import unittest
+
+from monitors.rate import RateEvaluator, SlidingWindowCounter
+
+
+class SlidingWindowCounterTest(unittest.TestCase):
+    def test_counts_events_inside_the_window(self):
+        counter = SlidingWindowCounter(window=60, buckets=6)
+        counter.add(now=0)
+        counter.add(2, now=25)
+        self.assertEqual(counter.count(now=59), 3)
+        # The first bucket (0-10s) expires once the clock reaches 60s
+        self.assertEqual(counter.count(now=60), 2)
+        self.assertEqual(counter.count(now=90), 0)
+
+    def test_long_gaps_clear_everything(self):
+        counter = SlidingWindowCounter(window=60, buckets=6)
+        counter.add(5, now=0)
+        self.assertEqual(counter.add(now=1000), 1)
+
+    def test_reset(self):
+        counter = SlidingWindowCounter(window=60)
+        counter.add(3, now=0)
+        counter.reset()
+        self.assertEqual(counter.count(now=1), 0)
+
+
+class RateEvaluatorTest(unittest.TestCase):
+    def test_fires_with_every_held_line_once_the_threshold_is_reached(self):
+        rate = RateEvaluator(threshold=3, interval=60)
+        self.assertEqual(rate.evaluate([('a', 'p')], now=0), [])
+        self.assertEqual(rate.evaluate([('b', 'p')], now=10), [])
+        self.assertEqual(rate.evaluate([('c', 'p')], now=20), [(None, ['a', 'b', 'c'], 3)])
+        # The counter starts again after firing
+        self.assertEqual(rate.evaluate([('d', 'p')], now=21), [])
+
+    def test_lines_older_than_the_window_are_not_held(self):
+        rate = RateEvaluator(threshold=2, interval=60)
+        rate.evaluate([('old', 'p')], now=0)
+        self.assertEqual(rate.evaluate([('new', 'p')], now=100), [])
+        self.assertEqual(rate.evaluate([('newer', 'p')], now=101), [(None, ['new', 'newer'], 2)])
+
+    def test_per_pattern_counts_separately(self):
+        rate = RateEvaluator(threshold=2, interval=60, per_pattern=True)
+        self.assertEqual(rate.evaluate([('a', 'disk'), ('b', 'net')], now=0), [])
+        self.assertEqual(rate.evaluate([('c', 'disk')], now=1), [('disk', ['a', 'c'], 2)])
+
+    def test_held_lines_are_bounded(self):
+        rate = RateEvaluator(threshold=5, interval=60, max_pending=2)
+        fired = rate.evaluate([(str(index), 'p') for index in range(5)], now=0)
+        self.assertEqual(fired, [(None, ['3', '4'], 5)])
+
+    def test_describe(self):
+        rate = RateEvaluator(threshold=10, interval=120)
+        self.assertEqual(rate.describe(30, 'disk'),
+                         {'count': 30, 'interval': 120, 'threshold': 10, 'per_minute': 15.0, 'pattern': 'disk'})
+
+
+if __name__ == '__main__':
+    unittest.main()
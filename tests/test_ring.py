@@ -0,0 +1,81 @@
+"""
+Tests for the in-memory ring buffer of recent log lines
+"""
+
+import unittest
+from unittest import mock
+
+from monitors import ring as ring_module
+from monitors.checkpoint import parse_timestamp
+from monitors.ring import LineRing
+
+
+def line(second, text='x'):
+    return f"2024-01-01T00:00:{second:02d}.000000000Z {text}"
+
+
+def ts(second):
+    return parse_timestamp(line(second))
+
+
+class LineRingTest(unittest.TestCase):
+    def test_from_config(self):
+        self.assertIsNone(LineRing.from_config({'buffer_mb': 0}))
+        self.assertEqual(LineRing.from_config({'buffer_mb': 1}).capacity, 1024 * 1024)
+        self.assertEqual(LineRing.from_config({}).capacity, ring_module.DEFAULT_CAPACITY)
+
+    def test_iter_range_by_time(self):
+        ring = LineRing(capacity=4096)
+        for second in range(5):
+            ring.append(line(second))
+        self.assertEqual(len(ring), 5)
+        self.assertEqual(list(ring.iter_range(since=ts(1), until=ts(3))), [line(1), line(2)])
+        self.assertEqual(list(ring.iter_range()), [line(second) for second in range(5)])
+
+    def test_untimestamped_lines_keep_their_place(self):
+        ring = LineRing(capacity=4096)
+        ring.append(line(1))
+        ring.append('  continuation')
+        ring.append(line(2))
+        self.assertEqual(list(ring.iter_range(since=ts(1), until=ts(2))), [line(1), '  continuation'])
+
+    def test_oldest_lines_are_evicted_and_lines_wrap_whole(self):
+        size = len(line(0).encode())
+        ring = LineRing(capacity=size * 3 + size // 2)
+        for second in range(5):
+            ring.append(line(second))
+        self.assertEqual(list(ring.iter_range()), [line(2), line(3), line(4)])
+        self.assertFalse(ring.covers(ts(1)))
+        self.assertTrue(ring.covers(ts(2)))
+
+    def test_compaction_keeps_iteration_consistent(self):
+        size = len(line(0).encode())
+        with mock.patch.object(ring_module, 'READ_BATCH', 2):
+            ring = LineRing(capacity=size * 4)
+            lines = ring.iter_range()
+            for second in range(3):
+                ring.append(line(second))
+            self.assertEqual(next(lines), line(0))
+            for second in range(3, 20):
+                ring.append(line(second))
+            self.assertLess(len(ring._starts), 20)
+            # Lines evicted while the reader was away are skipped, not misread
+            self.assertEqual(list(lines), [line(1)] + [line(second) for second in range(16, 20)])
+
+    def test_sync_tracking(self):
+        ring = LineRing(capacity=4096)
+        self.assertIsNone(ring.synced_through())
+        ring.mark_synced(ts(5))
+        ring.mark_synced(ts(3))
+        self.assertEqual(ring.synced_through(), ts(5))
+        ring.live = True
+        self.assertGreater(ring.synced_through(), ts(5))
+
+    def test_tee_passes_lines_through(self):
+        ring = LineRing(capacity=4096)
+        self.assertEqual(list(ring.tee([line(1), line(2)])), [line(1), line(2)])
+        self.assertEqual(len(ring), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
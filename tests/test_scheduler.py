@@ -0,0 +1,121 @@
+"""
+Tests for the monitor check scheduler and its overrun policies
+"""
+
+import threading
+import time
+import unittest
+
+from engine.scheduler import MonitorScheduler
+
+
+class HeldExecutor:
+    """Collects submitted checks so the test decides when they run"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, *args):
+        self.submitted.append((func, args))
+
+    def run_all(self):
+        submitted, self.submitted = self.submitted, []
+        for func, args in submitted:
+            func(*args)
+
+
+def make_scheduler(**kwargs):
+    scheduler = MonitorScheduler(**kwargs)
+    scheduler._executor = HeldExecutor()
+    return scheduler
+
+
+def make_due(job):
+    job.next_run = time.monotonic() - 1
+
+
+class MonitorSchedulerTest(unittest.TestCase):
+    def test_due_checks_run_with_a_deadline(self):
+        deadlines = []
+        scheduler = make_scheduler()
+        scheduler.add('app', lambda deadline: deadlines.append(deadline), interval=60, timeout=5, run_now=True)
+        scheduler._dispatch()
+        scheduler._executor.run_all()
+
+        job = scheduler.jobs()[0]
+        self.assertEqual(job.runs, 1)
+        self.assertAlmostEqual(deadlines[0], job.last_started + 5)
+        self.assertGreater(job.next_run, time.monotonic() + 50)
+
+    def test_skip_drops_runs_while_one_is_in_progress(self):
+        scheduler = make_scheduler(overrun='skip')
+        job = scheduler.add('app', lambda deadline: None, interval=60, run_now=True)
+        scheduler._dispatch()
+        make_due(job)
+        scheduler._dispatch()
+
+        self.assertEqual(len(scheduler._executor.submitted), 1)
+        self.assertEqual(job.skipped, 1)
+        scheduler._executor.run_all()
+        self.assertFalse(job.pending)
+        self.assertGreater(job.next_run, time.monotonic())
+
+    def test_coalesce_runs_once_more_after_the_current_run(self):
+        scheduler = make_scheduler(overrun='coalesce')
+        job = scheduler.add('app', lambda deadline: None, interval=60, run_now=True)
+        scheduler._dispatch()
+        for _ in range(3):
+            make_due(job)
+            scheduler._dispatch()
+
+        self.assertEqual(job.skipped, 3)
+        scheduler._executor.run_all()
+        self.assertLessEqual(job.next_run, time.monotonic())
+        scheduler._dispatch()
+        self.assertEqual(len(scheduler._executor.submitted), 1)
+
+    def test_saturated_pool_holds_checks_back(self):
+        scheduler = make_scheduler(workers=1, max_queue=1)
+        for name in ('a', 'b', 'c'):
+            scheduler.add(name, lambda deadline: None, interval=60, run_now=True)
+        scheduler._dispatch()
+        self.assertEqual(len(scheduler._executor.submitted), 2)
+
+        scheduler._executor.run_all()
+        scheduler._dispatch()
+        self.assertEqual(len(scheduler._executor.submitted), 1)
+
+    def test_run_now_on_a_running_check_coalesces(self):
+        scheduler = make_scheduler(overrun='skip')
+        job = scheduler.add('app', lambda deadline: None, interval=60, run_now=True)
+        scheduler._dispatch()
+        self.assertTrue(scheduler.run_now('app'))
+        self.assertTrue(job.pending)
+        self.assertFalse(scheduler.run_now('missing'))
+
+    def test_failing_checks_free_their_worker(self):
+        def fail(deadline):
+            raise RuntimeError('boom')
+
+        scheduler = make_scheduler()
+        job = scheduler.add('app', fail, interval=60, run_now=True)
+        scheduler._dispatch()
+        scheduler._executor.run_all()
+        self.assertFalse(job.running)
+        self.assertEqual(scheduler._in_flight, 0)
+
+    def test_invalid_overrun_policy(self):
+        with self.assertRaises(ValueError):
+            MonitorScheduler(overrun='queue')
+
+    def test_runs_checks_on_the_worker_pool(self):
+        ran = threading.Event()
+        scheduler = MonitorScheduler(tick=0.01)
+        scheduler.add('app', lambda deadline: ran.set(), interval=60, run_now=True)
+        scheduler.start()
+        self.addCleanup(scheduler.stop)
+        self.assertTrue(ran.wait(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Tests for shutting Monitorr down cleanly on SIGTERM
+"""
+
+import os
+import signal
+import threading
+import unittest
+
+import monitorr
+
+
+class Stoppable:
+    """Stands in for a background service and counts stop calls"""
+
+    def __init__(self):
+        self.stops = 0
+
+    def stop(self, *args, **kwargs):
+        self.stops += 1
+
+
+class NoHosts:
+    def connected(self):
+        return []
+
+
+def make_monitorr():
+    """A Monitorr with stub services and no Docker hosts, skipping __init__"""
+    app = monitorr.Monitorr.__new__(monitorr.Monitorr)
+    app.config = {}
+    app.docker_hosts = NoHosts()
+    app.monitors = {}
+    app.async_engines = []
+    app.event_watchers = {}
+    for name in ('scheduler', 'checkpoints', 'alert_manager', 'events', 'archive', 'status'):
+        setattr(app, name, Stoppable())
+    app._stop_requested = threading.Event()
+    app._shut_down = False
+    return app
+
+
+class ShutdownTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_handler = signal.getsignal(signal.SIGTERM)
+
+    def tearDown(self):
+        signal.signal(signal.SIGTERM, self.previous_handler)
+
+    def test_sigterm_leaves_main_loop_and_shuts_down(self):
+        app = make_monitorr()
+        timer = threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGTERM))
+        timer.start()
+        try:
+            app.start()
+        finally:
+            timer.cancel()
+
+        self.assertTrue(app._shut_down)
+        for name in ('scheduler', 'checkpoints', 'alert_manager', 'events', 'archive', 'status'):
+            self.assertEqual(getattr(app, name).stops, 1, name)
+
+    def test_shutdown_runs_once(self):
+        app = make_monitorr()
+        app.shutdown()
+        app.shutdown()
+        self.assertEqual(app.checkpoints.stops, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the reusable SMTP session
+"""
+
+import logging
+import smtplib
+import unittest
+
+from alerts import AlertManager
+from alerts.smtp import SMTPSession
+
+
+class FakeConnection:
+    """An SMTP connection whose first send raises the given error"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+        self.closed = False
+
+    def send_message(self, msg):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        self.sent.append(msg)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class SessionWithoutNetwork(SMTPSession):
+    def __init__(self, connections):
+        super().__init__('smtp.example.com', 587, True, 'user', 'secret')
+        self.connections = list(connections)
+        self.opened = []
+
+    def _connect(self):
+        conn = self.connections.pop(0)
+        self.opened.append(conn)
+        return conn
+
+    def _start_keepalive(self):
+        pass
+
+
+class SMTPSessionTest(unittest.TestCase):
+    def test_reconnects_once_after_a_disconnect(self):
+        session = SessionWithoutNetwork([FakeConnection(smtplib.SMTPServerDisconnected('idle')), FakeConnection()])
+        session.send_message('msg')
+        self.assertEqual(len(session.opened), 2)
+        self.assertTrue(session.opened[0].closed)
+        self.assertEqual(session.opened[1].sent, ['msg'])
+
+    def test_reconnects_once_after_a_socket_error(self):
+        session = SessionWithoutNetwork([FakeConnection(ConnectionResetError()), FakeConnection()])
+        session.send_message('msg')
+        self.assertEqual(session.opened[1].sent, ['msg'])
+
+    def test_server_rejections_are_not_resent(self):
+        for error in (smtplib.SMTPRecipientsRefused({'a@example.com': (550, b'no')}),
+                      smtplib.SMTPDataError(554, b'rejected')):
+            session = SessionWithoutNetwork([FakeConnection(error), FakeConnection()])
+            with self.assertRaises(type(error)):
+                session.send_message('msg')
+            self.assertEqual(len(session.opened), 1, type(error).__name__)
+
+    def test_second_failure_is_raised(self):
+        session = SessionWithoutNetwork([FakeConnection(smtplib.SMTPServerDisconnected('a')),
+                                         FakeConnection(smtplib.SMTPServerDisconnected('b'))])
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            session.send_message('msg')
+
+
+class DigestWindowTest(unittest.TestCase):
+    def test_digest_window_without_outbox_is_warned_about(self):
+        config = {
+            'smtp': {'enabled': True, 'server': 'smtp.example.com', 'username': 'user', 'password': 'secret',
+                     'from_email': 'monitorr@example.com', 'to_emails': ['ops@example.com'], 'digest_window': 60},
+            'outbox': {'enabled': False},
+        }
+        with self.assertLogs('monitorr.alerts', logging.WARNING) as logs:
+            manager = AlertManager(config)
+        self.addCleanup(manager.stop)
+        self.assertTrue(any('digest_window is ignored' in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for online log template mining
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from monitors.base import BaseMonitor
+from monitors.templates import WILDCARD, TemplateMiner, tokenize
+
+
+class TemplateMinerTest(unittest.TestCase):
+    def test_tokenize_drops_the_docker_timestamp(self):
+        self.assertEqual(tokenize('2024-01-01T00:00:01.000000001Z Failed to fetch'), ['Failed', 'to', 'fetch'])
+
+    def test_variable_tokens_share_a_template(self):
+        miner = TemplateMiner()
+        first, params, is_new = miner.add('Failed to fetch /tv/123')
+        second, params, is_new_again = miner.add('Failed to fetch /tv/456')
+        self.assertIs(first, second)
+        self.assertTrue(is_new)
+        self.assertFalse(is_new_again)
+        self.assertEqual(params, ['/tv/456'])
+        self.assertEqual(first.count, 2)
+
+    def test_differing_constants_become_wildcards_and_keep_the_fingerprint(self):
+        miner = TemplateMiner()
+        template, _, _ = miner.add('worker pool stopped job alpha')
+        fingerprint = template.fingerprint
+        same, params, _ = miner.add('worker pool stopped job beta')
+        self.assertIs(same, template)
+        self.assertEqual(template.tokens, ['worker', 'pool', 'stopped', 'job', WILDCARD])
+        self.assertEqual(template.fingerprint, fingerprint)
+        self.assertEqual(params, ['beta'])
+
+    def test_dissimilar_lines_get_separate_templates(self):
+        miner = TemplateMiner()
+        miner.add('disk full on /dev/sda')
+        miner.add('connection refused by upstream')
+        self.assertEqual(len(miner), 2)
+
+    def test_least_recently_seen_templates_are_evicted(self):
+        miner = TemplateMiner(max_templates=2)
+        first, _, _ = miner.add('alpha one')
+        miner.add('beta two three')
+        miner.add('gamma four five six')
+        self.assertEqual(len(miner), 2)
+        self.assertIsNone(miner.get(first.fingerprint))
+
+    def test_summarize_does_not_count_lines_again(self):
+        miner = TemplateMiner()
+        lines = ['timeout after 5s', 'timeout after 9s', 'disk full']
+        for line in lines:
+            miner.add(line)
+        groups = miner.summarize(lines)
+        self.assertEqual([(group['template'], group['count']) for group in groups],
+                         [(f'timeout after {WILDCARD}', 2), ('disk full', 1)])
+        self.assertEqual(miner.get(groups[0]['fingerprint']).count, 2)
+
+    def test_templates_are_new_only_in_their_first_alert(self):
+        miner = TemplateMiner()
+        miner.add('disk full')
+        self.assertTrue(miner.summarize(['disk full'])[0]['new'])
+        miner.add('disk full')
+        self.assertFalse(miner.summarize(['disk full'])[0]['new'])
+
+
+class AlertRecorder:
+    def __init__(self):
+        self.alerts = []
+
+    def send_alert(self, alert_data):
+        self.alerts.append(alert_data)
+
+
+class MonitorTemplateTest(unittest.TestCase):
+    def test_lines_held_back_by_the_rate_threshold_are_mined(self):
+        alerts = AlertRecorder()
+        monitor = BaseMonitor(None, {
+            'container_name': 'app',
+            'error_patterns': ['error'],
+            'alert_threshold': 3,
+            'alert_interval': 60,
+        }, alerts)
+        container = SimpleNamespace(id='abc123')
+        monitor.report_errors([('error: disk full', 'error')], container)
+        monitor.report_errors([('error: disk full', 'error')], container)
+        self.assertEqual(alerts.alerts, [])
+        template, _, _ = monitor.templates.add('error: disk full', count=False)
+        self.assertEqual(template.count, 2)
+
+        monitor.report_errors([('error: disk full', 'error')], container)
+        self.assertEqual(len(alerts.alerts), 1)
+        self.assertEqual(template.count, 3)
+        self.assertEqual(alerts.alerts[0]['groups'][0]['count'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,58 +5,50 @@ Containers blueprint for viewing and managing Docker containers
 from flask import Blueprint, render_template, current_app, redirect, url_for, flash, request
 import docker
 import yaml
+from engine.hosts import DEFAULT_HOST, clients
+from engine.inventory import ContainerInventory, DEFAULT_PER_PAGE, STATUS_GROUPS, filter_containers, paginate
 
 bp = Blueprint('containers', __name__)
 
-def get_docker_client():
-    """Get Docker client based on current configuration"""
+def get_docker_client(host=None):
+    """Get Docker client for a host (the default host if none given)"""
     monitorr = current_app.config['MONITORR_INSTANCE']
-    if monitorr and monitorr.docker_client:
-        return monitorr.docker_client
+    if monitorr:
+        docker_host = monitorr.docker_hosts.get(host)
+        if docker_host:
+            return docker_host.get_client()
     
-    # If no Monitorr instance or Docker client, try to create a new one from config
+    # If no Monitorr instance, use the shared pooled client for the configured host
     try:
         with open('config.yml', 'r') as f:
             config = yaml.safe_load(f)
             
-        docker_config = config.get('docker', {})
-        docker_host = docker_config.get('host', 'local')
-        use_tls = docker_config.get('tls', False)
-        timeout = docker_config.get('timeout', 10)
-        
-        # Connect to Docker
-        if docker_host == 'local':
-            # Connect to local Docker daemon
-            client = docker.from_env(timeout=timeout)
+        if host and host != DEFAULT_HOST:
+            docker_config = (config.get('docker_hosts') or {}).get(host)
+            if docker_config is None:
+                return None
         else:
-            # Connect to remote Docker host
-            tls_config = None
-            if use_tls:
-                cert_path = docker_config.get('tls_cert_path')
-                key_path = docker_config.get('tls_key_path')
-                ca_path = docker_config.get('tls_ca_path')
-                
-                if cert_path and key_path and ca_path:
-                    tls_config = docker.tls.TLSConfig(
-                        client_cert=(cert_path, key_path),
-                        ca_cert=ca_path,
-                        verify=True
-                    )
-            
-            client = docker.DockerClient(
-                base_url=docker_host,
-                tls=tls_config,
-                timeout=timeout
-            )
+            docker_config = config.get('docker', {})
         
-        # Test connection
-        client.ping()
-        return client
+        return clients.get(docker_config)
     except Exception as e:
         current_app.logger.error(f"Failed to connect to Docker: {e}")
         return None
 
 
+def _host_param(host_name):
+    """Query value for a host in links; the default host is left implicit"""
+    return None if host_name == DEFAULT_HOST else host_name
+
+
+def _list_containers(host):
+    """List containers on a registered host, reconnecting if it went away"""
+    client = host.get_client()
+    if client is None:
+        raise docker.errors.DockerException(host.last_error or "not connected")
+    return ContainerInventory.for_client(client).list()
+
+
 def _container_image_display(container):
     """Get image name/ID for display without fetching the image (avoids 404 if image was removed)."""
     config_image = container.attrs.get('Config', {}).get('Image') or ''
@@ -68,40 +60,69 @@ def _container_image_display(container):
     return image_id[:12] if len(image_id) >= 12 else image_id
 
 
+def _int_arg(name, default):
+    try:
+        return int(request.args.get(name, default))
+    except ValueError:
+        return default
+
+
 @bp.route('/')
 def index():
-    """List all containers"""
-    docker_client = get_docker_client()
-    
-    if not docker_client:
-        flash("Cannot connect to Docker. Please check your Docker settings.", "danger")
-        return redirect(url_for('settings.docker_settings'))
+    """List containers across every connected Docker host, filtered and paginated"""
+    monitorr = current_app.config['MONITORR_INSTANCE']
+    text = request.args.get('q', '')
+    status = request.args.get('status', '')
+    host_filter = request.args.get('host_name', '')
     
-    # Get all containers
+    # One cached list call per host, listing each host concurrently
     try:
-        containers = docker_client.containers.list(all=True)
+        if monitorr and monitorr.docker_hosts.connected():
+            results = monitorr.docker_hosts.map(lambda host: _list_containers(host), healthy_only=False)
+        else:
+            docker_client = get_docker_client()
+            if not docker_client:
+                flash("Cannot connect to Docker. Please check your Docker settings.", "danger")
+                return redirect(url_for('settings.docker_settings'))
+            results = {DEFAULT_HOST: ContainerInventory.for_client(docker_client).list()}
         
         # Get list of existing monitors
-        monitorr = current_app.config['MONITORR_INSTANCE']
         monitored_containers = set()
         if monitorr:
             for monitor in monitorr.monitors.values():
-                monitored_containers.add(monitor.container_name)
+                monitored_containers.add((monitor.docker_host, monitor.container_name))
+        
+        matches = []
+        for host_name, containers in results.items():
+            if isinstance(containers, Exception):
+                flash(f"Error listing containers on {host_name}: {containers}", "warning")
+                continue
+            if host_filter and host_name != host_filter:
+                continue
+            matches.extend((host_name, container) for container in filter_containers(containers, text, status))
+        
+        page = paginate(matches, _int_arg('page', 1), _int_arg('per_page', DEFAULT_PER_PAGE))
         
-        # Format container data for display (use attrs to avoid fetching image;
-        # image may have been removed after container was created, causing 404)
+        # Only the rows on this page are formatted
         container_list = []
-        for container in containers:
-            image_display = _container_image_display(container)
+        for host_name, container in page.items:
             container_list.append({
-                'id': container.id[:12],
+                'id': container.short_id,
                 'name': container.name,
-                'image': image_display,
+                'host': _host_param(host_name),
+                'host_name': host_name,
+                'image': container.image,
                 'status': container.status,
-                'monitored': container.name in monitored_containers
+                'monitored': (host_name, container.name) in monitored_containers
             })
         
-        return render_template('containers/index.html', containers=container_list)
+        # Carried over to the pagination links; empty filters are left out of the URL
+        filters = {key: value for key, value in
+                   (('q', text), ('status', status), ('host_name', host_filter), ('per_page', page.per_page))
+                   if value}
+        return render_template('containers/index.html', containers=container_list, page=page,
+                               filters=filters, statuses=list(STATUS_GROUPS), hosts=sorted(results),
+                               show_hosts=len(results) > 1)
     except Exception as e:
         flash(f"Error listing containers: {str(e)}", "danger")
         return redirect(url_for('dashboard.index'))
@@ -109,7 +130,8 @@ def index():
 @bp.route('/details/<container_name>')
 def details(container_name):
     """Show container details"""
-    docker_client = get_docker_client()
+    host = request.args.get('host')
+    docker_client = get_docker_client(host)
     
     if not docker_client:
         flash("Cannot connect to Docker. Please check your Docker settings.", "danger")
@@ -123,6 +145,7 @@ def details(container_name):
         info = {
             'id': container.id,
             'name': container.name,
+            'host': host,
             'image': _container_image_display(container),
             'status': container.status,
             'created': container.attrs.get('Created', 'Unknown'),
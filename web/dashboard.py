@@ -2,17 +2,36 @@
 Dashboard blueprint for Monitorr web interface
 """
 
-from flask import Blueprint, render_template, current_app, redirect, url_for, flash
+from flask import Blueprint, render_template, current_app, redirect, url_for, flash, request, jsonify, Response, abort
 import docker
 import datetime
 import threading
 from queue import Queue
+from engine.metrics import CONTENT_TYPE, registry
 
 bp = Blueprint('dashboard', __name__)
 
+DAY = 86400
+
+# Windows accepted by the error history API, with the number of sparkline points
+HISTORY_WINDOWS = {
+    '1h': (3600, 60),
+    '24h': (DAY, 24),
+    '7d': (7 * DAY, 28),
+    '30d': (30 * DAY, 30)
+}
+
 # Message queue for background operations
 message_queue = Queue()
 
+def _sparkline(series):
+    """Render counts as a row of block characters"""
+    peak = max(series) if series else 0
+    if not peak:
+        return ''
+    blocks = '▁▂▃▄▅▆▇█'
+    return ''.join(blocks[min(count * len(blocks) // (peak + 1), len(blocks) - 1)] if count else ' ' for count in series)
+
 @bp.route('/')
 def index():
     """Dashboard home page with monitor status"""
@@ -26,17 +45,28 @@ def index():
         # No Monitorr instance available
         return render_template('dashboard/not_started.html')
     
+    # Errors in the last 24 hours, from the history rollups
+    error_counts = {}
+    if monitorr.events:
+        try:
+            error_counts = monitorr.events.counts(window=DAY)
+        except Exception as e:
+            current_app.logger.error(f"Failed to read error history: {e}")
+    
+    # Container states come from the background snapshot, not one inspect per monitor
+    snapshot = monitorr.status.snapshot
+    
     monitors_status = []
     for monitor_name, monitor in monitorr.monitors.items():
         try:
-            container = monitor.get_container()
-            container_status = container.status if container else "not found"
+            container_status = snapshot.status_of(monitor_name)
             
             # Get last check time
             last_check = "Never" if not monitor.last_check_time else monitor.last_check_time.strftime("%Y-%m-%d %H:%M:%S")
             
             # Get error count in the last 24 hours
-            error_count = 0
+            error_count = error_counts.get(monitor_name, 0)
+            sparkline = _sparkline(monitorr.events.series(monitor_name)) if error_count else ''
             
             monitors_status.append({
                 'name': monitor_name,
@@ -44,6 +74,7 @@ def index():
                 'status': container_status,
                 'last_check': last_check,
                 'error_count': error_count,
+                'sparkline': sparkline,
                 'check_interval': monitor.config.get('check_interval', 60)
             })
         except Exception as e:
@@ -71,6 +102,22 @@ def index():
                            alerters=alert_status,
                            monitorr_running=True)
 
+@bp.route('/api/status')
+def api_status():
+    """Container state of every monitor from the latest status snapshot"""
+    monitorr = current_app.config['MONITORR_INSTANCE']
+    if not monitorr:
+        return jsonify({'error': 'Monitorr is not running'}), 503
+    return jsonify(dict(monitorr.status.snapshot.payload))
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus metrics for Monitorr's own pipeline"""
+    monitorr = current_app.config['MONITORR_INSTANCE']
+    if monitorr and not monitorr.config.get('metrics', {}).get('enabled', True):
+        abort(404)
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
 @bp.route('/check/<monitor_name>')
 def check_now(monitor_name):
     """Trigger an immediate check for a specific monitor"""
@@ -93,4 +140,46 @@ def check_now(monitor_name):
     thread.start()
     
     flash(f"Log check triggered for {monitor_name}", "info")
-    return redirect(url_for('dashboard.index')) 
\ No newline at end of file
+    return redirect(url_for('dashboard.index'))
+
+@bp.route('/api/errors')
+def api_errors():
+    """Error counts and sparklines for every monitor"""
+    monitorr = current_app.config['MONITORR_INSTANCE']
+    if not monitorr or not monitorr.events:
+        return jsonify({'error': "Error history is not available"}), 503
+    
+    window_name = request.args.get('window', '24h')
+    if window_name not in HISTORY_WINDOWS:
+        return jsonify({'error': f"Unknown window {window_name}, use one of {', '.join(HISTORY_WINDOWS)}"}), 400
+    window, points = HISTORY_WINDOWS[window_name]
+    
+    counts = monitorr.events.counts(window=window)
+    monitors = {}
+    for monitor_name in sorted(set(monitorr.monitors) | set(counts)):
+        monitors[monitor_name] = {
+            'count': counts.get(monitor_name, 0),
+            'series': monitorr.events.series(monitor_name, window=window, points=points)
+        }
+    return jsonify({'window': window_name, 'points': points, 'monitors': monitors})
+
+@bp.route('/api/errors/<monitor_name>')
+def api_monitor_errors(monitor_name):
+    """Error counts, sparkline and recent lines for one monitor"""
+    monitorr = current_app.config['MONITORR_INSTANCE']
+    if not monitorr or not monitorr.events:
+        return jsonify({'error': "Error history is not available"}), 503
+    
+    window_name = request.args.get('window', '24h')
+    if window_name not in HISTORY_WINDOWS:
+        return jsonify({'error': f"Unknown window {window_name}, use one of {', '.join(HISTORY_WINDOWS)}"}), 400
+    window, points = HISTORY_WINDOWS[window_name]
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    
+    return jsonify({
+        'monitor': monitor_name,
+        'window': window_name,
+        'count': monitorr.events.counts(window=window, monitor=monitor_name).get(monitor_name, 0),
+        'series': monitorr.events.series(monitor_name, window=window, points=points),
+        'recent': monitorr.events.recent(monitor_name, limit=limit)
+    })
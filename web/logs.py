@@ -2,305 +2,509 @@
 Logs blueprint for viewing container logs
 """
 
-from flask import Blueprint, render_template, current_app, request, jsonify
+from flask import Blueprint, render_template, stream_template, current_app, request, jsonify, Response, stream_with_context
 import docker
+import json
+import time
+from collections import deque
+from engine.cache import ContainerCache
+from engine.hosts import DEFAULT_HOST
+from engine.tail import tails
+from monitors.checkpoint import parse_timestamp
+from monitors.framing import STDOUT, STDERR, iter_frame_lines, open_log_stream
+from monitors.matcher import PatternMatcher
+from monitors.pipeline import iter_lines
+from web.query import QueryError, build_query, compile_query
 from datetime import datetime, timedelta
-import re
 
 bp = Blueprint('logs', __name__)
 
+NANOS = 1_000_000_000
+
+# Entries per page unless the request asks for another limit, and the most it may ask for
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+# Paging backwards reads history in windows of this many seconds, doubling
+# the window each time too few lines matched
+WINDOW_SECONDS = 3600
+MAX_WINDOWS = 16
+
+# Streamed responses are written in pieces of about this many characters
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Live tails send a comment this often when idle so dropped connections are noticed
+KEEPALIVE_SECONDS = 15
+
+# Patterns that mark error lines for containers without a monitor
+DEFAULT_ERROR_PATTERNS = [r'error', r'exception', r'fatal', r'failed']
+_default_matcher = PatternMatcher(DEFAULT_ERROR_PATTERNS)
+
+
+class LogPage:
+    """Cursors for one page of log entries, filled in while the page is iterated
+
+    Cursors are Docker timestamps: before is the oldest entry on the page
+    and after the newest, so the neighbouring pages continue from them.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.count = 0
+        self.before = None
+        self.after = None
+        self.has_older = False
+        self.has_newer = False
+        self.error = None
+
+    def track(self, entry):
+        """Count an entry on its way out and move the cursors"""
+        if self.before is None:
+            self.before = entry['timestamp']
+        self.after = entry['timestamp']
+        self.count += 1
+        return entry
+
+    def as_dict(self):
+        return {
+            'limit': self.limit,
+            'count': self.count,
+            'before': self.before,
+            'after': self.after,
+            'has_older': self.has_older,
+            'has_newer': self.has_newer,
+            'error': self.error
+        }
+
+
+class LogTarget:
+    """The container a logs request is for: a monitor's, or any container by name"""
+
+    def __init__(self, monitor_name):
+        monitorr = current_app.config['MONITORR_INSTANCE']
+        self.monitor_name = monitor_name
+        self.monitor = monitorr.monitors.get(monitor_name) if monitorr else None
+        self.is_monitored = self.monitor is not None
+
+        if self.is_monitored:
+            monitor = self.monitor
+            self.container_name = monitor.container_name
+            self.docker_host = monitor.docker_host
+            self.streams = monitor.streams
+            self.error_patterns = monitor.error_patterns
+            self.ignore_patterns = monitor.ignore_patterns
+            self.classify = monitor.match_error
+            self.ring = monitor.ring
+            self.archive = monitor.archive if request.args.get('source') == 'archive' else None
+        else:
+            self.container_name = monitor_name
+            self.docker_host = request.args.get('host')
+            self.streams = (STDOUT, STDERR)
+            self.error_patterns = DEFAULT_ERROR_PATTERNS
+            self.ignore_patterns = []
+            self.classify = _default_matcher.match
+            self.ring = None
+            self.archive = None
+
+        self.docker_client = None
+        self.container = None
+
+    @property
+    def archive_available(self):
+        return self.is_monitored and self.monitor.archive is not None
+
+    def connect(self):
+        """Look up the container on its Docker host; returns an error message, or None"""
+        try:
+            from web.containers import get_docker_client
+            self.docker_client = get_docker_client(self.docker_host)
+        except Exception as e:
+            return f"Could not connect to Docker: {str(e)}"
+        if not self.docker_client:
+            return "Could not connect to Docker"
+
+        try:
+            self.container = ContainerCache.for_client(self.docker_client).get(self.container_name)
+        except Exception:
+            self.container = None
+        return None
+
+    def source(self, plan):
+        """Line reader for the plan, and the oldest time the container can have logs from"""
+        if self.archive is not None:
+            if plan.streams:
+                raise QueryError("stream: is not available for archived logs")
+            return _archive_source(self.archive, plan.required_text), self.archive.first
+
+        streams = self.streams
+        if plan.streams:
+            streams = tuple(stream for stream in streams if stream in plan.streams)
+        source = _docker_source(self.docker_client, self.container, streams)
+        # The ring holds every stream the monitor reads, so it can only serve unrestricted queries
+        if self.ring is not None and not plan.streams:
+            source = _ring_source(self.ring, source)
+        return source, parse_timestamp(self.container.created or '')
+
+def _request_query(strict=False):
+    """Compiled query for the request's filter options, and the parse error if there was one
+
+    Unless strict, a query that does not parse is searched for as plain
+    text, as the viewer has always done with a filter it cannot use.
+    """
+    filter_type = request.args.get('filter', 'all')  # all, errors, custom
+    filter_text = request.args.get('text', '')  # custom filter text
+    try:
+        return compile_query(build_query(filter_type, filter_text)), None
+    except QueryError as e:
+        if strict:
+            raise
+        escaped = filter_text.replace('\\', '\\\\').replace('"', '\\"')
+        return compile_query(build_query(filter_type, f'"{escaped}"')), str(e)
+
+def _query_page(target, plan, page, time_range):
+    """Entries of one page of the query's results for the request's cursors"""
+    _, before, after = _page_args()
+    source, oldest = target.source(plan)
+    since, until = plan.bounds()
+    floor = max(filter(None, (_range_since(time_range), since, oldest)), default=None)
+    return _paginate(source, plan.filter(target.classify), page, before=before, after=after,
+                     floor=floor, until=until)
+
+def _page_args():
+    """Page limit and before/after cursors (epoch nanoseconds) from the query string"""
+    try:
+        limit = min(max(int(request.args.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+    before = parse_timestamp(request.args.get('before', ''))
+    after = parse_timestamp(request.args.get('after', ''))
+    return limit, before, after
+
+def _open_docker_logs(docker_client, container, streams, since=None, until=None, follow=False):
+    """Open a container's log stream and return (stream, lines)"""
+    # TTY containers send a raw stream without frame headers
+    if container.tty:
+        stream = docker_client.api.logs(container.id, stream=True, follow=follow, timestamps=True, since=since, until=until)
+        return stream, iter_lines(stream)
+    response = open_log_stream(docker_client.api, container.id, follow=follow, since=since, until=until)
+    return response, iter_frame_lines(response.raw, streams)
+
+def _docker_source(docker_client, container, streams):
+    """Reader for a container's Docker logs between two nanosecond timestamps"""
+    def read(since, until):
+        # Docker filters on whole seconds; lines outside the exact range are dropped later
+        since = since // NANOS if since else None
+        until = -(-until // NANOS) if until else None
+        return _open_docker_logs(docker_client, container, streams, since=since, until=until)
+    return read
+
+def _follow_opener(docker_client, container_name, streams):
+    """Opener for a live tail that looks the container up on every (re)connect"""
+    containers = ContainerCache.for_client(docker_client)
+
+    def open_follow(since):
+        container = containers.get(container_name)
+        if container is None:
+            raise docker.errors.NotFound(f"Container {container_name} not found")
+        try:
+            return _open_docker_logs(docker_client, container, streams, since=since, follow=True)
+        except Exception:
+            # The container may have been recreated under a new id
+            containers.invalidate(container_name)
+            raise
+    return open_follow
+
+def _ring_source(ring, fallback):
+    """Reader answering from a monitor's ring buffer where it holds the whole range
+
+    The part of a range newer than the ring's last sync is read from
+    fallback, so a polling monitor only costs Docker the lines logged since
+    its last check; ranges older than the ring reach go to fallback entirely.
+    """
+    def read(since, until):
+        synced = ring.synced_through()
+        if synced is None or not ring.covers(since):
+            return fallback(since, until)
+        if until and until <= synced:
+            return None, ring.iter_range(since, until)
+
+        def lines():
+            yield from ring.iter_range(since, synced)
+            stream, rest = fallback(synced, until)
+            try:
+                for line in rest:
+                    # Docker's whole-second since also returns lines the ring already gave
+                    ts = parse_timestamp(line)
+                    if ts is None or ts >= synced:
+                        yield line
+            finally:
+                if stream is not None:
+                    stream.close()
+        return None, lines()
+    return read
+
+def _archive_source(archive, text=None):
+    """Reader for a container's archived lines between two nanosecond timestamps"""
+    def read(since, until):
+        return None, archive.iter_range(since=since, until=until, text=text)
+    return read
+
+def _read_window(source, since, until, keep):
+    """Yield kept entries for lines with since <= timestamp < until, oldest first"""
+    stream, lines = source(since, until)
+    try:
+        for line in lines:
+            ts = parse_timestamp(line)
+            if ts is None or (since and ts < since) or (until and ts >= until):
+                continue
+            entry = keep(line)
+            if entry is not None:
+                yield entry
+    finally:
+        if stream is not None:
+            stream.close()
+
+def _paginate(source, keep, page, before=None, after=None, floor=None, until=None):
+    """Yield one page of entries, oldest first, recording its cursors on page
+
+    With after, newer entries are streamed straight from the source.
+    Otherwise the page ends at before (or until, or now) and is found by
+    reading back in growing windows until it is full or floor is reached;
+    only the entries for the page are held at any time.
+    """
+    try:
+        if after is not None:
+            page.has_older = True
+            for entry in _read_window(source, after + 1, until, keep):
+                if page.count >= page.limit:
+                    page.has_newer = True
+                    break
+                yield page.track(entry)
+            return
+
+        page.has_newer = before is not None
+        until = min(filter(None, (before, until)), default=time.time_ns() + NANOS)
+        window = WINDOW_SECONDS * NANOS
+        chunks = []
+        found = 0
+        for _ in range(MAX_WINDOWS):
+            since = until - window
+            if floor and since <= floor:
+                since = floor
+            chunk = deque(_read_window(source, since, until, keep), maxlen=page.limit - found)
+            chunks.append(chunk)
+            found += len(chunk)
+            until = since
+            window *= 2
+            if found >= page.limit or (floor and until <= floor):
+                break
+        page.has_older = found >= page.limit or not (floor and until <= floor)
+
+        for chunk in reversed(chunks):
+            for entry in chunk:
+                yield page.track(entry)
+    except Exception as e:
+        # Headers are already sent for a streamed page, so end it and report the error on the page
+        current_app.logger.error(f"Failed to read logs: {e}")
+        page.error = str(e)
+
+def _buffered(chunks, size=STREAM_CHUNK_SIZE):
+    """Join small streamed pieces so each write to the client carries a useful amount"""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def _iter_ndjson(entries, page, header):
+    """One JSON object per line: the header, each entry, then the page cursors"""
+    yield json.dumps(header) + '\n'
+    for entry in entries:
+        yield json.dumps(entry) + '\n'
+    yield json.dumps({'page': page.as_dict()}) + '\n'
+
+def _wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def _range_since(time_range):
+    """Oldest time a range covers, as epoch nanoseconds (None for all logs)"""
+    since = None
+    if time_range == '1h':
+        since = datetime.now() - timedelta(hours=1)
+    elif time_range == '24h':
+        since = datetime.now() - timedelta(hours=24)
+    elif time_range == '7d':
+        since = datetime.now() - timedelta(days=7)
+    return int(since.timestamp() * NANOS) if since else None
+
 @bp.route('/')
 def index():
     """Logs overview page"""
     monitorr = current_app.config['MONITORR_INSTANCE']
     if not monitorr:
         return render_template('logs/not_available.html')
-    
+
+    snapshot = monitorr.status.snapshot
     monitors = []
     for monitor_name, monitor in monitorr.monitors.items():
-        container = monitor.get_container()
-        if container:
+        status = snapshot.get(monitor_name)
+        if status and status.id:
             monitors.append({
                 'name': monitor_name,
                 'container_name': monitor.container_name,
-                'status': container.status
+                'status': status.status
             })
-    
+
     return render_template('logs/index.html', monitors=monitors)
 
 @bp.route('/<monitor_name>')
 def view_logs(monitor_name):
-    """View logs for a specific monitor/container"""
-    monitorr = current_app.config['MONITORR_INSTANCE']
-    
-    # Check if this is a monitor or a direct container request
-    if monitorr and monitor_name in monitorr.monitors:
-        # This is a monitored container
-        monitor = monitorr.monitors[monitor_name]
-        container_name = monitor.container_name
-        error_patterns = monitor.error_patterns
-        ignore_patterns = monitor.ignore_patterns
-        compiled_error_patterns = monitor.compiled_error_patterns
-        compiled_ignore_patterns = monitor.compiled_ignore_patterns
-        is_monitored = True
-    else:
-        # This is a direct container request (not monitored)
-        container_name = monitor_name
-        # Create default patterns for direct container access
-        error_patterns = [r'error', r'exception', r'fatal', r'failed']
-        ignore_patterns = []
-        # Compile patterns
-        compiled_error_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in error_patterns]
-        compiled_ignore_patterns = []
-        is_monitored = False
-    
-    # Get Docker client
-    docker_client = None
-    if monitorr and monitorr.docker_client:
-        docker_client = monitorr.docker_client
-    else:
-        # Try to get docker client from config
-        try:
-            from web.containers import get_docker_client
-            docker_client = get_docker_client()
-        except Exception as e:
-            return render_template('logs/error.html', 
+    """View a page of logs for a specific monitor/container, streamed as it is read"""
+    target = LogTarget(monitor_name)
+
+    # Archived logs are read locally, even after Docker has rotated them away
+    # or the container is gone
+    if target.archive is None:
+        error = target.connect()
+        if error:
+            return render_template('logs/error.html',
                                   monitor_name=monitor_name,
-                                  container_name=container_name,
-                                  error=f"Could not connect to Docker: {str(e)}")
-    
-    if not docker_client:
-        return render_template('logs/error.html', 
-                              monitor_name=monitor_name,
-                              container_name=container_name,
-                              error="Could not connect to Docker")
-    
-    # Get container
-    try:
-        container = docker_client.containers.get(container_name)
-    except Exception as e:
-        return render_template('logs/container_not_found.html', 
-                              monitor_name=monitor_name,
-                              container_name=container_name)
-    
+                                  container_name=target.container_name,
+                                  error=error)
+        if not target.container:
+            return render_template('logs/container_not_found.html',
+                                  monitor_name=monitor_name,
+                                  container_name=target.container_name)
+
     # Get time range for logs
     time_range = request.args.get('range', '1h')  # Default 1 hour
-    
-    # Get filtering options
-    filter_type = request.args.get('filter', 'all')  # all, errors, custom
-    filter_text = request.args.get('text', '')  # custom filter text
-    
-    since = None
-    if time_range == '1h':
-        since = datetime.now() - timedelta(hours=1)
-    elif time_range == '24h':
-        since = datetime.now() - timedelta(hours=24)
-    elif time_range == '7d':
-        since = datetime.now() - timedelta(days=7)
-    elif time_range == 'all':
-        since = None
-    
-    # Limit number of lines based on time range
-    if time_range == 'all':
-        tail = 5000  # Higher limit for all logs
-    else:
-        tail = 2000  # Reasonable limit for other time ranges
-    
-    # Get logs
+
+    plan, query_error = _request_query()
+    limit, _, _ = _page_args()
+    page = LogPage(limit)
     try:
-        logs = container.logs(
-            since=since,
-            timestamps=True,
-            tail=tail,
-            stream=False
-        ).decode('utf-8')
-        
-        # Compile custom filter if provided
-        custom_filter = None
-        if filter_text:
-            try:
-                custom_filter = re.compile(filter_text, re.IGNORECASE)
-            except re.error:
-                # If regex is invalid, use plain text search
-                custom_filter = filter_text.lower()
-        
-        # Process logs
-        log_lines = []
-        for line in logs.splitlines():
-            if not line.strip():
-                continue
-                
-            # Check if line matches any error pattern
-            is_error = any(pattern.search(line) for pattern in compiled_error_patterns)
-            # Check if line matches any ignore pattern 
-            is_ignored = any(pattern.search(line) for pattern in compiled_ignore_patterns)
-            
-            # Apply filters
-            if filter_type == 'errors' and (not is_error or is_ignored):
-                continue
-                
-            if filter_type == 'custom' and custom_filter:
-                if isinstance(custom_filter, re.Pattern):
-                    if not custom_filter.search(line):
-                        continue
-                else:
-                    if custom_filter not in line.lower():
-                        continue
-            
-            line_class = ""
-            if is_error and not is_ignored:
-                line_class = "error"
-            
-            log_lines.append({
-                'line': line,
-                'class': line_class,
-                'timestamp': line.split(' ')[0] if ' ' in line else ''
-            })
-        
-    except Exception as e:
-        return render_template('logs/error.html', 
-                                monitor_name=monitor_name,
-                                container_name=container_name,
-                                error=str(e))
-    
-    return render_template('logs/view.html',
+        logs = _query_page(target, plan, page, time_range)
+    except QueryError as e:
+        logs, query_error = iter(()), str(e)
+
+    # The page is rendered as entries are read, so the browser starts receiving it at once
+    return Response(_buffered(stream_template('logs/view.html',
                             monitor_name=monitor_name,
-                            container_name=container_name,
-                            logs=log_lines,
+                            container_name=target.container_name,
+                            logs=logs,
+                            page=page,
+                            page_limit=request.args.get('limit'),
                             time_range=time_range,
-                            filter_type=filter_type,
-                            filter_text=filter_text,
-                            error_patterns=error_patterns,
-                            ignore_patterns=ignore_patterns,
-                            is_monitored=is_monitored)
+                            filter_type=request.args.get('filter', 'all'),
+                            filter_text=request.args.get('text', ''),
+                            query_error=query_error,
+                            error_patterns=target.error_patterns,
+                            ignore_patterns=target.ignore_patterns,
+                            docker_host=None if target.is_monitored else target.docker_host,
+                            source='archive' if target.archive is not None else None,
+                            archive_available=target.archive_available,
+                            is_monitored=target.is_monitored)))
 
 @bp.route('/api/<monitor_name>')
 def api_logs(monitor_name):
-    """API endpoint for fetching logs (for AJAX)"""
-    monitorr = current_app.config['MONITORR_INSTANCE']
-    
-    # Check if this is a monitor or a direct container request
-    if monitorr and monitor_name in monitorr.monitors:
-        # This is a monitored container
-        monitor = monitorr.monitors[monitor_name]
-        container_name = monitor.container_name
-        compiled_error_patterns = monitor.compiled_error_patterns
-        compiled_ignore_patterns = monitor.compiled_ignore_patterns
-        is_monitored = True
-    else:
-        # This is a direct container request (not monitored)
-        container_name = monitor_name
-        # Create default patterns for direct container access
-        error_patterns = [r'error', r'exception', r'fatal', r'failed']
-        ignore_patterns = []
-        # Compile patterns
-        compiled_error_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in error_patterns]
-        compiled_ignore_patterns = []
-        is_monitored = False
-    
-    # Get Docker client
-    docker_client = None
-    if monitorr and monitorr.docker_client:
-        docker_client = monitorr.docker_client
-    else:
-        # Try to get docker client from config
-        try:
-            from web.containers import get_docker_client
-            docker_client = get_docker_client()
-        except Exception as e:
-            return jsonify({'error': f"Could not connect to Docker: {str(e)}"}), 500
-    
-    if not docker_client:
-        return jsonify({'error': "Could not connect to Docker"}), 500
-    
-    # Get container
-    try:
-        container = docker_client.containers.get(container_name)
-    except Exception as e:
-        return jsonify({'error': f'Container {container_name} not found'}), 404
-    
+    """API endpoint for fetching a page of logs (for AJAX)
+
+    Returns JSON by default, or NDJSON streamed as lines are read when
+    ?format=ndjson is given or application/x-ndjson is preferred.
+    """
+    target = LogTarget(monitor_name)
+
+    if target.archive is None:
+        error = target.connect()
+        if error:
+            return jsonify({'error': error}), 500
+        if not target.container:
+            return jsonify({'error': f'Container {target.container_name} not found'}), 404
+
     # Get time range for logs
     time_range = request.args.get('range', '1h')  # Default 1 hour
-    
-    # Get filtering options
-    filter_type = request.args.get('filter', 'all')  # all, errors, custom
-    filter_text = request.args.get('text', '')  # custom filter text
-    
-    since = None
-    if time_range == '1h':
-        since = datetime.now() - timedelta(hours=1)
-    elif time_range == '24h':
-        since = datetime.now() - timedelta(hours=24)
-    elif time_range == '7d':
-        since = datetime.now() - timedelta(days=7)
-    elif time_range == 'all':
-        since = None
-    
-    # Limit number of lines based on time range
-    if time_range == 'all':
-        tail = 5000  # Higher limit for all logs
-    else:
-        tail = 2000  # Reasonable limit for other time ranges
-    
-    # Get logs
+
+    limit, _, _ = _page_args()
+    page = LogPage(limit)
     try:
-        logs = container.logs(
-            since=since,
-            timestamps=True,
-            tail=tail,
-            stream=False
-        ).decode('utf-8')
-        
-        # Compile custom filter if provided
-        custom_filter = None
-        if filter_text:
-            try:
-                custom_filter = re.compile(filter_text, re.IGNORECASE)
-            except re.error:
-                # If regex is invalid, use plain text search
-                custom_filter = filter_text.lower()
-        
-        # Process logs
-        log_lines = []
-        for line in logs.splitlines():
-            if not line.strip():
-                continue
-            
-            # Check if line matches any error pattern
-            is_error = any(pattern.search(line) for pattern in compiled_error_patterns)
-            # Check if line matches any ignore pattern 
-            is_ignored = any(pattern.search(line) for pattern in compiled_ignore_patterns)
-            
-            # Apply filters
-            if filter_type == 'errors' and (not is_error or is_ignored):
-                continue
-                
-            if filter_type == 'custom' and custom_filter:
-                if isinstance(custom_filter, re.Pattern):
-                    if not custom_filter.search(line):
-                        continue
-                else:
-                    if custom_filter not in line.lower():
-                        continue
-            
-            timestamp = line.split(' ')[0] if ' ' in line else ''
-            
-            log_lines.append({
-                'line': line,
-                'is_error': is_error and not is_ignored,
-                'timestamp': timestamp
-            })
-        
-        return jsonify({
-            'monitor': monitor_name,
-            'container': container_name,
-            'logs': log_lines,
-            'is_monitored': is_monitored,
-            'filter': {
-                'type': filter_type,
-                'text': filter_text
-            }
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        plan, _ = _request_query(strict=True)
+        logs = _query_page(target, plan, page, time_range)
+    except QueryError as e:
+        return jsonify({'error': f"Invalid query: {e}"}), 400
+
+    header = {
+        'monitor': monitor_name,
+        'container': target.container_name,
+        'is_monitored': target.is_monitored,
+        'source': 'archive' if target.archive is not None else 'docker',
+        'filter': {
+            'type': request.args.get('filter', 'all'),
+            'text': request.args.get('text', ''),
+            'query': plan.text
+        }
+    }
+
+    if _wants_ndjson():
+        return Response(stream_with_context(_buffered(_iter_ndjson(logs, page, header))),
+                        mimetype='application/x-ndjson')
+
+    log_lines = list(logs)
+    if page.error:
+        return jsonify({'error': page.error}), 500
+
+    return jsonify(dict(header, logs=log_lines, page=page.as_dict()))
+
+@bp.route('/stream/<monitor_name>')
+def stream_logs(monitor_name):
+    """Server-Sent Events stream of new log lines for a monitor/container
+
+    Every viewer of a container shares one Docker follow stream; lines are
+    classified and filtered here, per viewer, before they are sent.
+    """
+    target = LogTarget(monitor_name)
+
+    error = target.connect()
+    if error:
+        return jsonify({'error': error}), 500
+
+    try:
+        plan, _ = _request_query(strict=True)
+    except QueryError as e:
+        return jsonify({'error': f"Invalid query: {e}"}), 400
+    keep = plan.filter(target.classify)
+
+    streams = target.streams
+    if plan.streams:
+        streams = tuple(stream for stream in streams if stream in plan.streams)
+    key = (target.docker_host or DEFAULT_HOST, target.container_name, tuple(streams))
+    subscriber = tails.subscribe(key, _follow_opener(target.docker_client, target.container_name, streams))
+
+    def events():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                lines, dropped = subscriber.get(KEEPALIVE_SECONDS)
+                if subscriber.closed:
+                    break
+                if dropped:
+                    yield f"event: dropped\ndata: {dropped}\n\n"
+                messages = []
+                for line in lines:
+                    entry = keep(line)
+                    if entry is not None:
+                        messages.append(f"id: {entry['timestamp']}\ndata: {json.dumps(entry)}\n\n")
+                yield ''.join(messages) if messages else ': keepalive\n\n'
+        finally:
+            # Runs when the viewer disconnects and the server closes the response
+            tails.unsubscribe(key, subscriber)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
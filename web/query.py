@@ -0,0 +1,431 @@
+"""
+Log query language, compiled once into predicate plans
+
+    timeout                  lines containing "timeout" (case-insensitive)
+    "connection refused"     lines containing the phrase
+    /fail(ed|ure)/           lines matching a regex (case-insensitive)
+    a b, a AND b             both; a OR b either; NOT a or -a negates
+    level:error              lines the monitor classifies as errors
+    level:warn               warn, info, debug or fatal by keyword
+    stream:stderr            only one output stream
+    since:2h until:30m       relative (s, m, h, d, w ago) or absolute times
+
+AND binds tighter than OR and parentheses group. A bare word with regex
+metacharacters is treated as a regex, falling back to plain text when it
+does not compile. stream:, since: and until: restrict what is read rather
+than testing each line, so they may only be combined with AND.
+
+The log viewer's custom filter keeps its original meaning for text that
+uses none of this syntax: the whole text is one substring (or regex), so
+"connection reset" still matches the phrase rather than both words.
+"""
+
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+from monitors.checkpoint import parse_timestamp
+from monitors.framing import STREAM_IDS
+from monitors.matcher import is_literal
+
+NANOS = 1_000_000_000
+
+TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<lparen>\() |
+        (?P<rparen>\)) |
+        (?P<regex>/(?:\\.|[^/\\])+/) |
+        (?P<phrase>"(?:\\.|[^"\\])*") |
+        (?P<word>[^\s()"]+)
+    )
+''', re.VERBOSE)
+
+FIELD_RE = re.compile(r'^(level|stream|since|until):(.+)$', re.IGNORECASE)
+DURATION_RE = re.compile(r'^(\d+)([smhdw])$')
+DURATION_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+OPERATORS = frozenset(('AND', 'OR', 'NOT'))
+
+# Levels other than error are recognised by the keywords that announce them
+LEVEL_PATTERNS = {
+    'fatal': re.compile(r'\b(fatal|critical|panic)\b', re.IGNORECASE),
+    'warn': re.compile(r'\b(warn|warning)\b', re.IGNORECASE),
+    'info': re.compile(r'\binfo\b', re.IGNORECASE),
+    'debug': re.compile(r'\b(debug|trace)\b', re.IGNORECASE),
+}
+LEVEL_ALIASES = {'warning': 'warn', 'errors': 'error', 'critical': 'fatal'}
+
+# Relative cost of evaluating each kind of check, used to order conjunctions
+COST_TEXT = 1
+COST_KEYWORD = 3
+COST_REGEX = 4
+COST_CLASSIFY = 6
+
+CACHE_SIZE = 256
+
+
+class QueryError(ValueError):
+    """Raised for a query that cannot be parsed"""
+
+
+class LineView:
+    """A line with its lowercase form and error classification computed on demand"""
+
+    __slots__ = ('text', '_lower', '_error', '_classify')
+
+    def __init__(self, text, classify):
+        self.text = text
+        self._lower = None
+        self._error = None
+        self._classify = classify
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def is_error(self):
+        if self._error is None:
+            self._error = self._classify(self.text) is not None
+        return self._error
+
+
+class _Node:
+    """Parsed query node; compile returns (predicate, cost)"""
+
+    pushdown = False
+
+    def compile(self):
+        raise NotImplementedError
+
+
+class _Text(_Node):
+    def __init__(self, text):
+        self.text = text.lower()
+
+    def compile(self):
+        text = self.text
+        return (lambda line: text in line.lower), COST_TEXT
+
+
+class _Regex(_Node):
+    def __init__(self, pattern):
+        try:
+            self.regex = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise QueryError(f"Invalid regex /{pattern}/: {e}")
+
+    def compile(self):
+        search = self.regex.search
+        return (lambda line: search(line.text) is not None), COST_REGEX
+
+
+class _Level(_Node):
+    def __init__(self, level):
+        level = level.lower()
+        level = LEVEL_ALIASES.get(level, level)
+        if level != 'error' and level not in LEVEL_PATTERNS:
+            raise QueryError(f"Unknown level '{level}'")
+        self.level = level
+
+    def compile(self):
+        if self.level == 'error':
+            return (lambda line: line.is_error), COST_CLASSIFY
+        search = LEVEL_PATTERNS[self.level].search
+        return (lambda line: search(line.text) is not None), COST_KEYWORD
+
+
+class _Stream(_Node):
+    pushdown = True
+
+    def __init__(self, name):
+        if name.lower() not in STREAM_IDS:
+            raise QueryError(f"Unknown stream '{name}'")
+        self.stream = STREAM_IDS[name.lower()]
+
+
+class _Time(_Node):
+    pushdown = True
+
+    def __init__(self, field, value):
+        self.field = field
+        match = DURATION_RE.match(value)
+        if match:
+            # Resolved against the clock when the plan runs, so cached plans stay correct
+            self.ago = int(match.group(1)) * DURATION_SECONDS[match.group(2)]
+            self.nanos = None
+            return
+        self.ago = None
+        self.nanos = parse_timestamp(value)
+        if self.nanos is None:
+            try:
+                self.nanos = int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * NANOS)
+            except ValueError:
+                raise QueryError(f"Invalid time '{value}' for {field}:")
+
+    def resolve(self, now):
+        return now - self.ago * NANOS if self.ago is not None else self.nanos
+
+
+class _And(_Node):
+    def __init__(self, children):
+        # Flatten nested conjunctions so every conjunct can be ordered (and pushed down) together
+        self.children = []
+        for child in children:
+            self.children.extend(child.children if isinstance(child, _And) else [child])
+
+    def compile(self):
+        compiled = sorted((child.compile() for child in self.children), key=lambda item: item[1])
+        predicates = tuple(predicate for predicate, _ in compiled)
+
+        def predicate(line):
+            for check in predicates:
+                if not check(line):
+                    return False
+            return True
+        return predicate, sum(cost for _, cost in compiled)
+
+
+class _Or(_Node):
+    def __init__(self, children):
+        self.children = children
+
+    def compile(self):
+        compiled = sorted((child.compile() for child in self.children), key=lambda item: item[1])
+        predicates = tuple(predicate for predicate, _ in compiled)
+
+        def predicate(line):
+            for check in predicates:
+                if check(line):
+                    return True
+            return False
+        return predicate, sum(cost for _, cost in compiled)
+
+
+class _Not(_Node):
+    def __init__(self, child):
+        self.child = child
+
+    def compile(self):
+        check, cost = self.child.compile()
+        return (lambda line: not check(line)), cost
+
+
+class _Parser:
+    """Recursive descent over the query tokens"""
+
+    def __init__(self, text):
+        self.tokens = self._tokenize(text)
+        self.position = 0
+
+    @staticmethod
+    def _tokenize(text):
+        tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = TOKEN_RE.match(text, position)
+            if not match or match.end() == position:
+                raise QueryError(f"Unexpected character at {position}: {text[position]!r}")
+            position = match.end()
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            return None
+        node = self._or()
+        if self.position < len(self.tokens):
+            raise QueryError(f"Unexpected '{self._peek()[1]}'")
+        return node
+
+    def _or(self):
+        children = [self._and()]
+        while self._peek() == ('word', 'OR'):
+            self._next()
+            children.append(self._and())
+        return children[0] if len(children) == 1 else _Or(children)
+
+    def _and(self):
+        children = [self._not()]
+        while True:
+            kind, value = self._peek()
+            if kind is None or kind == 'rparen' or (kind, value) == ('word', 'OR'):
+                break
+            if (kind, value) == ('word', 'AND'):
+                self._next()
+            children.append(self._not())
+        return children[0] if len(children) == 1 else _And(children)
+
+    def _not(self):
+        kind, value = self._peek()
+        if (kind, value) == ('word', 'NOT'):
+            self._next()
+            return _Not(self._not())
+        if kind == 'word' and value.startswith('-') and len(value) > 1:
+            self._next()
+            return _Not(self._word(value[1:]))
+        return self._atom()
+
+    def _atom(self):
+        kind, value = self._next()
+        if kind is None:
+            raise QueryError("Unexpected end of query")
+        if kind == 'lparen':
+            node = self._or()
+            if self._next()[0] != 'rparen':
+                raise QueryError("Missing closing parenthesis")
+            return node
+        if kind == 'rparen':
+            raise QueryError("Unexpected ')'")
+        if kind == 'regex':
+            return _Regex(value[1:-1].replace('\\/', '/'))
+        if kind == 'phrase':
+            return _Text(re.sub(r'\\(.)', r'\1', value[1:-1]))
+        if value in ('AND', 'OR', 'NOT'):
+            raise QueryError(f"Missing term before or after {value}")
+        return self._word(value)
+
+    @staticmethod
+    def _word(value):
+        match = FIELD_RE.match(value)
+        if match:
+            field, argument = match.group(1).lower(), match.group(2)
+            if field == 'level':
+                return _Level(argument)
+            if field == 'stream':
+                return _Stream(argument)
+            return _Time(field, argument)
+        if is_literal(value):
+            return _Text(value)
+        try:
+            return _Regex(value)
+        except QueryError:
+            # Not a valid regex after all, so search for the text itself
+            return _Text(value)
+
+
+def _contains_pushdown(node):
+    if node.pushdown:
+        return True
+    children = getattr(node, 'children', None) or ([node.child] if isinstance(node, _Not) else [])
+    return any(_contains_pushdown(child) for child in children)
+
+
+class QueryPlan:
+    """A compiled query: a line predicate plus the stream and time restrictions"""
+
+    def __init__(self, text, node):
+        self.text = text
+        self.streams = None
+        self._since = []
+        self._until = []
+
+        conjuncts = node.children if isinstance(node, _And) else [node] if node else []
+        checks = []
+        for child in conjuncts:
+            if isinstance(child, _Stream):
+                self.streams = (self.streams or set()) | {child.stream}
+            elif isinstance(child, _Time):
+                (self._since if child.field == 'since' else self._until).append(child)
+            elif _contains_pushdown(child):
+                raise QueryError("stream:, since: and until: can only be combined with AND")
+            else:
+                checks.append(child)
+
+        # The longest plain-text term every matching line must contain, for indexes to prune with
+        required = [child.text for child in checks if isinstance(child, _Text)]
+        self.required_text = max(required, key=len) if required else None
+
+        self.predicate = None
+        self.cost = 0
+        if checks:
+            self.predicate, self.cost = (checks[0] if len(checks) == 1 else _And(checks)).compile()
+
+    def bounds(self, now=None):
+        """(since, until) in epoch nanoseconds from the query's time fields, None when open"""
+        now = now or time.time_ns()
+        since = max((node.resolve(now) for node in self._since), default=None)
+        until = min((node.resolve(now) for node in self._until), default=None)
+        return since, until
+
+    def matches(self, line, classify):
+        """True if the line satisfies the query"""
+        return self.predicate is None or self.predicate(LineView(line, classify))
+
+    def filter(self, classify):
+        """Function returning the display entry for a line, or None when the query drops it
+
+        classify(line) returns the matching error pattern or None; it is only
+        called for lines the query needs it for or that are displayed.
+        """
+        predicate = self.predicate
+
+        def keep(line):
+            if not line.strip():
+                return None
+            view = LineView(line, classify)
+            if predicate is not None and not predicate(view):
+                return None
+            return {
+                'line': line,
+                'is_error': view.is_error,
+                'timestamp': line.split(' ')[0] if ' ' in line else ''
+            }
+        return keep
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_query(text):
+    """Parse and compile a query, reusing the plan for a query seen recently"""
+    return QueryPlan(text, _Parser(text).parse())
+
+
+def uses_query_syntax(text):
+    """True if text uses operators, fields, quotes or /regex/ rather than being plain search text"""
+    if '"' in text:
+        return True
+    tokens = text.split()
+    for token in tokens:
+        word = token.strip('()')
+        if token in OPERATORS or FIELD_RE.match(word):
+            return True
+        if len(token) > 1 and token.startswith('/') and token.endswith('/'):
+            return True
+    # A leading - only negates next to other terms; alone, "-v" or "--verbose" is search text
+    return len(tokens) > 1 and any(token.startswith('-') and len(token) > 1 for token in tokens)
+
+
+def _single_term(text):
+    """Query for text as one term: a regex if it is one, otherwise a quoted substring"""
+    if not is_literal(text):
+        try:
+            re.compile(text)
+            return '/' + re.sub(r'\\?/', r'\\x2f', text) + '/'
+        except re.error:
+            pass
+    escaped = text.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def build_query(filter_type='all', filter_text=''):
+    """Query text for the log viewer's filter type and custom filter box"""
+    parts = []
+    if filter_type == 'errors':
+        parts.append('level:error')
+    if filter_type == 'custom' and filter_text.strip():
+        if not uses_query_syntax(filter_text):
+            parts.append(_single_term(filter_text))
+        else:
+            parts.append(f"({filter_text})" if parts else filter_text)
+    return ' '.join(parts)
@@ -5,7 +5,8 @@ Settings blueprint for configuring the application
 from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash, Response
 import yaml
 import os
-import docker
+from engine.hosts import clients
+from engine.inventory import ContainerInventory, paginate
 from flask_wtf import FlaskForm
 from wtforms import StringField, BooleanField, IntegerField, TextAreaField, SubmitField, SelectField
 from wtforms.validators import DataRequired, Optional, NumberRange, URL
@@ -46,67 +47,34 @@ class MonitorForm(FlaskForm):
     enabled = BooleanField('Enabled', default=True)
     submit = SubmitField('Add Monitor')
 
-def test_docker_connection(config):
-    """Test connection to Docker host and return results"""
+def test_docker_connection(config, check=False):
+    """Test connection to Docker host and return results
+
+    Uses the shared pooled client for the configured host; check forces a
+    fresh ping instead of trusting a recent health check.
+    """
     try:
-        # Get Docker connection settings
         docker_config = config.get('docker', {})
-        docker_host = docker_config.get('host', 'local')
-        use_tls = docker_config.get('tls', False)
-        timeout = docker_config.get('timeout', 10)
-        
-        # Connect to Docker
-        if docker_host == 'local':
-            # Connect to local Docker daemon
-            client = docker.from_env(timeout=timeout)
-        else:
-            # Connect to remote Docker host
-            tls_config = None
-            if use_tls:
-                cert_path = docker_config.get('tls_cert_path')
-                key_path = docker_config.get('tls_key_path')
-                ca_path = docker_config.get('tls_ca_path')
-                
-                if cert_path and key_path and ca_path:
-                    tls_config = docker.tls.TLSConfig(
-                        client_cert=(cert_path, key_path),
-                        ca_cert=ca_path,
-                        verify=True
-                    )
-            
-            client = docker.DockerClient(
-                base_url=docker_host,
-                tls=tls_config,
-                timeout=timeout
-            )
-        
-        # Test connection
-        client.ping()
-        version = client.version()
+        # Cached per pooled client, so page loads don't call the daemon unless check is set
+        version = clients.version(docker_config, check=check)
+        client = clients.get(docker_config)
         
-        # Get containers (use attrs for image to avoid 404 if image was removed)
-        containers = client.containers.list(all=True)
-        container_list = []
-        for container in containers:
-            config_image = container.attrs.get('Config', {}).get('Image') or ''
-            if config_image:
-                image_display = config_image
-            else:
-                image_id = container.attrs.get('Image', '')
-                image_display = image_id[7:19] if image_id.startswith('sha256:') else (image_id[:12] if len(image_id) >= 12 else image_id)
-            container_list.append({
-                'id': container.id[:12],
-                'name': container.name,
-                'image': image_display,
-                'status': container.status
-            })
+        # One cached list call; an explicit test lists the host again
+        page = paginate(ContainerInventory.for_client(client).list(refresh=check))
+        container_list = [{
+            'id': container.short_id,
+            'name': container.name,
+            'image': container.image,
+            'status': container.status
+        } for container in page.items]
         return {
             'success': True,
             'version': version.get('Version', 'Unknown'),
             'api_version': version.get('ApiVersion', 'Unknown'),
             'os': version.get('Os', 'Unknown'),
             'arch': version.get('Arch', 'Unknown'),
-            'containers': container_list
+            'containers': container_list,
+            'container_total': page.total
         }
     except Exception as e:
         return {
@@ -210,7 +178,7 @@ def docker_settings():
         
         # Test connection if requested
         if form.test_connection.data:
-            connection_test_result = test_docker_connection(config)
+            connection_test_result = test_docker_connection(config, check=True)
             if connection_test_result['success']:
                 flash('Successfully connected to Docker host!', 'success')
             else:
@@ -224,7 +192,7 @@ def docker_settings():
                 flash('Docker configuration saved successfully. Restart Monitorr to apply changes.', 'success')
                 
                 # Test connection after saving
-                connection_test_result = test_docker_connection(config)
+                connection_test_result = test_docker_connection(config, check=True)
                 if not connection_test_result['success']:
                     flash(f'Warning: Could not connect to configured Docker host: {connection_test_result["error"]}', 'warning')
                 
@@ -265,6 +233,7 @@ def add_monitor(container_name):
     try:
         form = MonitorForm()
         config_path = _config_path()
+        docker_host = request.args.get('host')
 
         # Load current configuration (catch all read errors so page always loads)
         try:
@@ -283,7 +252,10 @@ def add_monitor(container_name):
 
             # Get monitor type and create appropriate configuration
             monitor_type = form.monitor_type.data
-            monitor_name = f"{monitor_type}_{container_name}"
+            if docker_host:
+                monitor_name = f"{monitor_type}_{docker_host}_{container_name}"
+            else:
+                monitor_name = f"{monitor_type}_{container_name}"
 
             # Create monitor configuration
             monitor_config = {
@@ -293,6 +265,8 @@ def add_monitor(container_name):
                 'alert_threshold': 5,  # Default values
                 'alert_interval': 300
             }
+            if docker_host:
+                monitor_config['docker_host'] = docker_host
 
             # Add type-specific configuration
             if monitor_type == 'plex':
@@ -336,7 +310,7 @@ def add_monitor(container_name):
             return Response(body, status=500, mimetype='text/html')
         return redirect(url_for('settings.docker_settings'))
 
-    return render_template('settings/add_monitor.html', form=form, container_name=container_name)
+    return render_template('settings/add_monitor.html', form=form, container_name=container_name, docker_host=docker_host)
 
 @bp.route('/env')
 def environment():